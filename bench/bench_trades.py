@@ -0,0 +1,279 @@
+# bench/bench_trades.py
+
+import argparse
+import asyncio
+import contextlib
+import io
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+from solders.keypair import Keypair
+from solders.pubkey import Pubkey
+from tabulate import tabulate
+
+"""
+Offline end-to-end latency benchmark of buy() and sell().
+
+Starts bench.mock_rpc in a subprocess, points every RPC, websocket, broadcast and
+DexScreener URL of the trade scripts at it, and runs the real buy/sell functions at
+each concurrency level. For every level it reports p50/p99 end-to-end latency,
+throughput and the RPC calls made per trade (background refreshes included, since
+they are part of what a trade costs), broken down by method with --breakdown.
+
+    python -m bench.bench_trades --concurrency 1,4,16 --rounds 5 \\
+        --latency 30 --method-latency getProgramAccounts=150 --jitter 0.2
+
+By default every mint is traded once before measuring, so the numbers are for warm
+caches; --cold clears the pool, mint, template and compute unit caches before every
+round. --max-p99-ms and --max-rpc-per-trade turn the run into a regression gate:
+the exit status is 1 if any level exceeds them.
+"""
+
+READY_TIMEOUT = 10
+BUY_AMOUNT = 0.001
+LAMPORTS_PER_SOL = 1_000_000_000
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def rpc(url: str, method: str, params=None):
+    response = httpx.post(url, json={"jsonrpc": "2.0", "id": 1, "method": method, "params": params or []})
+    response.raise_for_status()
+    return response.json()["result"]
+
+
+def start_mock(args):
+    """
+    Starts bench.mock_rpc and returns (process, http url, ws url) once it answers.
+    """
+    http_port, ws_port = free_port(), free_port()
+    command = [
+        sys.executable, "-m", "bench.mock_rpc",
+        "--http-port", str(http_port),
+        "--ws-port", str(ws_port),
+        "--pools", str(args.pools),
+        "--latency", str(args.latency),
+        "--jitter", str(args.jitter),
+        "--confirm-ms", str(args.confirm_ms),
+    ]
+    for value in args.method_latency or []:
+        command += ["--method-latency", value]
+    root = os.path.join(os.path.dirname(__file__), "..")
+    process = subprocess.Popen(command, cwd=root, stdout=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{http_port}"
+    deadline = time.monotonic() + READY_TIMEOUT
+    while True:
+        try:
+            rpc(url, "benchPools")
+            return process, url, f"ws://127.0.0.1:{ws_port}"
+        except httpx.HTTPError:
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.kill()
+                raise RuntimeError("mock rpc did not start")
+            time.sleep(0.05)
+
+
+def configure_env(url: str, ws_url: str):
+    """
+    Points the trade scripts at the mock. Must run before they are imported, since
+    they read their configuration at import time.
+    """
+    os.environ.update(
+        {
+            "RPC_HTTPS_URL": url,
+            "RPC_WSS_URL": ws_url,
+            "RPC_BROADCAST_URLS": url,
+            "DEXSCREENER_URL": url,
+            "PrivateKey": str(Keypair()),
+            "WSOL_TokenAccount": str(Pubkey.new_unique()),
+            # Nothing is read from or written to the caches on disk
+            "COMPUTE_UNIT_CACHE_PATH": "",
+            "LOOKUP_TABLE_CACHE_PATH": "",
+            "LOOKUP_TABLE_AUTO_EXTEND_AFTER": "0",
+        }
+    )
+    os.environ.pop("POOL_CACHE_PATH", None)
+
+
+def clear_caches():
+    from utils.compute_units import compute_unit_calibrator
+    from utils.mint_info import mint_info_cache
+    from utils.pool_cache import pool_keys_cache
+    from utils.swap_template import swap_templates
+
+    pool_keys_cache.clear()
+    mint_info_cache.clear()
+    swap_templates.clear()
+    compute_unit_calibrator.clear()
+
+
+async def run_level(trade, mints, concurrency: int, rounds: int, cold: bool):
+    """
+    Runs `rounds` rounds of `concurrency` simultaneous trades.
+
+    Returns:
+        tuple: (latencies in seconds, failures, wall time in seconds)
+    """
+    latencies = []
+    failures = 0
+    order = 0
+
+    async def timed(mint):
+        started = time.perf_counter()
+        ok = await trade(mint)
+        return time.perf_counter() - started, ok
+
+    wall_started = time.perf_counter()
+    for _ in range(rounds):
+        if cold:
+            clear_caches()
+        batch = [mints[(order + i) % len(mints)] for i in range(concurrency)]
+        order += concurrency
+        for latency, ok in await asyncio.gather(*(timed(mint) for mint in batch)):
+            latencies.append(latency)
+            failures += not ok
+    return latencies, failures, time.perf_counter() - wall_started
+
+
+async def bench(args, url: str) -> list:
+    import buy_wrap_sol
+    import sell_wrap_sol
+    from utils.priority_fee import percentile
+
+    mints = rpc(url, "benchPools")
+    order_numbers = itertools.count(1)
+
+    async def buy(mint):
+        # A distinct amount per order, or identical transactions would share a signature
+        amount = BUY_AMOUNT + next(order_numbers) / LAMPORTS_PER_SOL
+        return await buy_wrap_sol.buy(buy_wrap_sol.solana_client, mint, buy_wrap_sol.payer, amount) is True
+
+    async def sell(mint):
+        # sell() returns None once confirmed and False after its last retry
+        return await sell_wrap_sol.sell(sell_wrap_sol.solana_client, mint, sell_wrap_sol.payer) is None
+
+    sides = {"buy": buy, "sell": sell}
+    selected = list(sides) if args.side == "both" else [args.side]
+    results = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        if not args.cold:
+            for side in selected:
+                await asyncio.gather(*(sides[side](mint) for mint in mints))
+        for side in selected:
+            for concurrency in args.concurrency:
+                rpc(url, "benchStats", [True])
+                latencies, failures, wall = await run_level(
+                    sides[side], mints, concurrency, args.rounds, args.cold
+                )
+                calls = rpc(url, "benchStats", [True])
+                orders = len(latencies)
+                http_calls = {m: n for m, n in calls.items() if not m.startswith("ws:") and m != "GET"}
+                results.append(
+                    {
+                        "side": side,
+                        "concurrency": concurrency,
+                        "orders": orders,
+                        "failures": failures,
+                        "p50_ms": percentile(latencies, 50) * 1000,
+                        "p99_ms": percentile(latencies, 99) * 1000,
+                        "max_ms": max(latencies) * 1000,
+                        "throughput": orders / wall,
+                        "rpc_per_trade": sum(http_calls.values()) / orders,
+                        "ws_per_trade": sum(n for m, n in calls.items() if m.startswith("ws:")) / orders,
+                        "calls": {m: n / orders for m, n in sorted(calls.items())},
+                    }
+                )
+    return results
+
+
+async def run(args, url: str) -> list:
+    from utils.shutdown import shutdown
+
+    try:
+        return await bench(args, url)
+    finally:
+        await shutdown()
+
+
+def report(results: list, breakdown: bool):
+    rows = [
+        [
+            r["side"],
+            r["concurrency"],
+            r["orders"],
+            r["failures"],
+            f"{r['p50_ms']:.1f}",
+            f"{r['p99_ms']:.1f}",
+            f"{r['throughput']:.2f}",
+            f"{r['rpc_per_trade']:.2f}",
+            f"{r['ws_per_trade']:.2f}",
+        ]
+        for r in results
+    ]
+    print(
+        tabulate(
+            rows,
+            headers=["side", "conc", "orders", "failed", "p50 ms", "p99 ms", "trades/s", "rpc/trade", "ws/trade"],
+        )
+    )
+    if breakdown:
+        for r in results:
+            print(f"\n{r['side']} x{r['concurrency']} calls per trade:")
+            print(tabulate([[m, f"{n:.2f}"] for m, n in r["calls"].items()]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end latency benchmark of buy() and sell().")
+    parser.add_argument("--side", choices=["buy", "sell", "both"], default="both")
+    parser.add_argument("--concurrency", default="1,2,4,8", help="comma separated levels")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--cold", action="store_true")
+    parser.add_argument("--pools", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=20, help="default RPC latency in ms")
+    parser.add_argument("--method-latency", action="append", metavar="METHOD=MS")
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--confirm-ms", type=float, default=400)
+    parser.add_argument("--breakdown", action="store_true")
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    parser.add_argument("--max-p99-ms", type=float)
+    parser.add_argument("--max-rpc-per-trade", type=float)
+    args = parser.parse_args()
+    args.concurrency = [int(level) for level in args.concurrency.split(",")]
+
+    process, url, ws_url = start_mock(args)
+    try:
+        configure_env(url, ws_url)
+        results = asyncio.run(run(args, url))
+    finally:
+        process.terminate()
+        process.wait()
+
+    report(results, args.breakdown)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+
+    failed = [
+        r
+        for r in results
+        if r["failures"]
+        or (args.max_p99_ms is not None and r["p99_ms"] > args.max_p99_ms)
+        or (args.max_rpc_per_trade is not None and r["rpc_per_trade"] > args.max_rpc_per_trade)
+    ]
+    if failed:
+        print(f"\n{len(failed)} level(s) failed or exceeded the limits")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
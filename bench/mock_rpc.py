@@ -0,0 +1,489 @@
+# bench/mock_rpc.py
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import itertools
+import json
+import random
+import time
+from collections import Counter
+
+import base58
+import websockets
+from solders.hash import Hash
+from solders.pubkey import Pubkey
+
+from utils.layouts import AmmInfoView, MarketView
+
+"""
+Local stand-in for a Solana JSON-RPC + PubSub node, for offline benchmarks.
+
+It serves the calls the trade scripts make against a handful of generated Raydium V4
+pools, with a configurable latency and jitter per method, and counts every call so a
+benchmark can report RPC calls per trade:
+
+    python -m bench.mock_rpc --http-port 8899 --ws-port 8900 \\
+        --latency 30 --method-latency getProgramAccounts=150 --jitter 0.2
+
+HTTP:  getProgramAccounts, getAccountInfo, getMultipleAccounts,
+       getTokenAccountsByOwner, getTokenAccountBalance, getLatestBlockhash,
+       getBlockHeight, getSlot, getRecentPrioritizationFees, simulateTransaction,
+       sendTransaction, getSignatureStatuses, plus GET requests (DexScreener stub).
+PubSub: signatureSubscribe (notified --confirm-ms after sendTransaction), and
+       account/logs/slot subscriptions that are acknowledged but stay silent.
+
+Mock-only methods: benchPools (the generated mints) and benchStats (call counts
+since start or the last benchStats with reset).
+"""
+
+SLOT_TIME = 0.4
+BLOCKHASH_VALIDITY = 150
+TOKEN_PROGRAM_ID = Pubkey.from_string("TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA")
+RAY_V4 = Pubkey.from_string("675kPX9MHTjS2zt1qfr1NYHuzeLXfQM9H24wFSUt1Mp8")
+OPEN_BOOK_PROGRAM = Pubkey.from_string("srmqPvymJeFKQ4zGQed1GFppgkRHL9kaELCbyksJtPX")
+WSOL = Pubkey.from_string("So11111111111111111111111111111111111111112")
+RAY_AUTHORITY_V4 = Pubkey.from_string("5Q544fKrFoe6tsEbD7S8EmxGTJYAKtTVhAW5Q5pge4j1")
+
+TOKEN_ACCOUNT_LEN = 165
+TOKEN_BALANCE = 1_000_000_000
+TOKEN_DECIMALS = 6
+UNITS_CONSUMED = 45_000
+# Vault balances and fees of every generated pool, so local quotes have reserves
+BASE_RESERVE = 10**15
+QUOTE_RESERVE = 10**13
+SWAP_FEE_NUMERATOR = 25
+SWAP_FEE_DENOMINATOR = 10_000
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found"}
+
+
+def _pubkey(rng: random.Random) -> Pubkey:
+    return Pubkey.from_bytes(rng.getrandbits(256).to_bytes(32, "little"))
+
+
+def _account(owner: Pubkey, data: bytes, lamports: int = 2_039_280) -> dict:
+    return {
+        "data": [base64.b64encode(data).decode(), "base64"],
+        "executable": False,
+        "lamports": lamports,
+        "owner": str(owner),
+        "rentEpoch": 0,
+        "space": len(data),
+    }
+
+
+def _write(view_cls, data: bytearray, name: str, value):
+    offset, size = view_cls.FIELDS[name]
+    data[offset : offset + size] = bytes(value) if size == 32 else value.to_bytes(size, "little")
+
+
+def _token_account(mint: Pubkey, owner: Pubkey, amount: int) -> bytes:
+    data = bytearray(TOKEN_ACCOUNT_LEN)
+    data[0:32] = bytes(mint)
+    data[32:64] = bytes(owner)
+    data[64:72] = amount.to_bytes(8, "little")
+    data[108] = 1  # initialized
+    return bytes(data)
+
+
+class MockSolana:
+    """
+    In-memory chain state and the JSON-RPC method handlers.
+
+    Args:
+        pools (int): Number of TOKEN/WSOL pools to generate.
+        latency (float): Default per-request latency in seconds.
+        method_latency (dict): Per-method overrides of `latency`.
+        jitter (float): Uniform relative jitter, 0.2 means +-20%.
+        confirm_delay (float): Seconds from sendTransaction to confirmation.
+        seed (int): Seed of the generated keys and the jitter.
+    """
+
+    def __init__(self, pools=8, latency=0.0, method_latency=None, jitter=0.0, confirm_delay=0.4, seed=1):
+        self.latency = latency
+        self.method_latency = dict(method_latency or {})
+        self.jitter = jitter
+        self.confirm_delay = confirm_delay
+        self.rng = random.Random(seed)
+        self.started = time.monotonic()
+        self.calls = Counter()
+        self.accounts = {}
+        self.amm_ids = []
+        self.mints = []
+        self.sent = {}
+        self.subscription_ids = itertools.count(1)
+        self.balance_reads = itertools.count()
+        for _ in range(pools):
+            self._add_pool()
+
+    def _add_pool(self):
+        rng = self.rng
+        mint, amm_id, market_id = _pubkey(rng), _pubkey(rng), _pubkey(rng)
+        self.accounts[str(mint)] = _account(
+            TOKEN_PROGRAM_ID, bytes(44) + bytes([TOKEN_DECIMALS]) + b"\x01" + bytes(36)
+        )
+
+        amm = bytearray(AmmInfoView.LAYOUT.sizeof())
+        _write(AmmInfoView, amm, "status", 6)
+        _write(AmmInfoView, amm, "coinDecimals", TOKEN_DECIMALS)
+        _write(AmmInfoView, amm, "pcDecimals", 9)
+        for name, value in (
+            ("tradeFeeNumerator", SWAP_FEE_NUMERATOR),
+            ("tradeFeeDenominator", SWAP_FEE_DENOMINATOR),
+            ("swapFeeNumerator", SWAP_FEE_NUMERATOR),
+            ("swapFeeDenominator", SWAP_FEE_DENOMINATOR),
+        ):
+            _write(AmmInfoView, amm, name, value)
+        keys = {
+            name: _pubkey(rng)
+            for name in (
+                "poolCoinTokenAccount",
+                "poolPcTokenAccount",
+                "lpMintAddress",
+                "ammOpenOrders",
+                "ammTargetOrders",
+                "poolWithdrawQueue",
+                "poolTempLpTokenAccount",
+            )
+        }
+        for name, key in keys.items():
+            _write(AmmInfoView, amm, name, key)
+        self.accounts[str(keys["poolCoinTokenAccount"])] = _account(
+            TOKEN_PROGRAM_ID, _token_account(mint, RAY_AUTHORITY_V4, BASE_RESERVE)
+        )
+        self.accounts[str(keys["poolPcTokenAccount"])] = _account(
+            TOKEN_PROGRAM_ID, _token_account(WSOL, RAY_AUTHORITY_V4, QUOTE_RESERVE)
+        )
+        _write(AmmInfoView, amm, "coinMintAddress", mint)
+        _write(AmmInfoView, amm, "pcMintAddress", WSOL)
+        _write(AmmInfoView, amm, "serumMarket", market_id)
+        _write(AmmInfoView, amm, "serumProgramId", OPEN_BOOK_PROGRAM)
+        self.accounts[str(amm_id)] = _account(RAY_V4, bytes(amm))
+
+        market = bytearray(MarketView.LAYOUT.sizeof())
+        _write(MarketView, market, "own_address", market_id)
+        for nonce in range(256):
+            try:
+                Pubkey.create_program_address(
+                    [bytes(market_id), bytes([nonce]), bytes(7)], OPEN_BOOK_PROGRAM
+                )
+                break
+            except Exception:
+                continue
+        _write(MarketView, market, "vault_signer_nonce", nonce)
+        _write(MarketView, market, "base_mint", mint)
+        _write(MarketView, market, "quote_mint", WSOL)
+        for name in ("base_vault", "quote_vault", "request_queue", "event_queue", "bids", "asks"):
+            _write(MarketView, market, name, _pubkey(rng))
+        self.accounts[str(market_id)] = _account(OPEN_BOOK_PROGRAM, bytes(market))
+
+        self.mints.append(str(mint))
+        self.amm_ids.append(str(amm_id))
+
+    # chain clock
+
+    def slot(self) -> int:
+        return 300_000_000 + int((time.monotonic() - self.started) / SLOT_TIME)
+
+    def block_height(self) -> int:
+        return self.slot() - 20_000_000
+
+    def context(self) -> dict:
+        return {"apiVersion": "2.0.0", "slot": self.slot()}
+
+    def delay(self, method: str) -> float:
+        latency = self.method_latency.get(method, self.latency)
+        return max(0.0, latency * (1 + self.rng.uniform(-self.jitter, self.jitter)))
+
+    def is_confirmed(self, signature: str) -> bool:
+        sent_at = self.sent.get(signature)
+        return sent_at is not None and time.monotonic() - sent_at >= self.confirm_delay
+
+    # JSON-RPC
+
+    async def handle(self, request: dict) -> dict:
+        method = request.get("method")
+        params = request.get("params") or []
+        if not str(method).startswith("bench"):
+            self.calls[method] += 1
+            await asyncio.sleep(self.delay(method))
+        handler = getattr(self, "rpc_" + str(method), None)
+        if handler is None:
+            return {
+                "jsonrpc": "2.0",
+                "id": request.get("id"),
+                "error": {"code": -32601, "message": f"Method not found: {method}"},
+            }
+        return {"jsonrpc": "2.0", "id": request.get("id"), "result": handler(*params)}
+
+    def rpc_benchPools(self):
+        return self.mints
+
+    def rpc_benchStats(self, reset=False):
+        calls = dict(self.calls)
+        if reset:
+            self.calls.clear()
+        return calls
+
+    def rpc_getSlot(self, config=None):
+        return self.slot()
+
+    def rpc_getBlockHeight(self, config=None):
+        return self.block_height()
+
+    def rpc_getLatestBlockhash(self, config=None):
+        return {
+            "context": self.context(),
+            "value": {
+                "blockhash": str(Hash.new_unique()),
+                "lastValidBlockHeight": self.block_height() + BLOCKHASH_VALIDITY,
+            },
+        }
+
+    def rpc_getRecentPrioritizationFees(self, accounts=None):
+        slot = self.slot()
+        return [
+            {"slot": slot - i, "prioritizationFee": self.rng.randrange(0, 200_000)}
+            for i in range(150)
+        ]
+
+    def rpc_getAccountInfo(self, pubkey, config=None):
+        return {"context": self.context(), "value": self.accounts.get(pubkey)}
+
+    def rpc_getMultipleAccounts(self, pubkeys, config=None):
+        return {"context": self.context(), "value": [self.accounts.get(p) for p in pubkeys]}
+
+    def rpc_getProgramAccounts(self, program, config=None):
+        config = config or {}
+        matches = []
+        for pubkey, account in self.accounts.items():
+            if account["owner"] != program:
+                continue
+            data = base64.b64decode(account["data"][0])
+            if all(self._filter(f, data) for f in config.get("filters", [])):
+                data_slice = config.get("dataSlice")
+                if data_slice:
+                    offset, length = data_slice["offset"], data_slice["length"]
+                    data = data[offset : offset + length]
+                matches.append(
+                    {"pubkey": pubkey, "account": {**account, "data": [base64.b64encode(data).decode(), "base64"]}}
+                )
+        if config.get("withContext"):
+            return {"context": self.context(), "value": matches}
+        return matches
+
+    @staticmethod
+    def _filter(spec: dict, data: bytes) -> bool:
+        if "dataSize" in spec:
+            return len(data) == spec["dataSize"]
+        memcmp = spec["memcmp"]
+        expected = base58.b58decode(memcmp["bytes"])
+        offset = memcmp["offset"]
+        return data[offset : offset + len(expected)] == expected
+
+    def rpc_getTokenAccountsByOwner(self, owner, selector, config=None):
+        owner = Pubkey.from_string(owner)
+        if selector.get("programId", str(TOKEN_PROGRAM_ID)) != str(TOKEN_PROGRAM_ID):
+            # Every generated mint is an SPL Token mint
+            return {"context": self.context(), "value": []}
+        mints = [selector["mint"]] if "mint" in selector else self.mints
+        value = []
+        for mint in mints:
+            # The wallet's token account of each mint, derived like an ATA would be
+            token_account = Pubkey.from_bytes(
+                hashlib.sha256(bytes(owner) + bytes(Pubkey.from_string(mint))).digest()
+            )
+            value.append(
+                {
+                    "pubkey": str(token_account),
+                    "account": _account(
+                        TOKEN_PROGRAM_ID, _token_account(Pubkey.from_string(mint), owner, TOKEN_BALANCE)
+                    ),
+                }
+            )
+        return {"context": self.context(), "value": value}
+
+    def rpc_getTokenAccountBalance(self, pubkey, config=None):
+        # Every sell sees a different balance, so no two sells share a signature
+        amount = TOKEN_BALANCE - next(self.balance_reads)
+        return {
+            "context": self.context(),
+            "value": {
+                "amount": str(amount),
+                "decimals": TOKEN_DECIMALS,
+                "uiAmount": amount / 10**TOKEN_DECIMALS,
+                "uiAmountString": str(amount / 10**TOKEN_DECIMALS),
+            },
+        }
+
+    def rpc_simulateTransaction(self, txn, config=None):
+        return {
+            "context": self.context(),
+            "value": {
+                "err": None,
+                "logs": [],
+                "accounts": None,
+                "unitsConsumed": UNITS_CONSUMED,
+                "returnData": None,
+            },
+        }
+
+    def rpc_sendTransaction(self, txn, config=None):
+        encoding = (config or {}).get("encoding", "base58")
+        raw = base64.b64decode(txn) if encoding == "base64" else base58.b58decode(txn)
+        # shortvec signature count (1) followed by the first signature
+        signature = base58.b58encode(raw[1:65]).decode()
+        self.sent.setdefault(signature, time.monotonic())
+        return signature
+
+    def rpc_getSignatureStatuses(self, signatures, config=None):
+        value = []
+        for signature in signatures:
+            if not self.is_confirmed(signature):
+                value.append(None)
+                continue
+            value.append(
+                {
+                    "slot": self.slot(),
+                    "confirmations": 1,
+                    "err": None,
+                    "status": {"Ok": None},
+                    "confirmationStatus": "confirmed",
+                }
+            )
+        return {"context": self.context(), "value": value}
+
+    # HTTP/1.1 keep-alive server
+
+    async def serve_http(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method = request_line.split(b" ", 1)[0]
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                if method == b"POST":
+                    request = json.loads(body)
+                    if isinstance(request, list):
+                        response = await asyncio.gather(*(self.handle(r) for r in request))
+                    else:
+                        response = await self.handle(request)
+                    status = 200
+                else:
+                    # DexScreener stand-in: no pairs for any token
+                    self.calls["GET"] += 1
+                    response, status = {"pairs": [], "pair": None}, 200
+                payload = json.dumps(response).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(payload)}\r\n\r\n".encode()
+                    + payload
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    # PubSub
+
+    async def serve_ws(self, ws):
+        async def notify_when_confirmed(subscription: int, signature: str):
+            while not self.is_confirmed(signature):
+                sent_at = self.sent.get(signature)
+                wait = self.confirm_delay if sent_at is None else sent_at + self.confirm_delay - time.monotonic()
+                await asyncio.sleep(max(wait, 0.005))
+            await ws.send(
+                json.dumps(
+                    {
+                        "jsonrpc": "2.0",
+                        "method": "signatureNotification",
+                        "params": {
+                            "subscription": subscription,
+                            "result": {"context": {"slot": self.slot()}, "value": {"err": None}},
+                        },
+                    }
+                )
+            )
+
+        tasks = set()
+        try:
+            async for message in ws:
+                request = json.loads(message)
+                method = request.get("method", "")
+                self.calls["ws:" + method] += 1
+                result = True
+                if method.endswith("Subscribe"):
+                    result = next(self.subscription_ids)
+                    if method == "signatureSubscribe":
+                        task = asyncio.create_task(notify_when_confirmed(result, request["params"][0]))
+                        tasks.add(task)
+                        task.add_done_callback(tasks.discard)
+                await ws.send(json.dumps({"jsonrpc": "2.0", "id": request.get("id"), "result": result}))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+async def serve(mock: MockSolana, host: str, http_port: int, ws_port: int):
+    http_server = await asyncio.start_server(mock.serve_http, host, http_port)
+    async with websockets.serve(mock.serve_ws, host, ws_port, max_size=None):
+        print(f"mock rpc on http://{host}:{http_port} and ws://{host}:{ws_port}", flush=True)
+        async with http_server:
+            await http_server.serve_forever()
+
+
+def parse_method_latency(values) -> dict:
+    """
+    ["getProgramAccounts=150", ...] in milliseconds -> {method: seconds}
+    """
+    latency = {}
+    for value in values or []:
+        method, _, ms = value.partition("=")
+        latency[method] = float(ms) / 1000
+    return latency
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in Solana JSON-RPC and PubSub node.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--http-port", type=int, default=8899)
+    parser.add_argument("--ws-port", type=int, default=8900)
+    parser.add_argument("--pools", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.0, help="default latency in ms")
+    parser.add_argument("--method-latency", action="append", metavar="METHOD=MS")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--confirm-ms", type=float, default=400)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    mock = MockSolana(
+        pools=args.pools,
+        latency=args.latency / 1000,
+        method_latency=parse_method_latency(args.method_latency),
+        jitter=args.jitter,
+        confirm_delay=args.confirm_ms / 1000,
+        seed=args.seed,
+    )
+    try:
+        asyncio.run(serve(mock, args.host, args.http_port, args.ws_port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
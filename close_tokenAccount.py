@@ -2,26 +2,29 @@
 import asyncio
 import os
 import datetime
-from solana.rpc.commitment import Finalized, Confirmed
 from solana.rpc.types import TxOpts
 from solders.compute_budget import set_compute_unit_price, set_compute_unit_limit
+from solders.hash import Hash
 from solders.message import MessageV0
 from solders.pubkey import Pubkey
 from solders.keypair import Keypair
-from solana.rpc.async_api import AsyncClient
 from solders.transaction import VersionedTransaction
-from solana.rpc.api import Client
 from solana.rpc import types
 from spl.token.constants import TOKEN_PROGRAM_ID
 from spl.token.instructions import burn, BurnParams, CloseAccountParams, close_account
 from dotenv import load_dotenv
+from utils.blockhash import blockhash_prefetcher
+from utils.compute_units import compute_unit_calibrator, instructions_shape, is_compute_budget_error
+from utils.confirm import confirm_signature
+from utils.priority_fee import priority_fee_oracle
+from utils.layouts import SplAccountView
+from utils.rpc import get_async_client, get_client
+from utils.shutdown import shutdown
 load_dotenv()
-prompt= input("Do you want to close the token account? (yes/no): Stop the script if it's No, If yes press enter "
-              "to continue")
 
 payer=Keypair.from_base58_string(os.getenv("PrivateKey"))
-solana_client = Client(os.getenv("RPC_HTTPS_URL"))
-async_solana_client = AsyncClient(os.getenv("RPC_HTTPS_URL"))
+solana_client = get_client(os.getenv("RPC_HTTPS_URL"))
+async_solana_client = get_async_client(os.getenv("RPC_HTTPS_URL"))
 
 def getTimestamp():
     while True:
@@ -47,97 +50,140 @@ class style():
     RESET = '\033[0m'
 
 
-async def main():
-
+# Solana's packet limit for a serialized transaction
+PACKET_DATA_SIZE = 1232
+# Generous per burn + close pair; both are plain SPL Token instructions
+CU_PER_PAIR = 12_000
+MAX_COMPUTE_UNITS = 1_400_000
+CLOSE_CONCURRENCY = 16
+# A batch that ran out of compute units is recalibrated and sent again
+CLOSE_ATTEMPTS = 2
+
+
+def decode_token_accounts(response):
+    """
+    Returns (token account, mint, amount) for every closable account, read from
+    the raw account data of the get_token_accounts_by_owner response. Native
+    WSOL accounts and frozen accounts are skipped.
+    """
+    accounts = []
+    for keyed_account in response:
+        view = SplAccountView(keyed_account.account.data)
+        if view.u32("isNativeOption") or view.u8("state") != 1:
+            continue
+        accounts.append((keyed_account.pubkey, view.pubkey("mint"), view.u64("amount")))
+    return accounts
+
+
+def burn_and_close_instructions(token_account, mint, amount):
+    instructions = []
+    if amount:
+        instructions.append(burn(BurnParams(
+            amount=int(amount), account=token_account, mint=mint, owner=payer.pubkey(), program_id=TOKEN_PROGRAM_ID,
+        )))
+    instructions.append(close_account(CloseAccountParams(account=token_account,
+                                                         dest=payer.pubkey(),
+                                                         owner=payer.pubkey(),
+                                                         program_id=TOKEN_PROGRAM_ID)))
+    return instructions
+
+
+def estimated_compute_units(pairs):
+    return min(MAX_COMPUTE_UNITS, CU_PER_PAIR * len(pairs))
+
+
+def compile_batch(pairs, blockhash, compute_unit_limit=None):
+    if compute_unit_limit is None:
+        compute_unit_limit = estimated_compute_units(pairs)
+    instructions = [set_compute_unit_price(priority_fee_oracle.price()),
+                    set_compute_unit_limit(compute_unit_limit)]
+    for pair in pairs:
+        instructions.extend(pair)
+    return MessageV0.try_compile(payer.pubkey(), instructions, [], blockhash)
+
+
+def pack_batches(accounts):
+    """
+    Greedily packs burn + close pairs into as few transactions as fit within the
+    packet size and compute limits.
+    """
+    batches = []
+    batch = []
+    for token_account, mint, amount in accounts:
+        pair = burn_and_close_instructions(token_account, mint, amount)
+        candidate = batch + [pair]
+        # one signature: shortvec count byte + 64 bytes
+        size = len(bytes(compile_batch(candidate, Hash.default()))) + 1 + 64
+        if batch and (size > PACKET_DATA_SIZE or CU_PER_PAIR * len(candidate) > MAX_COMPUTE_UNITS):
+            batches.append(batch)
+            batch = [pair]
+        else:
+            batch = candidate
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+async def send_batch(pairs, semaphore):
+    # Batches of the same burn/close mix share one simulation
+    shape = instructions_shape([ix for pair in pairs for ix in pair])
+    for _ in range(CLOSE_ATTEMPTS):
+        async with semaphore:
+            latest_blockhash, last_valid_block_height = await blockhash_prefetcher.get()
+
+            def build(compute_unit_limit):
+                return VersionedTransaction(compile_batch(pairs, latest_blockhash, compute_unit_limit), [payer])
+
+            compute_unit_limit = await compute_unit_calibrator.limit(shape, build, estimated_compute_units(pairs))
+            try:
+                txn = await async_solana_client.send_transaction(
+                    txn=build(compute_unit_limit),
+                    opts=TxOpts(skip_preflight=True),
+                )
+            except Exception as e:
+                print(f"Failed to send batch of {len(pairs)} accounts: {e}")
+                compute_unit_calibrator.note_failure(shape, e)
+                if is_compute_budget_error(e):
+                    continue
+                return 0
+        txid_string_sig = txn.value
+        print(getTimestamp(), style.RED,
+              f"Closing {len(pairs)} accounts, waiting to be confirmed: https://solscan.io/tx/{txid_string_sig}" + style.RESET)
+        confirmed, err = await confirm_signature(txid_string_sig, last_valid_block_height)
+        if confirmed:
+            print(getTimestamp(), style.GREEN + f"Closed {len(pairs)} accounts: https://solscan.io/tx/{txid_string_sig}", style.RESET)
+            return len(pairs)
+        print(f"Transaction not confirmed ({err}): https://solscan.io/tx/{txid_string_sig}")
+        compute_unit_calibrator.note_failure(shape, err)
+        if not is_compute_budget_error(err):
+            return 0
+    return 0
 
 
-      wallet_address= payer.pubkey()
-      response =  await get_token_accountsCount(wallet_address)
-      solana_token_accounts = {str(token_account.pubkey): token_account for token_account in response}
-      tokenAccount_list= list(solana_token_accounts.keys())
-      if len(tokenAccount_list)>0:
-          try:
-              for token in tokenAccount_list:
-                  burn_instruction=[]
-
-                  # c = await async_solana_client.get_account_info_json_parsed(Pubkey.from_string(token))
-                  mint_address=Pubkey.from_string("RUpbmGF6p42AAeN1QvhFReZejQry1cLkE1PUYFVVpnL")
-                  token_account=Pubkey.from_string("926MHU8vNoxS6Xcyxdqba6VMXdKjeYrTbd6ZPcRPRxzY")
-                  balance = solana_client.get_token_account_balance(token_account)
-                  amount=balance.value.amount
-                  print(amount)
-
-                  params = BurnParams(
-                              amount=int(amount), account=token_account, mint=mint_address, owner=payer.pubkey(), program_id=TOKEN_PROGRAM_ID,
-                          )
-
-                  burn_inst= burn(params)
-                  close_account_params = CloseAccountParams(account=token_account,
-                                                            dest=payer.pubkey(),
-                                                            owner=payer.pubkey(),
-                                                            program_id=TOKEN_PROGRAM_ID)
-                  instructions= []
-
-                  instructions.extend([burn_inst,close_account(close_account_params),set_compute_unit_price(498_750), set_compute_unit_limit(4_000_000)])
-                  # print(instructions)
-
-                  msg = MessageV0.try_compile(
-                     payer.pubkey(),
-                     instructions,
-                      [],
-                      solana_client.get_latest_blockhash().value.blockhash,
-
-                  )
-
-                  print("Sending transaction...")
-                  txn = await async_solana_client.send_transaction(
-                      txn=VersionedTransaction(msg, [payer]),
-                      opts=TxOpts(skip_preflight=True),
-                  )
-                  print("Transaction Signature:", txn.value)
-
-                  # tx1 = VersionedTransaction(msg, [payer])
-                  # txn_sig=solana_client.send_transaction(tx1)
-                  # print(txn_sig.value)
-
-                  #
-                  # tokenAccount_list.remove(token)
-                  txid_string_sig = txn.value
-
-                  if txid_string_sig:
-                      print("Transaction sent")
-                      print(getTimestamp())
-                      print(style.RED,
-                            f"Transaction Signature Waiting to be confirmed: https://solscan.io/tx/{txid_string_sig}" + style.RESET)
-                      print("Waiting Confirmation")
-                  block_height = solana_client.get_block_height(Confirmed).value
-                  print(f"Block height: {block_height}")
-
-                  confirmation_resp = solana_client.confirm_transaction(
-                      txid_string_sig,
-                      commitment=Confirmed,
-                      sleep_seconds=0.5,
-                      last_valid_block_height=block_height + 50
-                  )
-                  print(confirmation_resp)
-
-                  if confirmation_resp.value[0].err == None and str(
-                          confirmation_resp.value[0].confirmation_status) == "TransactionConfirmationStatus.Confirmed":
-                      print(getTimestamp())
-
-                      print(style.GREEN + "Transaction Confirmed", style.RESET)
-                      print(f"Transaction Signature: https://solscan.io/tx/{txid_string_sig}")
-
-                      return
-
-                  else:
-                      print("Transaction not confirmed")
-                      return False
-
-
-          except Exception as e:
-                print(e)
-                # continue
-
-
-asyncio.run(main())
\ No newline at end of file
+async def main():
+    wallet_address = payer.pubkey()
+    response = await get_token_accountsCount(wallet_address)
+    accounts = decode_token_accounts(response)
+    print(f"{len(accounts)} token accounts to burn and close")
+    if not accounts:
+        return
+
+    batches = pack_batches(accounts)
+    print(f"Packed into {len(batches)} transactions")
+    semaphore = asyncio.Semaphore(CLOSE_CONCURRENCY)
+    closed = await asyncio.gather(*(send_batch(pairs, semaphore) for pairs in batches))
+    print(style.GREEN + f"Closed {sum(closed)} of {len(accounts)} token accounts", style.RESET)
+
+
+async def run():
+    try:
+        await priority_fee_oracle.start()
+        await main()
+    finally:
+        await shutdown()
+
+
+if __name__ == "__main__":
+    prompt= input("Do you want to close the token account? (yes/no): Stop the script if it's No, If yes press enter "
+                  "to continue")
+    asyncio.run(run())
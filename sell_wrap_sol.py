@@ -1,27 +1,39 @@
 import asyncio
+import contextlib
 import datetime
-import time
-from solana.rpc.types import TokenAccountOpts, TxOpts
-from solders.message import MessageV0
+import sys
+from solana.rpc.types import TokenAccountOpts
 from solders.pubkey import Pubkey
-from solana.rpc.commitment import Commitment, Confirmed
+from solana.rpc.commitment import Confirmed
 from solana.rpc.api import RPCException
-from solana.rpc.api import Client
 from solders.keypair import Keypair
 
-from solana.rpc.async_api import AsyncClient
-from solders.compute_budget import set_compute_unit_price,set_compute_unit_limit
-from solders.transaction import  VersionedTransaction
-from utils.create_close_account import   get_token_account, make_swap_instruction ,sell_get_token_account
-from utils.birdeye import getSymbol
-from utils.pool_information import gen_pool, getpoolIdByMint
+from spl.token.constants import TOKEN_PROGRAM_ID
+from spl.token.instructions import create_idempotent_associated_token_account
+from utils.create_close_account import   get_token_account ,sell_get_token_account
+from utils.birdeye import prefetch_symbol
+from utils.pool_information import fetch_pool_keys, gen_pool, gen_pool_many, getpoolIdByMint
+from utils.blockhash import blockhash_prefetcher
+from utils.broadcast import broadcaster
+from utils.compute_units import compute_unit_calibrator, is_compute_budget_error, message_shape
+from utils.confirm import confirm_signature
+from utils.priority_fee import priority_fee_oracle, swap_fee_accounts
+from utils.quote import min_amount_out
+from utils.reserve_tracker import reserve_tracker
+from utils.rpc import get_async_client, get_client
+from utils.shutdown import shutdown
+from utils.swap_template import build_swap_transaction
+from utils.lookup_tables import lookup_table_manager
+from utils.warmup import Warmup
+from utils.layouts import SplAccountView
+from utils.mint_info import TOKEN_PROGRAM_ID_2022, mint_info_cache
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 RPC_HTTPS_URL= os.getenv("RPC_HTTPS_URL")
-solana_client = Client(os.getenv("RPC_HTTPS_URL"))
-async_solana_client = AsyncClient(os.getenv("RPC_HTTPS_URL"))
+solana_client = get_client(RPC_HTTPS_URL)
+async_solana_client = get_async_client(RPC_HTTPS_URL)
 payer=Keypair.from_base58_string(os.getenv("PrivateKey"))
 Wsol_TokenAccount=os.getenv('WSOL_TokenAccount')
 
@@ -30,6 +42,8 @@ SERUM_PROGRAM_ID = Pubkey.from_string('srmqPvymJeFKQ4zGQed1GFppgkRHL9kaELCbyksJt
 LAMPORTS_PER_SOL = 1000000000
 MAX_RETRIES = 5
 RETRY_DELAY = 3
+SELL_CONCURRENCY = int(os.getenv("SELL_CONCURRENCY", 8))
+WSOL = Pubkey.from_string("So11111111111111111111111111111111111111112")
 
 
 class style():
@@ -53,136 +67,326 @@ def getTimestamp():
 
 
 
-async def sell(solana_client, TOKEN_TO_SWAP_SELL, payer):
-    retry_count = 0
-    while retry_count < MAX_RETRIES:
+async def send_sell(pool_keys, mint, token_account, WSOL_token_account, amount_in, pre_instructions=(), semaphore=None):
+    """
+    Builds, broadcasts and confirms one swap of `amount_in` of `mint` into WSOL.
+
+    Args:
+        pool_keys (dict): Keys dict from gen_pool / gen_pool_many.
+        mint (Pubkey): Mint being sold.
+        token_account (Pubkey): The user's token account of `mint`.
+        WSOL_token_account (Pubkey): The user's WSOL token account.
+        amount_in (int): Amount to sell, in base units.
+        pre_instructions: Instructions placed before the swap.
+        semaphore (asyncio.Semaphore): Held while building and sending only, not
+            while waiting for confirmation.
+
+    Returns:
+        tuple: (signature, confirmed, err) as from confirm_signature. A failure
+        drops the calibrated compute unit limit of the swap's shape, see
+        ComputeUnitCalibrator.note_failure.
+    """
+    # Quote locally from the live reserves, or from a one-shot read
+    min_out = min_amount_out(pool_keys, await reserve_tracker.read(pool_keys), mint, int(amount_in))
+
+    async with semaphore or contextlib.nullcontext():
+        print("Execute Transaction...")
+        latest_blockhash, last_valid_block_height = await blockhash_prefetcher.get()
+        # Compiled once per pool/accounts, then only patched; the compute unit
+        # limit is simulated once per shape and cached
+        swap_txn = await build_swap_transaction(payer,
+                                                pool_keys,
+                                                token_account,
+                                                WSOL_token_account,
+                                                int(amount_in),
+                                                min_out,
+                                                latest_blockhash,
+                                                priority_fee_oracle.price(swap_fee_accounts(pool_keys)),
+                                                None,
+                                                list(pre_instructions),
+                                                lookup_table_manager.tables_for_pool(pool_keys))
+        shape = message_shape(swap_txn.message)
+        print("Sending transaction...")
         try:
-            token_symbol, SOl_Symbol = getSymbol(TOKEN_TO_SWAP_SELL)
-            mint = Pubkey.from_string(TOKEN_TO_SWAP_SELL)
-
-            # mint= TOKEN_TO_SWAP_SELL
-            sol = Pubkey.from_string("So11111111111111111111111111111111111111112")
-            TOKEN_PROGRAM_ID = solana_client.get_account_info_json_parsed(mint).value.owner
-
-            try:
-
-                tokenPool_ID = await getpoolIdByMint(mint, AsyncClient(RPC_HTTPS_URL, commitment=Confirmed))
+            # Raced to every RPC_BROADCAST_URLS endpoint, returns on the first ack
+            txn = await broadcaster.send(swap_txn)
+        except Exception as e:
+            # The retry re-simulates a limit that failed preflight
+            compute_unit_calibrator.note_failure(shape, e)
+            raise
+    print("Transaction Signature:", txn.value)
+    lookup_table_manager.note_trade(payer, pool_keys)
 
-                if tokenPool_ID:
+    txid_string_sig = txn.value
 
-                    fetch_pool_key = await gen_pool(str(tokenPool_ID), AsyncClient(RPC_HTTPS_URL, commitment=Confirmed))
-                    pool_keys = fetch_pool_key
-                    # print(pool_keys)
-                else:
-                    print("AMMID NOT FOUND SEARCHING WILL BE FETCHING WITH RAYDIUM SDK.. THis happens")
+    if txid_string_sig:
+        print("Transaction sent")
+        print(getTimestamp())
+        print(style.RED,f"Transaction Signature Waiting to be confirmed: https://solscan.io/tx/{txid_string_sig}"+style.RESET)
+        print("Waiting Confirmation")
+    confirmed, err = await confirm_signature(txid_string_sig, last_valid_block_height)
+    broadcaster.record_result(txid_string_sig, confirmed)
+    compute_unit_calibrator.note_failure(shape, err)
+    return txid_string_sig, confirmed, err
 
-            except Exception as e:
-                print(e)
 
+async def sell(solana_client, TOKEN_TO_SWAP_SELL, payer):
+    # Symbol lookup runs in the background, off the send path
+    prefetch_symbol(TOKEN_TO_SWAP_SELL)
+
+    # First blockhash and fee fetches overlap pool discovery, once per call
+    warmup = Warmup()
+    try:
+        retry_count = 0
+        while retry_count < MAX_RETRIES:
+            try:
+                mint = Pubkey.from_string(TOKEN_TO_SWAP_SELL)
 
+                # mint= TOKEN_TO_SWAP_SELL
+                sol = Pubkey.from_string("So11111111111111111111111111111111111111112")
+                # Loaded once per process, then served from the cache on every retry
+                if await mint_info_cache.load(mint) is None:
+                    print(f"{mint} is not a token mint")
+                    return False
 
+                try:
 
-            opts = TokenAccountOpts(mint=mint)
-            response = await async_solana_client.get_token_accounts_by_owner(payer.pubkey(), opts)
-            tokenAccount = response.value[0].pubkey
-            balance = await async_solana_client.get_token_account_balance(tokenAccount, commitment=Confirmed)
+                    tokenPool_ID = await getpoolIdByMint(mint, get_async_client(RPC_HTTPS_URL, Confirmed))
 
+                    if tokenPool_ID:
 
-            amount_in = balance.value.amount
+                        fetch_pool_key = await gen_pool(str(tokenPool_ID), get_async_client(RPC_HTTPS_URL, Confirmed))
+                        pool_keys = fetch_pool_key
+                        # print(pool_keys)
+                    else:
+                        print("AMMID NOT FOUND SEARCHING WILL BE FETCHING WITH RAYDIUM SDK.. THis happens")
+                        pool_keys = await fetch_pool_keys(str(mint))
+                        if pool_keys == "failed":
+                            print("Failed to fetch pool keys.")
+                            return False
 
-            print("Token Balance : ", amount_in)
+                except Exception as e:
+                    print(f"Error fetching pool keys: {e}")
+                    return False
 
-            if int(amount_in) == 0:
-                return "NO BALANCE"
+                # Subscribes once per pool; the first trade seeds the reserves
+                await reserve_tracker.track(pool_keys)
 
 
-            swap_token_account = sell_get_token_account(solana_client, payer.pubkey(), mint)
-            WSOL_token_account, WSOL_token_account_Instructions = get_token_account(solana_client, payer.pubkey(), sol)
 
-            print("3. Create Swap Instructions...")
-            instructions_swap = make_swap_instruction(amount_in,
-                                                      swap_token_account,
-                                                      WSOL_token_account,
-                                                      pool_keys,
-                                                      mint,
-                                                      solana_client,
-                                                      payer
-                                                      )
 
-            swap_tx = []
-            if WSOL_token_account_Instructions != None:
-                swap_tx.append(WSOL_token_account_Instructions)
+                opts = TokenAccountOpts(mint=mint)
+                response = await async_solana_client.get_token_accounts_by_owner(payer.pubkey(), opts)
+                tokenAccount = response.value[0].pubkey
+                balance = await async_solana_client.get_token_account_balance(tokenAccount, commitment=Confirmed)
 
-            swap_tx.extend([instructions_swap,
-                            set_compute_unit_price(498_750),
-                            set_compute_unit_limit(4_000_000)])
 
-            print("Execute Transaction...")
-            compiled_message = MessageV0.try_compile(
-                payer.pubkey(),
-                swap_tx,
-                [],
-                solana_client.get_latest_blockhash().value.blockhash,
-            )
-            print("Sending transaction...")
-            txn = await async_solana_client.send_transaction(
-                txn=VersionedTransaction(compiled_message, [payer]),
-                opts=TxOpts(skip_preflight=True),
-            )
-            print("Transaction Signature:", txn.value)
+                amount_in = balance.value.amount
 
+                print("Token Balance : ", amount_in)
 
+                if int(amount_in) == 0:
+                    return "NO BALANCE"
 
 
-            txid_string_sig = txn.value
+                swap_token_account = sell_get_token_account(solana_client, payer.pubkey(), mint)
+                WSOL_token_account, WSOL_token_account_Instructions = get_token_account(solana_client, payer.pubkey(), sol)
 
-            if txid_string_sig:
-                print("Transaction sent")
-                print(getTimestamp())
-                print(style.RED,f"Transaction Signature Waiting to be confirmed: https://solscan.io/tx/{txid_string_sig}"+style.RESET)
-                print("Waiting Confirmation")
-            block_height = solana_client.get_block_height(Confirmed).value
-            print(f"Block height: {block_height}")
+                pre_instructions = []
+                if WSOL_token_account_Instructions != None:
+                    pre_instructions.append(WSOL_token_account_Instructions)
 
-            confirmation_resp = solana_client.confirm_transaction(
-                txid_string_sig,
-                commitment=Confirmed,
-                sleep_seconds=0.5,
-                last_valid_block_height=block_height + 100
-            )
+                await warmup.ready()
+                txid_string_sig, confirmed, err = await send_sell(pool_keys,
+                                                                  mint,
+                                                                  swap_token_account,
+                                                                  WSOL_token_account,
+                                                                  int(amount_in),
+                                                                  pre_instructions)
+                if err == "expired":
+                    raise asyncio.TimeoutError()
+                if is_compute_budget_error(err):
+                    # The limit was dropped, so the retry's build simulates it again
+                    print("Transaction ran out of compute units. Recalibrating and retrying...")
+                    retry_count += 1
+                    continue
 
-            if confirmation_resp.value[0].err == None and str(
-                    confirmation_resp.value[0].confirmation_status) == "TransactionConfirmationStatus.Confirmed":
-                print(getTimestamp())
+                if confirmed:
+                    print(getTimestamp())
 
-                print(style.GREEN+"Transaction Confirmed",style.RESET)
-                print(f"Transaction Signature: https://solscan.io/tx/{txid_string_sig}")
+                    print(style.GREEN+"Transaction Confirmed",style.RESET)
+                    print(f"Transaction Signature: https://solscan.io/tx/{txid_string_sig}")
 
-                return
+                    return
 
-            else:
-                print("Transaction not confirmed")
-                return False
+                else:
+                    print("Transaction not confirmed")
+                    return False
+            except asyncio.TimeoutError:
+                print("Transaction confirmation timed out. Retrying...")
+                retry_count += 1
+                await asyncio.sleep(RETRY_DELAY)
+            except RPCException as e:
+                print(f"RPC Error: [{e.args[0].message}]... Retrying...")
+                retry_count += 1
+                await asyncio.sleep(RETRY_DELAY)
+            except Exception as e:
+                print(f"Unhandled exception: {e}. Retrying...")
+                retry_count += 1
+                await asyncio.sleep(RETRY_DELAY)
+
+        print("Failed to confirm transaction after maximum retries.")
+        return False
+    finally:
+        await warmup.close()
+
+async def get_holdings(owner, program_id=TOKEN_PROGRAM_ID):
+    """
+    Every non-zero holding of `owner` under one token program except WSOL, from a
+    single get_token_accounts_by_owner call with the balances decoded from its data.
+    Token-2022 accounts share the base account layout, so both programs decode alike.
+
+    Returns:
+        list: (token account, mint, amount) tuples.
+    """
+    response = await async_solana_client.get_token_accounts_by_owner(
+        owner, TokenAccountOpts(program_id=program_id), commitment=Confirmed
+    )
+    holdings = []
+    for keyed_account in response.value:
+        view = SplAccountView(keyed_account.account.data)
+        amount = view.u64("amount")
+        mint = view.pubkey("mint")
+        if amount and mint != WSOL:
+            holdings.append((keyed_account.pubkey, mint, amount))
+    return holdings
+
+
+async def sell_holding(pool_keys, token_account, mint, amount_in, WSOL_token_account, pre_instructions, semaphore):
+    """
+    Sells one holding, retrying on its own schedule without blocking the others.
+    """
+    retry_count = 0
+    while retry_count < MAX_RETRIES:
+        try:
+            txid_string_sig, confirmed, err = await send_sell(pool_keys,
+                                                              mint,
+                                                              token_account,
+                                                              WSOL_token_account,
+                                                              amount_in,
+                                                              pre_instructions,
+                                                              semaphore)
+            if err == "expired":
+                raise asyncio.TimeoutError()
+            if is_compute_budget_error(err):
+                # The limit was dropped, so the retry's build simulates it again
+                raise RuntimeError(f"out of compute units: {err}")
+            if confirmed:
+                print(style.GREEN + f"Sold {mint}: https://solscan.io/tx/{txid_string_sig}", style.RESET)
+                return True
+            print(f"Sell of {mint} failed: {err}")
+            return False
         except asyncio.TimeoutError:
-            print("Transaction confirmation timed out. Retrying...")
-            retry_count += 1
-            time.sleep(RETRY_DELAY)
+            print(f"Sell of {mint} timed out. Retrying...")
         except RPCException as e:
-            print(f"RPC Error: [{e.args[0].message}]... Retrying...")
-            retry_count += 1
-            time.sleep(RETRY_DELAY)
+            print(f"RPC Error selling {mint}: [{e.args[0].message}]... Retrying...")
         except Exception as e:
-            print(f"Unhandled exception: {e}. Retrying...")
-            retry_count += 1
-            time.sleep(RETRY_DELAY)
-
-    print("Failed to confirm transaction after maximum retries.")
+            print(f"Unhandled exception selling {mint}: {e}. Retrying...")
+        retry_count += 1
+        await asyncio.sleep(RETRY_DELAY)
+        try:
+            # The previous attempt may have landed late
+            balance = await async_solana_client.get_token_account_balance(token_account, commitment=Confirmed)
+            amount_in = int(balance.value.amount)
+        except Exception as e:
+            print(f"Failed to refresh balance of {mint}: {e}")
+        if amount_in == 0:
+            return True
+    print(f"Failed to sell {mint} after maximum retries.")
     return False
 
+
+async def sell_all(payer, concurrency: int = SELL_CONCURRENCY):
+    """
+    Sells every SPL Token holding of the wallet into WSOL. Token-2022 holdings are
+    listed and skipped: Raydium V4 pools only hold SPL Token mints.
+
+    Holdings come from one get_token_accounts_by_owner call, pool ids are looked
+    up concurrently and resolved together with gen_pool_many (mints without an
+    on-chain match fall back to the pool registry via fetch_pool_keys), and the
+    swaps are built and sent concurrently with at most `concurrency` in flight.
+
+    Returns:
+        dict: Maps each mint string to True if sold, False otherwise.
+    """
+    warmup = Warmup()
+    try:
+        holdings, token_2022_holdings = await asyncio.gather(
+            get_holdings(payer.pubkey()), get_holdings(payer.pubkey(), TOKEN_PROGRAM_ID_2022)
+        )
+        results = {}
+        for _, mint, _ in token_2022_holdings:
+            print(f"{mint} is a Token-2022 mint, Raydium V4 cannot sell it, skipping")
+            results[str(mint)] = False
+        print(f"{len(holdings)} holdings to sell")
+        if not holdings:
+            return results
+
+        semaphore = asyncio.Semaphore(concurrency)
+        ctx = get_async_client(RPC_HTTPS_URL, Confirmed)
+
+        async def find_pool(mint):
+            async with semaphore:
+                return await getpoolIdByMint(mint, ctx)
+
+        pool_ids = await asyncio.gather(*(find_pool(mint) for _, mint, _ in holdings))
+        pools = await gen_pool_many([pool_id for pool_id in pool_ids if pool_id], ctx)
+        holding_pools = [pools.get(str(pool_id)) if pool_id else None for pool_id in pool_ids]
+        # Mints without an on-chain match fall back to the pool registry, as in buy
+        unmatched = [i for i, pool_id in enumerate(pool_ids) if not pool_id]
+        fetched = await asyncio.gather(*(fetch_pool_keys(str(holdings[i][1])) for i in unmatched))
+        for i, pool_keys in zip(unmatched, fetched):
+            if pool_keys != "failed":
+                holding_pools[i] = pool_keys
+        holding_pools = [keys if keys is not None and "error" not in keys else None for keys in holding_pools]
+        # One batched seed read for every pool about to be sold into
+        await reserve_tracker.track_many([keys for keys in holding_pools if keys is not None])
+
+        WSOL_token_account, WSOL_token_account_Instructions = get_token_account(solana_client, payer.pubkey(), WSOL)
+        pre_instructions = []
+        if WSOL_token_account_Instructions is not None:
+            # Every concurrent sell may carry it, so it must not fail once the account exists
+            pre_instructions.append(create_idempotent_associated_token_account(payer.pubkey(), payer.pubkey(), WSOL))
+        await warmup.ready()
+
+        tasks = {}
+        for (token_account, mint, amount), pool_keys in zip(holdings, holding_pools):
+            if pool_keys is None:
+                print(f"No Raydium V4 WSOL pool for {mint}, skipping")
+                results[str(mint)] = False
+                continue
+            tasks[str(mint)] = sell_holding(pool_keys, token_account, mint, amount,
+                                            WSOL_token_account, pre_instructions, semaphore)
+
+        for mint, sold in zip(tasks, await asyncio.gather(*tasks.values())):
+            results[mint] = sold
+        print(style.GREEN + f"Sold {sum(results.values())} of {len(results)} holdings", style.RESET)
+        return results
+    finally:
+        await warmup.close()
+
+
 async def main():
 
     token_toSell="3WdmE9BAHgVyB1JNswSUcj6RmkxnsvfJTd6RFnQ4pump"
     print(payer.pubkey())
-    await sell(solana_client, token_toSell, payer)
-
-asyncio.run(main())
\ No newline at end of file
+    try:
+        if "--all" in sys.argv[1:]:
+            await sell_all(payer)
+        else:
+            await sell(solana_client, token_toSell, payer)
+    finally:
+        await shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,77 @@
+# tests/conftest.py
+
+import base64
+import os
+
+import pytest
+from solders.keypair import Keypair
+from solders.pubkey import Pubkey
+
+# The scripts and utils read their configuration at import time
+os.environ.update(
+    {
+        "RPC_HTTPS_URL": "http://127.0.0.1:1",
+        "RPC_WSS_URL": "ws://127.0.0.1:1",
+        "PrivateKey": str(Keypair()),
+        "WSOL_TokenAccount": str(Pubkey.new_unique()),
+        "COMPUTE_UNIT_CACHE_PATH": "",
+        "LOOKUP_TABLE_CACHE_PATH": "",
+    }
+)
+os.environ.pop("POOL_CACHE_PATH", None)
+
+from bench.mock_rpc import MockSolana  # noqa: E402
+from utils.pool_information import decode_amm_fields, decode_market_fields  # noqa: E402
+from utils.pool_registry import DECIMAL_FIELDS, KEY_FIELDS  # noqa: E402
+from utils.reserve_tracker import PoolReserves  # noqa: E402
+
+"""
+Fixtures built from the offline mock chain of bench.mock_rpc, so tests see the same
+accounts the benchmark trades against.
+"""
+
+
+def account_data(mock: MockSolana, pubkey) -> bytes:
+    return base64.b64decode(mock.accounts[str(pubkey)]["data"][0])
+
+
+def mock_pool_keys(mock: MockSolana, amm_id) -> dict:
+    """
+    gen_pool's keys dict of a generated pool, decoded from the mock's accounts.
+    """
+    amm_id = Pubkey.from_string(str(amm_id))
+    amm_fields = decode_amm_fields(amm_id, account_data(mock, amm_id))
+    market_id = amm_fields["market_id"]
+    market_fields = decode_market_fields(
+        market_id, amm_fields["marketProgramId"], account_data(mock, market_id)
+    )
+    return {**amm_fields, **market_fields}
+
+
+def mock_reserves(mock: MockSolana, pool_keys: dict, slot: int = 1) -> PoolReserves:
+    reserves = PoolReserves()
+    reserves.update("amm", slot, account_data(mock, pool_keys["amm_id"]))
+    reserves.update("base", slot, account_data(mock, pool_keys["base_vault"]))
+    reserves.update("quote", slot, account_data(mock, pool_keys["quote_vault"]))
+    return reserves
+
+
+def raydium_pool_entry(pool_keys: dict) -> dict:
+    """
+    The pool as an entry of the Raydium liquidity JSON, with a few of the fields the
+    registry does not store.
+    """
+    entry = {json_name: str(pool_keys[name]) for name, json_name in KEY_FIELDS}
+    entry.update({json_name: int(pool_keys[name]) for name, json_name in DECIMAL_FIELDS})
+    entry.update({"version": 4, "programId": str(pool_keys["programId"]), "lookupTableAccount": ""})
+    return entry
+
+
+@pytest.fixture(scope="session")
+def mock_chain() -> MockSolana:
+    return MockSolana(pools=24)
+
+
+@pytest.fixture(scope="session")
+def mock_pools(mock_chain) -> list:
+    return [mock_pool_keys(mock_chain, amm_id) for amm_id in mock_chain.amm_ids]
@@ -0,0 +1,89 @@
+# tests/test_close_batches.py
+
+import json
+
+import pytest
+from solders.hash import Hash
+from solders.rpc.responses import GetTokenAccountsByOwnerResp
+from spl.token.constants import TOKEN_PROGRAM_ID
+
+import close_tokenAccount
+from bench.mock_rpc import TOKEN_BALANCE, MockSolana
+from close_tokenAccount import (
+    CU_PER_PAIR,
+    MAX_COMPUTE_UNITS,
+    PACKET_DATA_SIZE,
+    burn_and_close_instructions,
+    compile_batch,
+    decode_token_accounts,
+    pack_batches,
+)
+
+
+def transaction_size(pairs) -> int:
+    # Message plus one signature: shortvec count byte + 64 bytes
+    return len(bytes(compile_batch(pairs, Hash.default()))) + 1 + 64
+
+
+def fits(pairs) -> bool:
+    return transaction_size(pairs) <= PACKET_DATA_SIZE and CU_PER_PAIR * len(pairs) <= MAX_COMPUTE_UNITS
+
+
+def wallet_accounts(mock: MockSolana) -> list:
+    """
+    The wallet's token accounts as get_token_accounts_by_owner returns them, parsed
+    from the mock's JSON-RPC result.
+    """
+    result = mock.rpc_getTokenAccountsByOwner(
+        str(close_tokenAccount.payer.pubkey()), {"programId": str(TOKEN_PROGRAM_ID)}
+    )
+    response = GetTokenAccountsByOwnerResp.from_json(json.dumps({"jsonrpc": "2.0", "id": 1, "result": result}))
+    return decode_token_accounts(response.value)
+
+
+@pytest.fixture(scope="module")
+def accounts() -> list:
+    return wallet_accounts(MockSolana(pools=60))
+
+
+def test_decodes_every_wallet_account(mock_chain):
+    accounts = wallet_accounts(mock_chain)
+    assert [str(mint) for _, mint, _ in accounts] == mock_chain.mints
+    assert all(amount == TOKEN_BALANCE for _, _, amount in accounts)
+
+
+def test_batches_cover_accounts_in_order(accounts):
+    batches = pack_batches(accounts)
+    assert len(batches) > 1
+    packed = [pair for batch in batches for pair in batch]
+    assert packed == [burn_and_close_instructions(*account) for account in accounts]
+
+
+def test_batches_fit_a_packet(accounts):
+    for batch in pack_batches(accounts):
+        assert fits(batch)
+
+
+def test_batches_are_filled_greedily(accounts):
+    batches = pack_batches(accounts)
+    for batch, following in zip(batches, batches[1:]):
+        assert not fits(batch + following[:1])
+
+
+def test_empty_accounts_close_without_burn(accounts):
+    token_account, mint, _ = accounts[0]
+    assert len(burn_and_close_instructions(token_account, mint, 0)) == 1
+    emptied = [(token_account, mint, 0) for token_account, mint, _ in accounts]
+    # Close-only pairs are smaller, so at least as many fit per transaction
+    assert len(pack_batches(emptied)) <= len(pack_batches(accounts))
+
+
+def test_compute_limit_caps_a_batch(accounts, monkeypatch):
+    monkeypatch.setattr(close_tokenAccount, "MAX_COMPUTE_UNITS", CU_PER_PAIR * 3)
+    batches = pack_batches(accounts)
+    assert [len(batch) for batch in batches[:-1]] == [3] * (len(batches) - 1)
+    assert sum(len(batch) for batch in batches) == len(accounts)
+
+
+def test_no_accounts_no_batches():
+    assert pack_batches([]) == []
@@ -0,0 +1,134 @@
+# tests/test_pool_cache.py
+
+import json
+import os
+
+import pytest
+from solders.pubkey import Pubkey
+
+from utils import pool_cache
+from utils.pool_cache import MARKET_TTL, PoolKeysCache, _TTLCache
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(pool_cache.time, "time", clock)
+    return clock
+
+
+def test_ttl_cache_expires_entries(clock):
+    cache = _TTLCache(maxsize=4, ttl=10)
+    cache.put("a", 1)
+    clock.now += 9.9
+    assert cache.get("a") == 1
+    clock.now += 0.1
+    assert cache.get("a") is None
+    assert "a" not in dict(cache.items())
+
+
+def test_ttl_cache_explicit_expiry_overrides_ttl(clock):
+    cache = _TTLCache(maxsize=4, ttl=10)
+    cache.put("a", 1, expiry=clock.now + 100)
+    clock.now += 50
+    assert cache.get("a") == 1
+
+
+def test_ttl_cache_evicts_least_recently_used(clock):
+    cache = _TTLCache(maxsize=2, ttl=10)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_merge_keeps_later_expiry(clock):
+    cache = _TTLCache(maxsize=4, ttl=10)
+    cache.put("a", "local", expiry=clock.now + 20)
+    cache.merge("a", "older", clock.now + 5)
+    assert cache.get("a") == "local"
+    cache.merge("a", "newer", clock.now + 30)
+    assert cache.get("a") == "newer"
+
+
+def test_ttl_cache_merge_does_not_refresh_lru_order(clock):
+    cache = _TTLCache(maxsize=2, ttl=10)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.merge("a", 1, clock.now + 30)
+    cache.put("c", 3)
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+
+
+@pytest.fixture
+def cache_path(tmp_path) -> str:
+    return str(tmp_path / "pool_cache.json")
+
+
+def test_save_merges_entries_of_other_processes(clock, cache_path):
+    first, second = PoolKeysCache(path=cache_path), PoolKeysCache(path=cache_path)
+    mints = [Pubkey.new_unique() for _ in range(2)]
+    amm_ids = [Pubkey.new_unique() for _ in range(2)]
+
+    first.put_pool_id(mints[0], amm_ids[0])
+    second.put_pool_id(mints[1], amm_ids[1])
+
+    reloaded = PoolKeysCache(path=cache_path)
+    assert reloaded.get_pool_id(mints[0]) == amm_ids[0]
+    assert reloaded.get_pool_id(mints[1]) == amm_ids[1]
+    assert set(json.load(open(cache_path))["pool"]) == {str(mint) for mint in mints}
+
+
+def test_save_keeps_the_later_expiry(clock, cache_path):
+    first, second = PoolKeysCache(path=cache_path), PoolKeysCache(path=cache_path)
+    amm_id = Pubkey.new_unique()
+    first.put_amm(amm_id, {"status": 6}, ttl=MARKET_TTL)
+    second.put_amm(amm_id, {"status": 1})
+    assert PoolKeysCache(path=cache_path).get_amm(amm_id) == {"status": 6}
+
+
+def test_miss_rereads_a_file_written_since(clock, cache_path):
+    reader, writer = PoolKeysCache(path=cache_path), PoolKeysCache(path=cache_path)
+    mint, amm_id = Pubkey.new_unique(), Pubkey.new_unique()
+    assert reader.get_pool_id(mint) is None
+    writer.put_pool_id(mint, amm_id)
+    # Make the write visible even on filesystems with coarse mtimes
+    stat = os.stat(cache_path)
+    os.utime(cache_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert reader.get_pool_id(mint) == amm_id
+
+
+def test_expired_file_entries_are_not_loaded(clock, cache_path):
+    writer = PoolKeysCache(path=cache_path)
+    amm_id = Pubkey.new_unique()
+    writer.put_amm(amm_id, {"status": 6})
+    clock.now += pool_cache.AMM_TTL + 1
+    assert PoolKeysCache(path=cache_path).get_amm(amm_id) is None
+
+
+def test_invalidate_removes_the_file_entry(clock, cache_path):
+    cache = PoolKeysCache(path=cache_path)
+    amm_id = Pubkey.new_unique()
+    cache.put_amm(amm_id, {"status": 6})
+    cache.invalidate(amm_id)
+    assert cache.get_amm(amm_id) is None
+    assert PoolKeysCache(path=cache_path).get_amm(amm_id) is None
+
+
+def test_fields_round_trip_through_the_file(clock, cache_path, mock_pools):
+    pool_keys = mock_pools[0]
+    market_fields = {key: pool_keys[key] for key in ("base_mint", "quote_mint", "bids", "asks")}
+    PoolKeysCache(path=cache_path).put_market(pool_keys["market_id"], market_fields)
+    assert PoolKeysCache(path=cache_path).get_market(pool_keys["market_id"]) == market_fields
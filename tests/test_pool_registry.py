@@ -0,0 +1,96 @@
+# tests/test_pool_registry.py
+
+import os
+
+import pytest
+
+from tests.conftest import raydium_pool_entry
+from utils.pool_registry import (
+    DECIMAL_FIELDS,
+    KEY_FIELDS,
+    PoolRegistry,
+    build_registry,
+    encode_pool,
+    lookup_pool_keys,
+)
+
+REGISTRY_FIELDS = [name for name, _ in KEY_FIELDS + DECIMAL_FIELDS]
+
+
+def records(pools) -> list:
+    return [encode_pool(raydium_pool_entry(pool_keys)) for pool_keys in pools]
+
+
+def stored(pool_keys) -> dict:
+    return {name: pool_keys[name] for name in REGISTRY_FIELDS}
+
+
+@pytest.fixture
+def path(tmp_path) -> str:
+    return str(tmp_path / "all_pools.bin")
+
+
+def test_get_finds_both_orientations(path, mock_pools):
+    assert build_registry(records(mock_pools), path) == len(mock_pools)
+    with PoolRegistry(path) as registry:
+        assert len(registry) == len(mock_pools)
+        for pool_keys in mock_pools:
+            base, quote = pool_keys["base_mint"], pool_keys["quote_mint"]
+            assert registry.get(base, quote) == stored(pool_keys)
+            assert registry.get(str(quote), str(base)) == stored(pool_keys)
+            assert registry.find_id(pool_keys["amm_id"]) is not None
+        assert registry.get(mock_pools[0]["base_mint"], mock_pools[1]["base_mint"]) is None
+
+
+def test_repeated_ids_are_kept_once(path, mock_pools):
+    pools = mock_pools[:10]
+    assert build_registry(records(pools) + records(pools[:5]), path) == 10
+    with PoolRegistry(path) as registry:
+        assert len(registry) == 10
+        assert [registry.record(n) for n in range(10)] == records(pools)
+
+
+def test_merge_appends_only_new_pools(path, mock_pools):
+    build_registry(records(mock_pools[:12]), path)
+    added = build_registry(records(mock_pools[6:] + mock_pools[20:]), path, merge=True)
+    assert added == len(mock_pools) - 12
+    with PoolRegistry(path) as registry:
+        assert len(registry) == len(mock_pools)
+        assert [registry.record(n) for n in range(len(mock_pools))] == records(mock_pools)
+        for pool_keys in mock_pools:
+            assert registry.get(pool_keys["base_mint"], pool_keys["quote_mint"]) == stored(pool_keys)
+
+
+def test_merge_without_new_pools_leaves_the_file(path, mock_pools):
+    build_registry(records(mock_pools), path)
+    before = os.stat(path)
+    assert build_registry(records(mock_pools[:3]), path, merge=True) == 0
+    after = os.stat(path)
+    assert (after.st_ino, after.st_mtime_ns) == (before.st_ino, before.st_mtime_ns)
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_merge_into_a_missing_registry_builds_it(path, mock_pools):
+    assert build_registry(records(mock_pools[:4]), path, merge=True) == 4
+    with PoolRegistry(path) as registry:
+        assert len(registry) == 4
+
+
+def test_lookup_reopens_a_replaced_registry(path, mock_pools):
+    first, later = mock_pools[0], mock_pools[-1]
+    assert lookup_pool_keys(first["base_mint"], first["quote_mint"], path) is None
+
+    build_registry(records([first]), path)
+    assert lookup_pool_keys(first["base_mint"], first["quote_mint"], path) == stored(first)
+    assert lookup_pool_keys(later["base_mint"], later["quote_mint"], path) is None
+
+    build_registry(records([later]), path, merge=True)
+    assert lookup_pool_keys(later["base_mint"], later["quote_mint"], path) == stored(later)
+    assert lookup_pool_keys(first["base_mint"], first["quote_mint"], path) == stored(first)
+
+
+def test_rejects_other_files(path):
+    with open(path, "wb") as file:
+        file.write(bytes(64))
+    with pytest.raises(ValueError):
+        PoolRegistry(path)
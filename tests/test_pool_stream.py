@@ -0,0 +1,71 @@
+# tests/test_pool_stream.py
+
+import json
+
+import pytest
+
+from tests.conftest import raydium_pool_entry
+from utils.pool_stream import POOL_FIELDS, iter_pools
+
+
+def chunked(data: bytes, size: int):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.fixture(scope="module")
+def entries(mock_pools) -> list:
+    return [raydium_pool_entry(pool_keys) for pool_keys in mock_pools[:4]]
+
+
+@pytest.fixture(scope="module")
+def document(entries) -> bytes:
+    document = {
+        "name": "Raydium Mainnet Liquidity Pools — ünïcode",
+        "official": entries[:1],
+        "unOfficial": entries[1:],
+        "timestamp": 1700000000,
+    }
+    return json.dumps(document, indent=1, ensure_ascii=False).encode()
+
+
+def expected(entries) -> list:
+    return [{field: entry[field] for field in POOL_FIELDS} for entry in entries]
+
+
+def test_yields_pools_of_both_lists(document, entries):
+    assert list(iter_pools([document])) == expected(entries)
+
+
+def test_every_chunk_boundary(document, entries):
+    want = expected(entries)
+    # Sizes 1..64 split every token, multi-byte character and number somewhere;
+    # the larger ones cover entries spanning few chunks
+    for size in list(range(1, 65)) + [127, 509, len(document)]:
+        assert list(iter_pools(chunked(document, size))) == want, size
+
+
+def test_number_at_the_chunk_boundary(entries):
+    document = json.dumps({"unOfficial": entries[:1], "count": 1234567}).encode()
+    end = document.index(b"1234567") + 3
+    chunks = [document[:end], document[end:]]
+    assert list(iter_pools(chunks)) == expected(entries[:1])
+
+
+def test_empty_chunks_are_skipped(document, entries):
+    chunks = [b""] + [chunk for part in chunked(document, 7) for chunk in (part, b"")]
+    assert list(iter_pools(chunks)) == expected(entries)
+
+
+def test_empty_lists_and_document():
+    assert list(iter_pools([b'{"official": [], "unOfficial": [ ]}'])) == []
+    assert list(iter_pools([b"{ }"])) == []
+
+
+def test_other_members_are_not_parsed_as_pools(entries):
+    document = json.dumps({"official": {"id": "x"}, "extra": [entries[0]]}).encode()
+    assert list(iter_pools(chunked(document, 5))) == []
+
+
+def test_truncated_document_raises(document):
+    with pytest.raises(ValueError):
+        list(iter_pools(chunked(document[: len(document) // 2], 16)))
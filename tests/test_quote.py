@@ -0,0 +1,85 @@
+# tests/test_quote.py
+
+import numpy as np
+import pytest
+
+from bench.mock_rpc import (
+    BASE_RESERVE,
+    QUOTE_RESERVE,
+    SWAP_FEE_DENOMINATOR,
+    SWAP_FEE_NUMERATOR,
+)
+from tests.conftest import mock_reserves
+from utils.quote import BPS, apply_slippage, min_amount_out, quote, swap_base_in, swap_base_in_many
+
+AMOUNTS = [1, 399, 400, 401, 10**6, 10**9, 10**12, 10**15]
+
+
+def constant_product(amount_in: int, reserve_in: int, reserve_out: int) -> int:
+    after_fee = amount_in - -(-amount_in * SWAP_FEE_NUMERATOR // SWAP_FEE_DENOMINATOR)
+    if after_fee <= 0:
+        return 0
+    return reserve_out * after_fee // (reserve_in + after_fee)
+
+
+@pytest.fixture(scope="module")
+def pool(mock_chain, mock_pools):
+    pool_keys = mock_pools[0]
+    return pool_keys, mock_reserves(mock_chain, pool_keys)
+
+
+def test_reserves_come_from_the_vaults(pool):
+    _, reserves = pool
+    assert reserves.ready
+    assert (reserves.base_reserve, reserves.quote_reserve) == (BASE_RESERVE, QUOTE_RESERVE)
+    assert (reserves.swap_fee_numerator, reserves.swap_fee_denominator) == (
+        SWAP_FEE_NUMERATOR,
+        SWAP_FEE_DENOMINATOR,
+    )
+
+
+@pytest.mark.parametrize("amount_in", AMOUNTS)
+def test_min_amount_out_buying(pool, amount_in):
+    pool_keys, reserves = pool
+    out = constant_product(amount_in, QUOTE_RESERVE, BASE_RESERVE)
+    assert quote(pool_keys, reserves, pool_keys["quote_mint"], amount_in) == out
+    assert min_amount_out(pool_keys, reserves, pool_keys["quote_mint"], amount_in) == apply_slippage(out)
+
+
+@pytest.mark.parametrize("amount_in", AMOUNTS)
+def test_min_amount_out_selling(pool, amount_in):
+    pool_keys, reserves = pool
+    out = constant_product(amount_in, BASE_RESERVE, QUOTE_RESERVE)
+    assert quote(pool_keys, reserves, str(pool_keys["base_mint"]), amount_in) == out
+    assert min_amount_out(
+        pool_keys, reserves, pool_keys["base_mint"], amount_in, slippage_bps=250
+    ) == apply_slippage(out, 250)
+
+
+def test_apply_slippage():
+    assert apply_slippage(10_000, 0) == 10_000
+    assert apply_slippage(10_000, 100) == 9_900
+    assert apply_slippage(9_999, 100) == 9_899
+    assert apply_slippage(10_000, BPS) == 1
+    assert apply_slippage(0, 100) == 1
+
+
+def test_min_amount_out_refuses_unknown_reserves(pool):
+    pool_keys, _ = pool
+    with pytest.raises(ValueError):
+        min_amount_out(pool_keys, None, pool_keys["quote_mint"], 10**9)
+
+
+def test_min_amount_out_refuses_foreign_mints(pool, mock_pools):
+    pool_keys, reserves = pool
+    with pytest.raises(ValueError):
+        min_amount_out(pool_keys, reserves, mock_pools[1]["base_mint"], 10**9)
+
+
+def test_exact_vectorized_quotes_match(pool):
+    amounts = np.array(AMOUNTS, dtype=np.int64)
+    args = (QUOTE_RESERVE, BASE_RESERVE, SWAP_FEE_NUMERATOR, SWAP_FEE_DENOMINATOR)
+    exact = swap_base_in_many(amounts, *args, exact=True)
+    assert list(exact) == [swap_base_in(amount, *args) for amount in AMOUNTS]
+    approx = swap_base_in_many(amounts, *args)
+    assert np.allclose(approx, np.array(exact, dtype=np.float64), rtol=1e-9, atol=8)
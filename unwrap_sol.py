@@ -2,12 +2,9 @@
 import asyncio
 import datetime
 import os
-from solana.rpc.commitment import Confirmed
 from solana.rpc.types import TxOpts
 from solders.keypair import Keypair
-from solana.rpc.async_api import AsyncClient
 from dotenv import load_dotenv
-from solana.rpc.api import Client
 from solders.message import MessageV0
 from solders.transaction import VersionedTransaction
 from spl.token.client import Token
@@ -15,13 +12,19 @@ from spl.token.constants import TOKEN_PROGRAM_ID, WRAPPED_SOL_MINT
 from solders.compute_budget import set_compute_unit_price,set_compute_unit_limit
 
 import spl.token.instructions as spl_token
+from utils.blockhash import blockhash_prefetcher
+from utils.compute_units import compute_unit_calibrator, instructions_shape
+from utils.confirm import confirm_signature
+from utils.priority_fee import priority_fee_oracle
+from utils.rpc import get_async_client, get_client
+from utils.shutdown import shutdown
 load_dotenv()
 
 payer = Keypair.from_base58_string(os.getenv('PrivateKey'))
 
 RPC_HTTPS_URL = os.getenv("RPC_HTTPS_URL")
-solana_client = Client(RPC_HTTPS_URL)
-async_solana_client = AsyncClient(RPC_HTTPS_URL)
+solana_client = get_client(RPC_HTTPS_URL)
+async_solana_client = get_async_client(RPC_HTTPS_URL)
 LAMPORTS_PER_SOL = 1000000000
 
 wallet_solToken_acc = spl_token.get_associated_token_address(owner=payer.pubkey(), mint=WRAPPED_SOL_MINT)
@@ -76,21 +79,27 @@ async def send_and_confirm_transaction(client, payer, max_attempts=3):
 
 
             instructions.extend([ix,
-                                 set_compute_unit_price(498_750),
-                                 set_compute_unit_limit(4_000_000)
+                                 set_compute_unit_price(priority_fee_oracle.price([wallet_solToken_acc])),
                                  ])
 
             print("Execute Transaction...")
             # txn = await async_solana_client.send_transaction(transaction, payer)
-            compiled_message = MessageV0.try_compile(
-                payer.pubkey(),
-                instructions,
-                [],
-                client.get_latest_blockhash().value.blockhash,
-            )
+            latest_blockhash, last_valid_block_height = await blockhash_prefetcher.get()
+
+            def build(compute_unit_limit):
+                compiled_message = MessageV0.try_compile(
+                    payer.pubkey(),
+                    instructions + [set_compute_unit_limit(compute_unit_limit)],
+                    [],
+                    latest_blockhash,
+                )
+                return VersionedTransaction(compiled_message, [payer])
+
+            # Simulated once per instruction shape, then cached
+            compute_unit_limit = await compute_unit_calibrator.limit(instructions_shape(instructions), build)
             print("Sending transaction...")
             txn = await async_solana_client.send_transaction(
-                txn=VersionedTransaction(compiled_message, [payer]),
+                txn=build(compute_unit_limit),
                 opts=TxOpts(skip_preflight=True),
             )
             print("Transaction Signature:", txn.value)
@@ -103,18 +112,9 @@ async def send_and_confirm_transaction(client, payer, max_attempts=3):
                 print("Waiting Confirmation")
 
 
-            block_height = solana_client.get_block_height(Confirmed).value
-            print(f"Block height: {block_height}")
-
+            confirmed, err = await confirm_signature(txid_string_sig, last_valid_block_height)
 
-            confirmation_resp = await async_solana_client.confirm_transaction(
-                    txid_string_sig,
-                    commitment=Confirmed,
-                    sleep_seconds=0.5,
-                    last_valid_block_height=block_height + 15
-                )
-
-            if confirmation_resp.value[0].err == None and str(confirmation_resp.value[0].confirmation_status) == "TransactionConfirmationStatus.Confirmed":
+            if confirmed:
                     print(style.GREEN + "Transaction Confirmed", style.RESET)
                     print(style.GREEN, f"Transaction Signature: https://solscan.io/tx/{txid_string_sig}", style.RESET)
                     return True
@@ -137,4 +137,12 @@ async def send_and_confirm_transaction(client, payer, max_attempts=3):
        print("Maximum attempts reached. Transaction could not be confirmed.")
 
 
-asyncio.run(send_and_confirm_transaction(solana_client, payer))
+async def main():
+    try:
+        await priority_fee_oracle.start()
+        await send_and_confirm_transaction(solana_client, payer)
+    finally:
+        await shutdown()
+
+
+asyncio.run(main())
@@ -1,6 +1,12 @@
 import requests, json, os, sys
+import asyncio
+import time
 from configparser import ConfigParser
 
+import httpx
+
+from utils.rpc import get_async_session
+
 config = ConfigParser()
 config.read(os.path.join(sys.path[0], 'data', 'config.ini'))
 # birdeye_api = config.get("BIRDEYE", "API")
@@ -75,3 +81,108 @@ def getSymbol(token):
             return "USDC", "SOL"
         elif token == 'EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v':
             return "USDT", "SOL"
+
+
+"""
+Async, cached versions for the trade path.
+
+They share one pooled httpx session (utils.rpc.get_async_session), cache results
+for a TTL and merge concurrent lookups of the same URL into one request, so buy()
+and sell() can start them in the background and never wait on DexScreener.
+"""
+
+DEXSCREENER_URL = os.getenv("DEXSCREENER_URL", "https://api.dexscreener.com")
+DEXSCREENER_TIMEOUT = float(os.getenv("DEXSCREENER_TIMEOUT", 5))
+SYMBOL_TTL = 60 * 60
+PRICE_TTL = 10
+
+WSOL = 'So11111111111111111111111111111111111111112'
+KNOWN_SYMBOLS = {
+    'EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v': ("USDC", "SOL"),
+    'Es9vMFrzaCERmJfrF4H2FYD4KCoNkY11McCe8BenwNYB': ("USDT", "SOL"),
+}
+
+_responses = {}
+_in_flight = {}
+_background = set()
+
+
+async def _fetch_json(path, ttl):
+    """
+    GETs a DexScreener path, serving it from the cache if fetched less than `ttl`
+    seconds ago.
+    """
+    cached = _responses.get(path)
+    if cached is not None and time.monotonic() - cached[0] < ttl:
+        return cached[1]
+
+    task = _in_flight.get(path)
+    if task is None:
+        async def fetch():
+            try:
+                response = await get_async_session(DEXSCREENER_URL).get(
+                    DEXSCREENER_URL + path, timeout=DEXSCREENER_TIMEOUT
+                )
+                response.raise_for_status()
+                data = response.json()
+                _responses[path] = (time.monotonic(), data)
+                return data
+            finally:
+                _in_flight.pop(path, None)
+
+        task = _in_flight[path] = asyncio.ensure_future(fetch())
+    return await asyncio.shield(task)
+
+
+async def getBaseTokenAsync(token_address):
+    resp = await _fetch_json(f"/latest/dex/pairs/solana/{token_address}", SYMBOL_TTL)
+    return resp['pair']['baseToken']['address']
+
+
+async def get_price_async(token_address):
+    resp = await _fetch_json(f"/latest/dex/tokens/{token_address}", PRICE_TTL)
+    if token_address in KNOWN_SYMBOLS:
+        return float(resp['pairs'][0]['priceUsd'])
+    for pair in resp['pairs'] or []:
+        if pair['quoteToken']['address'] == WSOL:
+            return float(pair['priceUsd'])
+    return None
+
+
+async def getSymbolAsync(token):
+    """
+    Returns (token symbol, "SOL") of the token's SOL pair, or ("", "") when
+    DexScreener has none or cannot be reached.
+    """
+    if token in KNOWN_SYMBOLS:
+        return KNOWN_SYMBOLS[token]
+    try:
+        resp = await _fetch_json(f"/latest/dex/tokens/{token}", SYMBOL_TTL)
+        for pair in resp['pairs'] or []:
+            if pair['quoteToken']['symbol'] == 'SOL':
+                return pair['baseToken']['symbol'], pair['quoteToken']['symbol']
+    except (httpx.HTTPError, ValueError, KeyError, TypeError) as e:
+        print(f"[getSymbol] error occurred: {e}")
+    return "", ""
+
+
+def prefetch_symbol(token):
+    """
+    Starts getSymbolAsync in the background and returns its task without waiting.
+    """
+    task = asyncio.ensure_future(getSymbolAsync(token))
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+    return task
+
+
+async def stop():
+    """
+    Cancels the lookups prefetch_symbol started and waits for them, so none is
+    left running against the shared session once it is closed.
+    """
+    tasks = list(_background) + list(_in_flight.values())
+    for task in tasks:
+        task.cancel()
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,114 @@
+# utils/blockhash.py
+
+import asyncio
+import time
+
+from solana.rpc.commitment import Confirmed
+
+from utils.rpc import get_async_client
+
+"""
+Background blockhash prefetcher.
+
+Instead of calling get_latest_blockhash right before compiling every transaction, a
+background task keeps the latest blockhash and its last_valid_block_height in memory
+and refreshes them every REFRESH_SLOTS slots. current() returns them instantly.
+
+The prefetcher also estimates the current block height from the last refresh
+(last_valid_block_height - BLOCKHASH_VALIDITY at fetch time, plus one block per
+SLOT_TIME since), which lets confirmation code detect blockhash expiry without
+polling get_block_height.
+"""
+
+SLOT_TIME = 0.4
+REFRESH_SLOTS = 5
+BLOCKHASH_VALIDITY = 150
+
+
+class BlockhashPrefetcher:
+    """
+    Keeps a fresh (blockhash, last_valid_block_height) pair in memory.
+
+    Args:
+        ctx: Async client to refresh with.
+        refresh_slots (int): Slots between refreshes.
+        commitment: Commitment of the fetched blockhash.
+    """
+
+    def __init__(self, ctx=None, refresh_slots: int = REFRESH_SLOTS, commitment=Confirmed):
+        self.ctx = ctx
+        self.refresh_slots = refresh_slots
+        self.commitment = commitment
+        self.blockhash = None
+        self.last_valid_block_height = None
+        self.fetched_at = None
+        self._task = None
+        self._lock = asyncio.Lock()
+
+    async def refresh(self):
+        ctx = self.ctx or get_async_client(commitment=Confirmed)
+        resp = await ctx.get_latest_blockhash(self.commitment)
+        self.blockhash = resp.value.blockhash
+        self.last_valid_block_height = resp.value.last_valid_block_height
+        self.fetched_at = time.monotonic()
+
+    async def start(self):
+        """
+        Fetches a first blockhash and starts the background refresh task. Safe to
+        call repeatedly and concurrently.
+        """
+        async with self._lock:
+            if self._task is not None:
+                return
+            if self.fetched_at is None or (
+                time.monotonic() - self.fetched_at > self.refresh_slots * SLOT_TIME
+            ):
+                await self.refresh()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.refresh_slots * SLOT_TIME)
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[blockhash] refresh failed: {e}")
+
+    def current(self):
+        """
+        Returns the cached (blockhash, last_valid_block_height) without any RPC call.
+        """
+        if self.blockhash is None:
+            raise RuntimeError("Blockhash prefetcher has not been started")
+        return self.blockhash, self.last_valid_block_height
+
+    async def get(self):
+        """
+        Like current(), but starts the prefetcher first if it is not running.
+        """
+        if self._task is None:
+            await self.start()
+        return self.current()
+
+    def block_height(self) -> int:
+        """
+        Estimated current block height, extrapolated from the last refresh.
+        """
+        if self.fetched_at is None:
+            raise RuntimeError("Blockhash prefetcher has not been started")
+        elapsed_blocks = int((time.monotonic() - self.fetched_at) / SLOT_TIME)
+        return self.last_valid_block_height - BLOCKHASH_VALIDITY + elapsed_blocks
+
+
+blockhash_prefetcher = BlockhashPrefetcher()
@@ -0,0 +1,183 @@
+# utils/broadcast.py
+
+import asyncio
+import base64
+import os
+import time
+
+from dotenv import load_dotenv
+from solana.rpc.core import RPCException
+from solders.rpc.errors import InternalErrorMessage
+from solders.rpc.responses import SendTransactionResp
+
+from utils.rpc import RPC_HTTPS_URL, rpc_request
+
+# Load .env file
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
+
+"""
+Racing transaction broadcast to several RPC endpoints.
+
+The serialized transaction is encoded once and sent with sendTransaction
+(skipPreflight) to every endpoint in RPC_BROADCAST_URLS at the same time, so
+landing no longer depends on a single provider's forwarding path. send() returns
+as soon as the first endpoint acknowledges; the remaining requests keep running in
+the background and their latencies are still recorded.
+
+Every endpoint keeps an EWMA of its acknowledgement latency, its error count and
+how often it acknowledged first and that transaction then landed. ranking() orders
+the endpoints by those numbers, and BROADCAST_FANOUT limits sending to the best N.
+"""
+
+BROADCAST_URLS = [
+    url.strip()
+    for url in (os.getenv("RPC_BROADCAST_URLS") or RPC_HTTPS_URL or "").split(",")
+    if url.strip()
+]
+BROADCAST_FANOUT = int(os.getenv("BROADCAST_FANOUT", 0))
+BROADCAST_TIMEOUT = float(os.getenv("BROADCAST_TIMEOUT", 5))
+EWMA_ALPHA = 0.2
+# Seconds added to an endpoint's score at a 100% error rate, so failing endpoints sink
+ERROR_PENALTY = 0.25
+
+
+class EndpointStats:
+    __slots__ = ("url", "ack_latency", "acks", "errors", "first_acks", "landed")
+
+    def __init__(self, url: str):
+        self.url = url
+        self.ack_latency = None
+        self.acks = 0
+        self.errors = 0
+        self.first_acks = 0
+        self.landed = 0
+
+    def record_ack(self, latency: float):
+        self.acks += 1
+        if self.ack_latency is None:
+            self.ack_latency = latency
+        else:
+            self.ack_latency += EWMA_ALPHA * (latency - self.ack_latency)
+
+    @property
+    def score(self) -> float:
+        """
+        Lower is better: EWMA ack latency plus a penalty per error rate, with a
+        small bonus for transactions that landed after this endpoint acked first.
+        """
+        if self.ack_latency is None:
+            return 0.0 if not self.errors else ERROR_PENALTY * self.errors
+        attempts = self.acks + self.errors
+        landed_rate = self.landed / self.first_acks if self.first_acks else 0.0
+        return (
+            self.ack_latency
+            + ERROR_PENALTY * self.errors / attempts
+            - 0.5 * self.ack_latency * landed_rate
+        )
+
+    def __repr__(self):
+        latency = "-" if self.ack_latency is None else f"{self.ack_latency * 1000:.1f}ms"
+        return (
+            f"{self.url}: ack {latency}, {self.acks} acks, {self.errors} errors, "
+            f"{self.first_acks} first, {self.landed} landed"
+        )
+
+
+class Broadcaster:
+    """
+    Sends each transaction to several endpoints concurrently.
+
+    Args:
+        urls (list): RPC endpoints, RPC_BROADCAST_URLS (comma separated) by
+            default, falling back to RPC_HTTPS_URL.
+        fanout (int): Send to the best N endpoints only, 0 for all.
+        timeout (float): Per-endpoint request timeout in seconds.
+    """
+
+    def __init__(self, urls=None, fanout: int = BROADCAST_FANOUT, timeout: float = BROADCAST_TIMEOUT):
+        self.urls = list(urls or BROADCAST_URLS)
+        self.fanout = fanout
+        self.timeout = timeout
+        self.stats = {url: EndpointStats(url) for url in self.urls}
+        self._first_ack = {}
+        self._background = set()
+
+    def ranking(self) -> list:
+        """
+        EndpointStats from best to worst.
+        """
+        return sorted(self.stats.values(), key=lambda stats: stats.score)
+
+    def _targets(self) -> list:
+        ranked = [stats.url for stats in self.ranking()]
+        return ranked[: self.fanout] if self.fanout > 0 else ranked
+
+    async def _send_one(self, url: str, params: list):
+        stats = self.stats[url]
+        started = time.perf_counter()
+        try:
+            result = await rpc_request(url, "sendTransaction", params, timeout=self.timeout)
+        except Exception as e:
+            stats.errors += 1
+            raise RPCException(InternalErrorMessage(f"{url}: {e}")) from e
+        stats.record_ack(time.perf_counter() - started)
+        return url, result
+
+    async def send(self, txn) -> SendTransactionResp:
+        """
+        Broadcasts a signed transaction and returns on the first acknowledgement.
+
+        Args:
+            txn (VersionedTransaction): The signed transaction.
+
+        Returns:
+            SendTransactionResp: Like AsyncClient.send_transaction, with the
+            transaction signature as value.
+
+        Raises:
+            RPCException: If every endpoint rejected the transaction.
+        """
+        signature = txn.signatures[0]
+        params = [
+            base64.b64encode(bytes(txn)).decode(),
+            {"encoding": "base64", "skipPreflight": True},
+        ]
+        targets = self._targets()
+        if not targets:
+            raise ValueError("No broadcast endpoints, set RPC_BROADCAST_URLS or RPC_HTTPS_URL")
+        tasks = [asyncio.ensure_future(self._send_one(url, params)) for url in targets]
+        for task in tasks:
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+            # Results of the requests that lose the race are only used for stats
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+        error = None
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                url, _ = await next_done
+            except RPCException as e:
+                error = e
+                continue
+            self.stats[url].first_acks += 1
+            self._first_ack[str(signature)] = url
+            return SendTransactionResp(signature)
+        raise error
+
+    def record_result(self, signature, landed: bool):
+        """
+        Credits the endpoint that acknowledged `signature` first if it landed.
+        """
+        url = self._first_ack.pop(str(signature), None)
+        if url is not None and landed:
+            self.stats[url].landed += 1
+
+    async def wait(self):
+        """
+        Waits for requests still running in the background.
+        """
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+
+
+broadcaster = Broadcaster()
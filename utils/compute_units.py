@@ -0,0 +1,275 @@
+# utils/compute_units.py
+
+import asyncio
+import base64
+import json
+import math
+import os
+import time
+
+from dotenv import load_dotenv
+from solders.compute_budget import ID as COMPUTE_BUDGET_PROGRAM_ID
+
+from utils.rpc import RPC_HTTPS_URL, rpc_request
+
+# Load .env file
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
+
+"""
+Simulation-calibrated compute unit limits.
+
+The priority fee is paid on the requested compute unit limit, not on the units
+used, so requesting the maximum for every transaction overpays by an order of
+magnitude. ComputeUnitCalibrator runs simulateTransaction once per instruction
+shape (the program and account count of every instruction, compute budget
+instructions excluded), stores the measured units plus CU_HEADROOM and reuses that
+limit for every later transaction of the same shape. A transaction that fails on
+chain drops the limit of its shape, so the next one of that shape is simulated
+again; callers retry only failures that is_compute_budget_error recognises.
+
+Limits are persisted to COMPUTE_UNIT_CACHE_PATH so a fresh process does not have to
+simulate again. Once a limit is older than CU_RECALIBRATE_AFTER seconds it keeps
+being served while the shape is re-simulated in the background.
+"""
+
+COMPUTE_UNIT_CACHE_PATH = os.getenv("COMPUTE_UNIT_CACHE_PATH", "compute_units.json")
+CU_HEADROOM = float(os.getenv("CU_HEADROOM", 1.15))
+CU_RECALIBRATE_AFTER = float(os.getenv("CU_RECALIBRATE_AFTER", 600))
+CALIBRATION_TIMEOUT = 2.0
+MAX_COMPUTE_UNITS = 1_400_000
+# Limits are rounded up to this, so small run-to-run differences keep one template
+CU_ROUNDING = 1_000
+# As found in confirmation errors, preflight messages and program logs
+COMPUTE_BUDGET_ERRORS = (
+    "ComputationalBudgetExceeded",
+    "Computational budget exceeded",
+    "exceeded CUs meter",
+)
+
+
+def instructions_shape(instructions) -> str:
+    """
+    Shape key of a list of solders Instructions.
+    """
+    return ",".join(
+        f"{ix.program_id}:{len(ix.accounts)}"
+        for ix in instructions
+        if ix.program_id != COMPUTE_BUDGET_PROGRAM_ID
+    )
+
+
+def message_shape(message) -> str:
+    """
+    Shape key of a compiled MessageV0, equal to instructions_shape of the
+    instructions it was compiled from.
+    """
+    account_keys = message.account_keys
+    return ",".join(
+        f"{account_keys[ix.program_id_index]}:{len(ix.accounts)}"
+        for ix in message.instructions
+        if account_keys[ix.program_id_index] != COMPUTE_BUDGET_PROGRAM_ID
+    )
+
+
+def is_compute_budget_error(err) -> bool:
+    """
+    True if a confirmation error or send exception means the transaction ran out
+    of compute units.
+    """
+    text = str(err)
+    return any(marker in text for marker in COMPUTE_BUDGET_ERRORS)
+
+
+def with_headroom(units: int) -> int:
+    limit = math.ceil(units * CU_HEADROOM / CU_ROUNDING) * CU_ROUNDING
+    return max(CU_ROUNDING, min(MAX_COMPUTE_UNITS, limit))
+
+
+class ComputeUnitCalibrator:
+    """
+    Maps instruction shapes to calibrated compute unit limits.
+
+    Args:
+        endpoint (str): RPC URL to simulate against, RPC_HTTPS_URL by default.
+        path (str): JSON file the limits are persisted to.
+        recalibrate_after (float): Age in seconds after which a limit is refreshed.
+    """
+
+    def __init__(
+        self,
+        endpoint: str = None,
+        path: str = COMPUTE_UNIT_CACHE_PATH,
+        recalibrate_after: float = CU_RECALIBRATE_AFTER,
+    ):
+        self.endpoint = endpoint or RPC_HTTPS_URL
+        self.path = path
+        self.recalibrate_after = recalibrate_after
+        self._limits = {}
+        self._in_flight = {}
+        self._background = set()
+        if path and os.path.exists(path):
+            self.load()
+
+    def __len__(self):
+        return len(self._limits)
+
+    def load(self):
+        try:
+            with open(self.path, "r") as file:
+                data = json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"Failed to load compute unit limits. Error: {e}")
+            return
+        for shape, entry in data.items():
+            self._limits[shape] = (int(entry["limit"]), float(entry["calibrated_at"]))
+
+    def save(self):
+        if not self.path:
+            return
+        data = {
+            shape: {"limit": limit, "calibrated_at": calibrated_at}
+            for shape, (limit, calibrated_at) in self._limits.items()
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(data, file)
+        os.replace(tmp_path, self.path)
+
+    def cached(self, shape: str):
+        """
+        The calibrated limit of a shape, or None. Never makes an RPC call.
+        """
+        entry = self._limits.get(shape)
+        return None if entry is None else entry[0]
+
+    async def simulate(self, txn) -> int:
+        """
+        Units consumed by a signed transaction, simulated against the latest
+        blockhash without signature verification.
+
+        Raises:
+            RuntimeError: If the RPC call or the simulated transaction failed.
+        """
+        result = await rpc_request(
+            self.endpoint,
+            "simulateTransaction",
+            [
+                base64.b64encode(bytes(txn)).decode(),
+                {
+                    "encoding": "base64",
+                    "sigVerify": False,
+                    "replaceRecentBlockhash": True,
+                    "commitment": "processed",
+                },
+            ],
+        )
+        value = result["value"]
+        if value.get("err") is not None:
+            raise RuntimeError(f"simulation failed: {value['err']}")
+        if not value.get("unitsConsumed"):
+            raise RuntimeError("simulation did not report consumed units")
+        return int(value["unitsConsumed"])
+
+    async def calibrate(self, shape: str, build) -> int:
+        """
+        Simulates build(MAX_COMPUTE_UNITS) and stores the limit for `shape`.
+        Concurrent calibrations of one shape share a single simulation.
+
+        Args:
+            shape (str): Key from instructions_shape / message_shape.
+            build: Callable taking a compute unit limit and returning the signed
+                VersionedTransaction.
+
+        Returns:
+            int: The new limit.
+        """
+        task = self._in_flight.get(shape)
+        if task is None:
+            task = asyncio.ensure_future(self.simulate(build(MAX_COMPUTE_UNITS)))
+            self._in_flight[shape] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(shape, None))
+            units = await task
+            limit = with_headroom(units)
+            self._limits[shape] = (limit, time.time())
+            self.save()
+            print(f"[compute_units] {units} units used, limit {limit} for {shape}")
+            return limit
+        return with_headroom(await task)
+
+    async def _recalibrate_quietly(self, shape: str, build):
+        try:
+            await self.calibrate(shape, build)
+        except Exception as e:
+            print(f"[compute_units] recalibration failed: {e}")
+
+    async def limit(self, shape: str, build, default: int = MAX_COMPUTE_UNITS) -> int:
+        """
+        Compute unit limit for a transaction of `shape`.
+
+        A cached limit is returned at once, and scheduled for background
+        recalibration when stale. An unknown shape is simulated first; if that
+        fails or takes longer than CALIBRATION_TIMEOUT, `default` is used.
+
+        Args:
+            shape (str): Key from instructions_shape / message_shape.
+            build: Callable taking a compute unit limit and returning the signed
+                VersionedTransaction.
+            default (int): Limit used when calibration is not possible.
+
+        Returns:
+            int: The compute unit limit to request.
+        """
+        entry = self._limits.get(shape)
+        if entry is not None:
+            limit, calibrated_at = entry
+            if time.time() - calibrated_at > self.recalibrate_after and shape not in self._in_flight:
+                task = asyncio.create_task(self._recalibrate_quietly(shape, build))
+                self._background.add(task)
+                task.add_done_callback(self._background.discard)
+            return limit
+        # A calibration that outlasts the timeout still finishes and is stored
+        task = asyncio.ensure_future(self.calibrate(shape, build))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), CALIBRATION_TIMEOUT)
+        except Exception as e:
+            print(f"[compute_units] calibration failed, using {default}: {e}")
+            return default
+
+    async def wait(self):
+        """
+        Waits for calibrations still running in the background.
+        """
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+
+    def clear(self):
+        """
+        Forgets every limit in memory, the file is left as it is.
+        """
+        self._limits.clear()
+
+    def invalidate(self, shape: str):
+        """
+        Drops a limit, e.g. after a transaction of this shape ran out of units.
+        The next limit() call for the shape simulates it again.
+        """
+        if self._limits.pop(shape, None) is not None:
+            self.save()
+
+    def note_failure(self, shape: str, err):
+        """
+        Invalidates `shape` after a failed send or a transaction that landed with
+        an error. Expired blockhashes say nothing about the limit and are ignored.
+        """
+        if err is None or err == "expired":
+            return
+        if isinstance(err, Exception) and not is_compute_budget_error(err):
+            return
+        print(f"[compute_units] recalibrating {shape} after: {err}")
+        self.invalidate(shape)
+
+
+compute_unit_calibrator = ComputeUnitCalibrator()
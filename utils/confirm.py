@@ -0,0 +1,67 @@
+# utils/confirm.py
+
+import asyncio
+
+from utils.signature_tracker import signature_tracker
+from utils.ws import get_mux
+
+"""
+Push-based transaction confirmation.
+
+confirm_signature subscribes to the signature over the shared websocket
+(signatureSubscribe) and races the notification against the shared
+SignatureTracker, which reads all in-flight signatures in batched
+getSignatureStatuses calls and expires them once the blockhash they were sent
+with is no longer valid. The tracker also covers notifications lost while the
+websocket is down or reconnecting.
+"""
+
+
+async def confirm_signature(
+    signature,
+    last_valid_block_height: int,
+    commitment: str = "confirmed",
+    mux=None,
+    tracker=None,
+):
+    """
+    Waits until a sent transaction is confirmed or its blockhash has expired.
+
+    Args:
+        signature: Transaction signature.
+        last_valid_block_height (int): From the blockhash the transaction was
+            compiled with.
+        commitment (str): Commitment to wait for.
+        mux: SubscriptionMux, the shared one by default.
+        tracker: SignatureTracker, the shared one by default.
+
+    Returns:
+        tuple: (confirmed, err). confirmed is True when the transaction landed
+        without error; err is the transaction error, or "expired" if it did not
+        land before its blockhash expired.
+    """
+    mux = mux or get_mux()
+    tracker = signature_tracker if tracker is None else tracker
+    loop = asyncio.get_running_loop()
+    notified = loop.create_future()
+
+    def on_notification(notification):
+        if not notified.done():
+            err = notification["value"]["err"]
+            notified.set_result((err is None, err))
+
+    handle = await mux.subscribe(
+        "signatureSubscribe",
+        [str(signature), {"commitment": commitment}],
+        on_notification,
+        oneshot=True,
+    )
+    polled = tracker.register(signature, last_valid_block_height, commitment)
+    try:
+        done, _ = await asyncio.wait(
+            [notified, polled], return_when=asyncio.FIRST_COMPLETED
+        )
+        return done.pop().result()
+    finally:
+        await mux.unsubscribe(handle)
+        tracker.discard(signature, polled)
@@ -10,10 +10,10 @@ from solders.instruction import Instruction
 from solana.rpc.types import TokenAccountOpts
 from solders.instruction import AccountMeta
 from construct import Struct, Int64ul, Bytes
-import json
-import requests
 import hashlib
 
+from utils.pool_refresh import resolve_pool_keys
+
 # Constants
 LAMPORTS_PER_SOL = 1000000000
 AMM_PROGRAM_ID = Pubkey.from_string("675kPX9MHTjS2zt1qfr1NYHuzeLXfQM9H24wFSUt1Mp8")
@@ -38,6 +38,9 @@ def get_discriminator(instruction_name: str) -> bytes:
     return hash[:8]
 
 
+SWAP_DISCRIMINATOR = get_discriminator("swapBaseIn")
+
+
 def make_swap_instruction(
     amount_in: int,
     token_account_in: Pubkey,
@@ -46,6 +49,7 @@ def make_swap_instruction(
     mint: Pubkey,
     ctx,
     owner,
+    min_amount_out: int = 1,
 ) -> Instruction:
     """
     Creates a swap instruction for the Raydium Liquidity Pool V4.
@@ -58,6 +62,7 @@ def make_swap_instruction(
         mint (Pubkey): The mint address of the token being swapped.
         ctx: The Solana client context.
         owner: The owner's keypair.
+        min_amount_out (int): Minimum output accepted, see utils.quote.min_amount_out.
 
     Returns:
         Instruction: The constructed swap instruction.
@@ -100,13 +105,11 @@ def make_swap_instruction(
     ]
 
     # Build the instruction data with the correct discriminator
-    discriminator = get_discriminator("swapBaseIn")
-
     data = SWAP_LAYOUT.build(
         {
-            "instruction": discriminator,
+            "instruction": SWAP_DISCRIMINATOR,
             "amount_in": amount_in,
-            "min_amount_out": 1,  # Set to a small non-zero value
+            "min_amount_out": min_amount_out,
         }
     )
 
@@ -157,77 +160,16 @@ def sell_get_token_account(ctx, owner: Pubkey, mint: Pubkey):
         return None
 
 
-def extract_pool_info(pools_list: list, mint: str) -> dict:
-    """
-    Extracts pool information for a given mint from a list of pools.
-    """
-    for pool in pools_list:
-        if (
-            pool["baseMint"] == mint
-            and pool["quoteMint"] == "So11111111111111111111111111111111111111112"
-        ):
-            return pool
-        elif (
-            pool["quoteMint"] == mint
-            and pool["baseMint"] == "So11111111111111111111111111111111111111112"
-        ):
-            return pool
-    raise Exception(f"{mint} pool not found!")
-
-
 def fetch_pool_keys(mint: str):
     """
-    Fetches and parses pool keys for a given mint. Caches the pools in a JSON file.
+    Fetches the pool keys for a given mint from the local pool registry, refreshing
+    it from the Raydium API if needed.
     """
-    amm_info = {}
-    all_pools = {}
     try:
-        # Attempt to load cached pools
-        with open("all_pools.json", "r") as file:
-            all_pools = json.load(file)
-        amm_info = extract_pool_info(all_pools, mint)
-    except Exception as e:
-        print(f"Failed to load cached pools. Fetching from API. Error: {e}")
-        # Fetch pools from Raydium API if cache not available
-        try:
-            resp = requests.get(
-                "https://api.raydium.io/v2/sdk/liquidity/mainnet.json", stream=True
-            )
-            pools = resp.json()
-            official = pools.get("official", [])
-            unofficial = pools.get("unOfficial", [])
-            all_pools = official + unofficial
-
-            # Store all_pools in a JSON file for future use
-            with open("all_pools.json", "w") as file:
-                json.dump(all_pools, file)
-            amm_info = extract_pool_info(all_pools, mint)
-        except Exception as ex:
-            print(f"Failed to fetch pools from API. Error: {ex}")
-            return "failed"
-
-    # Construct and return the pool keys dictionary
-    try:
-        return {
-            "amm_id": Pubkey.from_string(amm_info["id"]),
-            "authority": Pubkey.from_string(amm_info["authority"]),
-            "base_mint": Pubkey.from_string(amm_info["baseMint"]),
-            "base_decimals": amm_info["baseDecimals"],
-            "quote_mint": Pubkey.from_string(amm_info["quoteMint"]),
-            "quote_decimals": amm_info["quoteDecimals"],
-            "lp_mint": Pubkey.from_string(amm_info["lpMint"]),
-            "open_orders": Pubkey.from_string(amm_info["openOrders"]),
-            "target_orders": Pubkey.from_string(amm_info["targetOrders"]),
-            "base_vault": Pubkey.from_string(amm_info["baseVault"]),
-            "quote_vault": Pubkey.from_string(amm_info["quoteVault"]),
-            "market_id": Pubkey.from_string(amm_info["marketId"]),
-            "market_base_vault": Pubkey.from_string(amm_info["marketBaseVault"]),
-            "market_quote_vault": Pubkey.from_string(amm_info["marketQuoteVault"]),
-            "market_authority": Pubkey.from_string(amm_info["marketAuthority"]),
-            "bids": Pubkey.from_string(amm_info["marketBids"]),
-            "asks": Pubkey.from_string(amm_info["marketAsks"]),
-            "event_queue": Pubkey.from_string(amm_info["marketEventQueue"]),
-        }
+        pool_keys = resolve_pool_keys(mint)
+        if pool_keys is None:
+            raise Exception(f"{mint} pool not found!")
+        return pool_keys
     except Exception as e:
-        print(f"Failed to construct pool keys. Error: {e}")
+        print(f"Failed to fetch pool keys. Error: {e}")
         return "failed"
@@ -5,6 +5,8 @@ from borsh_construct import CStruct, String, U8, U16, U64, Vec, Option, Bool, En
 
 from construct import Bytes, Int8ul, Int64ul, Padding, BitsInteger, BitsSwapped, BitStruct, Const, Flag, BytesInteger
 from construct import Struct as cStruct
+import os
+import struct
 
 import base58, json
 
@@ -12,10 +14,8 @@ import base58, json
 from spl.token.instructions import create_associated_token_account, get_associated_token_address
 
 from solders.pubkey import Pubkey
-from solders.instruction import Instruction
 
 from solana.rpc.types import TokenAccountOpts
-from solders.instruction import AccountMeta
 
 
 class MyEncoder(json.JSONEncoder):
@@ -198,6 +198,137 @@ MARKET_LAYOUT = cStruct(
 MINT_LAYOUT = cStruct(Padding(44), "decimals" / Int8ul, Padding(37))
 
 
+def get_field_offsets(layout):
+    """
+    Returns {field name: (offset, size)} for the named fields of a fixed-size layout.
+    """
+    fields = {}
+    offset = 0
+    for item in layout.subcons:
+        size = item.sizeof()
+        if item.name is not None:
+            fields[item.name] = (offset, size)
+        offset += size
+    return fields
+
+
+_U8 = struct.Struct("<B")
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+_U128 = struct.Struct("<QQ")
+
+
+class LayoutView:
+    """
+    Zero-copy, fixed-offset reader over raw account data.
+
+    Offsets come from the construct layout, so a view reads exactly the bytes the
+    construct parser would, but only for the fields asked for and without building
+    a container of every field.
+    """
+
+    __slots__ = ("buf",)
+    LAYOUT = None
+    FIELDS = {}
+
+    def __init__(self, data):
+        self.buf = memoryview(data)
+
+    def u8(self, name) -> int:
+        return _U8.unpack_from(self.buf, self.FIELDS[name][0])[0]
+
+    def u32(self, name) -> int:
+        return _U32.unpack_from(self.buf, self.FIELDS[name][0])[0]
+
+    def u64(self, name) -> int:
+        return _U64.unpack_from(self.buf, self.FIELDS[name][0])[0]
+
+    def u128(self, name) -> int:
+        low, high = _U128.unpack_from(self.buf, self.FIELDS[name][0])
+        return low | (high << 64)
+
+    def raw(self, name) -> memoryview:
+        offset, size = self.FIELDS[name]
+        return self.buf[offset : offset + size]
+
+    def pubkey(self, name) -> Pubkey:
+        offset, _ = self.FIELDS[name]
+        return Pubkey.from_bytes(self.buf[offset : offset + 32].tobytes())
+
+    def get(self, name):
+        """
+        Reads a field with the same Python type construct would return for the
+        integer and byte fields of these layouts.
+        """
+        size = self.FIELDS[name][1]
+        if size == 1:
+            return self.u8(name)
+        if size == 4:
+            return self.u32(name)
+        if size == 8:
+            return self.u64(name)
+        if size == 16:
+            return self.u128(name)
+        return self.raw(name).tobytes()
+
+
+class AmmInfoView(LayoutView):
+    __slots__ = ()
+    LAYOUT = AMM_INFO_LAYOUT_V4_1
+    FIELDS = get_field_offsets(AMM_INFO_LAYOUT_V4_1)
+
+
+class MarketView(LayoutView):
+    __slots__ = ()
+    LAYOUT = MARKET_LAYOUT
+    FIELDS = get_field_offsets(MARKET_LAYOUT)
+
+
+def verify_view(view_cls, data) -> list:
+    """
+    Compares every integer and byte field read through `view_cls` with the construct
+    parse of the same data.
+
+    Returns:
+        list: Names of the fields that differ (empty when the view is exact).
+    """
+    parsed = view_cls.LAYOUT.parse(data)
+    view = view_cls(data)
+    return [
+        name
+        for name in view_cls.FIELDS
+        if isinstance(parsed[name], (int, bytes)) and view.get(name) != parsed[name]
+    ]
+
+
+# Set VERIFY_LAYOUTS=1 to check every view against construct, see check_view
+VERIFY_LAYOUTS = os.getenv("VERIFY_LAYOUTS") == "1"
+VERIFY_SAMPLES = 32
+
+
+def random_account_data(view_cls) -> bytes:
+    """
+    Account data with random bytes in every integer and byte field of `view_cls`
+    and zeros elsewhere, so flags and padding still parse.
+    """
+    data = bytearray(view_cls.LAYOUT.sizeof())
+    parsed = view_cls.LAYOUT.parse(bytes(data))
+    for name, (offset, size) in view_cls.FIELDS.items():
+        if isinstance(parsed[name], (int, bytes)):
+            data[offset : offset + size] = os.urandom(size)
+    return bytes(data)
+
+
+def check_view(view_cls, data):
+    """
+    Raises ValueError if `view_cls` reads `data` differently from the construct
+    layout it was built from.
+    """
+    mismatched = verify_view(view_cls, data)
+    if mismatched:
+        raise ValueError(f"{view_cls.__name__} disagrees with its layout on {mismatched}")
+
+
 POOL_INFO_LAYOUT = cStruct("instruction" / Int8ul, "simulate_type" / Int8ul)
 
 LIQ_LAYOUT = cStruct("instruction" / Int8ul, "amount_in" / Int64ul)
@@ -219,42 +350,6 @@ def get_token_account(ctx,
         return swap_associated_token_address, swap_token_account_Instructions
 
 
-def make_swap_instruction(amount_in: int, token_account_in: Pubkey.from_string, token_account_out: Pubkey.from_string,
-                          accounts: dict, mint, ctx, owner) -> Instruction:
-    tokenPk = mint
-    accountProgramId = ctx.get_account_info_json_parsed(tokenPk)
-    TOKEN_PROGRAM_ID = accountProgramId.value.owner
-
-    keys = [
-        AccountMeta(pubkey=TOKEN_PROGRAM_ID, is_signer=False, is_writable=False),
-        AccountMeta(pubkey=accounts["amm_id"], is_signer=False, is_writable=True),
-        AccountMeta(pubkey=accounts["authority"], is_signer=False, is_writable=False),
-        AccountMeta(pubkey=accounts["open_orders"], is_signer=False, is_writable=True),
-        AccountMeta(pubkey=accounts["target_orders"], is_signer=False, is_writable=True),
-        AccountMeta(pubkey=accounts["base_vault"], is_signer=False, is_writable=True),
-        AccountMeta(pubkey=accounts["quote_vault"], is_signer=False, is_writable=True),
-        AccountMeta(pubkey=SERUM_PROGRAM_ID, is_signer=False, is_writable=False),
-        AccountMeta(pubkey=accounts["market_id"], is_signer=False, is_writable=True),
-        AccountMeta(pubkey=accounts["bids"], is_signer=False, is_writable=True),
-        AccountMeta(pubkey=accounts["asks"], is_signer=False, is_writable=True),
-        AccountMeta(pubkey=accounts["event_queue"], is_signer=False, is_writable=True),
-        AccountMeta(pubkey=accounts["market_base_vault"], is_signer=False, is_writable=True),
-        AccountMeta(pubkey=accounts["market_quote_vault"], is_signer=False, is_writable=True),
-        AccountMeta(pubkey=accounts["market_authority"], is_signer=False, is_writable=False),
-        AccountMeta(pubkey=token_account_in, is_signer=False, is_writable=True),  # UserSourceTokenAccount
-        AccountMeta(pubkey=token_account_out, is_signer=False, is_writable=True),  # UserDestTokenAccount
-        AccountMeta(pubkey=owner.pubkey(), is_signer=True, is_writable=False)  # UserOwner
-    ]
-
-    data = SWAP_LAYOUT.build(
-        dict(
-            instruction=9,
-            amount_in=int(amount_in),
-            min_amount_out=0
-        )
-    )
-    return Instruction(AMM_PROGRAM_ID, data, keys)
-
 def getSymbol(token):
     # usdc and usdt
     exclude = ['EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v', 'Es9vMFrzaCERmJfrF4H2FYD4KCoNkY11McCe8BenwNYB']
@@ -346,4 +441,21 @@ SPL_MINT_LAYOUT = CStruct(
   'isInitialized'/Int8ul,
   'freezeAuthorityOption'/Int32ul,
   'freezeAuthority'/PUBLIC_KEY_LAYOUT
-)
\ No newline at end of file
+)
+
+class SplAccountView(LayoutView):
+    __slots__ = ()
+    LAYOUT = SPL_ACCOUNT_LAYOUT
+    FIELDS = get_field_offsets(SPL_ACCOUNT_LAYOUT)
+
+
+class SplMintView(LayoutView):
+    __slots__ = ()
+    LAYOUT = SPL_MINT_LAYOUT
+    FIELDS = get_field_offsets(SPL_MINT_LAYOUT)
+
+
+if VERIFY_LAYOUTS:
+    for _view_cls in (AmmInfoView, MarketView, SplAccountView, SplMintView):
+        for _ in range(VERIFY_SAMPLES):
+            check_view(_view_cls, random_account_data(_view_cls))
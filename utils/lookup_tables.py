@@ -0,0 +1,329 @@
+# utils/lookup_tables.py
+
+import asyncio
+import json
+import os
+import struct
+import sys
+from collections import Counter
+
+from dotenv import load_dotenv
+from solana.rpc.commitment import Confirmed
+from solana.rpc.types import TxOpts
+from solders.address_lookup_table_account import (
+    ID as LOOKUP_TABLE_PROGRAM_ID,
+    LOOKUP_TABLE_MAX_ADDRESSES,
+    AddressLookupTable,
+    AddressLookupTableAccount,
+    derive_lookup_table_address,
+)
+from solders.instruction import AccountMeta, Instruction
+from solders.message import MessageV0
+from solders.pubkey import Pubkey
+from solders.system_program import ID as SYSTEM_PROGRAM_ID
+from solders.transaction import VersionedTransaction
+
+from utils.blockhash import blockhash_prefetcher
+from utils.confirm import confirm_signature
+from utils.create_close_account import SERUM_PROGRAM_ID, TOKEN_PROGRAM_ID
+from utils.rpc import get_async_client
+
+# Load .env file
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
+
+"""
+Address Lookup Tables for Raydium pool accounts.
+
+A swap references 15 pool-level accounts that are the same for every trade in a
+pool. Stored in an address lookup table they cost one byte each in the message
+instead of 32, which makes swaps smaller and leaves room for more instructions per
+transaction.
+
+LookupTableManager creates and extends tables owned by the payer, keeps their
+contents in a local JSON file so compiling never reads them from chain, and picks
+the tables that cover a pool when a swap is compiled. Pools can be added explicitly
+(`python -m utils.lookup_tables <amm_id> ...`) or automatically once they have been
+traded LOOKUP_TABLE_AUTO_EXTEND_AFTER times (0, the default, disables this since
+tables cost rent).
+"""
+
+LOOKUP_TABLE_CACHE_PATH = os.getenv("LOOKUP_TABLE_CACHE_PATH", "lookup_tables.json")
+AUTO_EXTEND_AFTER = int(os.getenv("LOOKUP_TABLE_AUTO_EXTEND_AFTER", 0))
+
+# Addresses per extend instruction that keep create + extend inside one transaction
+EXTEND_CHUNK = 20
+# A table only pays for its 32-byte key (plus two length bytes) past this many hits
+MIN_TABLE_HITS = 2
+
+CREATE_LOOKUP_TABLE = 0
+EXTEND_LOOKUP_TABLE = 2
+
+POOL_ADDRESS_FIELDS = (
+    "amm_id",
+    "authority",
+    "open_orders",
+    "target_orders",
+    "base_vault",
+    "quote_vault",
+    "market_id",
+    "bids",
+    "asks",
+    "event_queue",
+    "market_base_vault",
+    "market_quote_vault",
+    "market_authority",
+)
+
+
+def pool_addresses(pool_keys: dict) -> list:
+    """
+    The static accounts of a swap in this pool, i.e. everything except the user's
+    token accounts, the owner and the AMM program itself.
+    """
+    return [TOKEN_PROGRAM_ID, SERUM_PROGRAM_ID] + [
+        pool_keys[field] for field in POOL_ADDRESS_FIELDS
+    ]
+
+
+def create_lookup_table_instruction(authority: Pubkey, payer: Pubkey, recent_slot: int):
+    """
+    Returns (instruction, table address) for a new lookup table.
+    """
+    table, bump = derive_lookup_table_address(authority, recent_slot)
+    data = struct.pack("<IQB", CREATE_LOOKUP_TABLE, recent_slot, bump)
+    keys = [
+        AccountMeta(pubkey=table, is_signer=False, is_writable=True),
+        AccountMeta(pubkey=authority, is_signer=True, is_writable=False),
+        AccountMeta(pubkey=payer, is_signer=True, is_writable=True),
+        AccountMeta(pubkey=SYSTEM_PROGRAM_ID, is_signer=False, is_writable=False),
+    ]
+    return Instruction(LOOKUP_TABLE_PROGRAM_ID, data, keys), table
+
+
+def extend_lookup_table_instruction(
+    table: Pubkey, authority: Pubkey, payer: Pubkey, addresses: list
+) -> Instruction:
+    data = struct.pack("<IQ", EXTEND_LOOKUP_TABLE, len(addresses)) + b"".join(
+        bytes(address) for address in addresses
+    )
+    keys = [
+        AccountMeta(pubkey=table, is_signer=False, is_writable=True),
+        AccountMeta(pubkey=authority, is_signer=True, is_writable=False),
+        AccountMeta(pubkey=payer, is_signer=True, is_writable=True),
+        AccountMeta(pubkey=SYSTEM_PROGRAM_ID, is_signer=False, is_writable=False),
+    ]
+    return Instruction(LOOKUP_TABLE_PROGRAM_ID, data, keys)
+
+
+class LookupTableManager:
+    """
+    Local registry of lookup tables and their contents.
+
+    Args:
+        path (str): JSON file the table contents are persisted to.
+        ctx: Async client used to create, extend and load tables.
+    """
+
+    def __init__(self, path: str = LOOKUP_TABLE_CACHE_PATH, ctx=None):
+        self.path = path
+        self.ctx = ctx
+        self._tables = {}
+        self._authorities = {}
+        self._index = {}
+        self._accounts = {}
+        self._trades = Counter()
+        self._lock = asyncio.Lock()
+        self._background = set()
+        if path and os.path.exists(path):
+            self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r") as file:
+                data = json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"Failed to load lookup tables. Error: {e}")
+            return
+        for table, entry in data.items():
+            self._set_table(
+                Pubkey.from_string(table),
+                [Pubkey.from_string(address) for address in entry["addresses"]],
+                entry.get("authority"),
+            )
+
+    def save(self):
+        if not self.path:
+            return
+        data = {
+            table: {
+                "authority": self._authorities.get(table),
+                "addresses": [str(address) for address in addresses],
+            }
+            for table, addresses in self._tables.items()
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(data, file)
+        os.replace(tmp_path, self.path)
+
+    def _set_table(self, table: Pubkey, addresses: list, authority=None):
+        key = str(table)
+        self._tables[key] = list(addresses)
+        if authority is not None:
+            self._authorities[key] = str(authority)
+        for address in addresses:
+            self._index.setdefault(str(address), key)
+        self._accounts[key] = AddressLookupTableAccount(table, list(addresses))
+
+    def tables_for(self, addresses) -> list:
+        """
+        Picks the cached tables that cover the given addresses, greedily by
+        coverage, skipping tables that would not make the message smaller.
+
+        Returns:
+            list: AddressLookupTableAccounts to pass to MessageV0.try_compile.
+        """
+        hits = Counter(
+            self._index[str(address)] for address in addresses if str(address) in self._index
+        )
+        return [
+            self._accounts[table]
+            for table, count in hits.most_common()
+            if count >= MIN_TABLE_HITS
+        ]
+
+    def tables_for_pool(self, pool_keys: dict) -> list:
+        return self.tables_for(pool_addresses(pool_keys))
+
+    def missing(self, pool_keys: dict) -> list:
+        return [
+            address for address in pool_addresses(pool_keys) if str(address) not in self._index
+        ]
+
+    async def load_table(self, table: Pubkey):
+        """
+        Reads a table from chain into the local cache, e.g. one created elsewhere.
+        """
+        ctx = self.ctx or get_async_client(commitment=Confirmed)
+        resp = await ctx.get_account_info(table, commitment=Confirmed)
+        if resp.value is None:
+            raise ValueError(f"Lookup table {table} not found")
+        state = AddressLookupTable.deserialize(resp.value.data)
+        self._set_table(table, state.addresses, state.meta.authority)
+        self.save()
+        return self._accounts[str(table)]
+
+    def _writable_table(self, authority: Pubkey, count: int):
+        for table, addresses in self._tables.items():
+            if (
+                self._authorities.get(table) == str(authority)
+                and len(addresses) + count <= LOOKUP_TABLE_MAX_ADDRESSES
+            ):
+                return Pubkey.from_string(table)
+        return None
+
+    async def ensure_pool(self, payer, pool_keys: dict):
+        """
+        Makes sure every static account of a pool is in one of the payer's tables,
+        extending an existing table with room or creating a new one.
+
+        Args:
+            payer (Keypair): Table authority and fee payer.
+            pool_keys (dict): Keys dict from gen_pool / fetch_pool_keys.
+
+        Returns:
+            list: The tables covering the pool afterwards.
+        """
+        async with self._lock:
+            missing = self.missing(pool_keys)
+            if not missing:
+                return self.tables_for_pool(pool_keys)
+
+            ctx = self.ctx or get_async_client(commitment=Confirmed)
+            authority = payer.pubkey()
+            table = self._writable_table(authority, len(missing))
+            instructions = []
+            if table is None:
+                recent_slot = (await ctx.get_slot(Confirmed)).value
+                create, table = create_lookup_table_instruction(authority, authority, recent_slot)
+                instructions.append(create)
+                existing = []
+            else:
+                existing = self._tables[str(table)]
+
+            added = []
+            for i in range(0, len(missing), EXTEND_CHUNK):
+                chunk = missing[i : i + EXTEND_CHUNK]
+                instructions.append(
+                    extend_lookup_table_instruction(table, authority, authority, chunk)
+                )
+                blockhash, last_valid_block_height = await blockhash_prefetcher.get()
+                message = MessageV0.try_compile(authority, instructions, [], blockhash)
+                txn = await ctx.send_transaction(
+                    VersionedTransaction(message, [payer]), opts=TxOpts(skip_preflight=False)
+                )
+                confirmed, err = await confirm_signature(txn.value, last_valid_block_height)
+                if not confirmed:
+                    print(f"Failed to extend lookup table {table}. Error: {err}")
+                    break
+                added.extend(chunk)
+                instructions = []
+
+            if added:
+                self._set_table(table, existing + added, authority)
+                self.save()
+                print(f"Lookup table {table}: {len(existing) + len(added)} addresses")
+            return self.tables_for_pool(pool_keys)
+
+    def note_trade(self, payer, pool_keys: dict):
+        """
+        Counts a trade in a pool and, once it reaches AUTO_EXTEND_AFTER, extends
+        the payer's tables with the pool in the background.
+        """
+        if AUTO_EXTEND_AFTER <= 0:
+            return
+        amm_id = str(pool_keys["amm_id"])
+        self._trades[amm_id] += 1
+        if self._trades[amm_id] == AUTO_EXTEND_AFTER and self.missing(pool_keys):
+            task = asyncio.create_task(self._ensure_pool_quietly(payer, pool_keys))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+
+    async def _ensure_pool_quietly(self, payer, pool_keys: dict):
+        try:
+            await self.ensure_pool(payer, pool_keys)
+        except Exception as e:
+            print(f"Failed to add pool {pool_keys['amm_id']} to a lookup table. Error: {e}")
+
+    async def wait(self):
+        """
+        Waits for table extensions still running in the background.
+        """
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+
+
+lookup_table_manager = LookupTableManager()
+
+
+async def main(amm_ids):
+    from solders.keypair import Keypair
+
+    from utils.pool_information import gen_pool
+    from utils.shutdown import shutdown
+
+    payer = Keypair.from_base58_string(os.getenv("PrivateKey"))
+    try:
+        for amm_id in amm_ids:
+            pool_keys = await gen_pool(amm_id, None)
+            if "error" in pool_keys:
+                print(f"Failed to resolve pool {amm_id}: {pool_keys['error']}")
+                continue
+            tables = await lookup_table_manager.ensure_pool(payer, pool_keys)
+            print(f"{amm_id}: {[str(table.key) for table in tables]}")
+    finally:
+        await shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
@@ -0,0 +1,145 @@
+# utils/mint_info.py
+
+from solana.rpc.commitment import Confirmed
+from solders.pubkey import Pubkey
+
+from utils.layouts import SplMintView
+from utils.rpc import get_async_client, get_multiple_accounts
+
+"""
+Process-wide mint metadata cache.
+
+A mint's token program and decimals never change, so they are read once per
+process: in bulk with getMultipleAccounts, decoding the first MINT_LEN bytes of
+each account through SplMintView (the base mint layout is the same for Token and
+Token-2022), or seeded for free from resolved Raydium V4 pool keys, whose mints are
+always SPL Token mints. Instruction building then only reads this cache.
+"""
+
+TOKEN_PROGRAM_ID = Pubkey.from_string("TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA")
+TOKEN_PROGRAM_ID_2022 = Pubkey.from_string("TokenzQdBNbLqP5VEhdkAS6EPFLC1PHnBqCXEpPxuEb")
+MINT_LEN = 82
+# Token-2022 accounts with extensions carry their type after the base account size
+ACCOUNT_LEN = 165
+ACCOUNT_TYPE_MINT = 1
+
+
+class MintInfo:
+    """
+    Decoded mint account. supply is None for entries seeded from pool keys.
+    """
+
+    __slots__ = ("mint", "program_id", "decimals", "supply")
+
+    def __init__(self, mint: Pubkey, program_id: Pubkey, decimals: int, supply: int = None):
+        self.mint = mint
+        self.program_id = program_id
+        self.decimals = decimals
+        self.supply = supply
+
+    @property
+    def is_token_2022(self) -> bool:
+        return self.program_id == TOKEN_PROGRAM_ID_2022
+
+    def __repr__(self):
+        return f"MintInfo({self.mint}, program_id={self.program_id}, decimals={self.decimals})"
+
+
+def is_mint_data(data: bytes) -> bool:
+    return len(data) == MINT_LEN or (
+        len(data) > ACCOUNT_LEN and data[ACCOUNT_LEN] == ACCOUNT_TYPE_MINT
+    )
+
+
+def decode_mint(mint: Pubkey, program_id: Pubkey, data: bytes) -> MintInfo:
+    view = SplMintView(memoryview(data)[:MINT_LEN])
+    return MintInfo(mint, program_id, view.u8("decimals"), view.u64("supply"))
+
+
+class MintInfoCache:
+    """
+    Maps mint address strings to MintInfo.
+
+    Args:
+        ctx: Async client used for bulk loads.
+    """
+
+    def __init__(self, ctx=None):
+        self.ctx = ctx
+        self._mints = {}
+
+    def __len__(self):
+        return len(self._mints)
+
+    def get(self, mint):
+        """
+        Returns the cached MintInfo, or None. Never makes an RPC call.
+        """
+        return self._mints.get(str(mint))
+
+    def program_id(self, mint) -> Pubkey:
+        """
+        Token program owning the mint. Never makes an RPC call.
+
+        Raises:
+            KeyError: If the mint is not cached; load it with load/load_many first
+                rather than guessing the SPL Token program.
+        """
+        info = self._mints.get(str(mint))
+        if info is None:
+            raise KeyError(f"mint {mint} is not loaded")
+        return info.program_id
+
+    def put(self, info: MintInfo):
+        self._mints[str(info.mint)] = info
+
+    def clear(self):
+        self._mints.clear()
+
+    def seed_from_pool(self, pool_keys: dict):
+        """
+        Records both mints of a resolved Raydium V4 pool without any RPC call.
+        """
+        for side in ("base", "quote"):
+            mint = pool_keys[f"{side}_mint"]
+            if str(mint) not in self._mints:
+                self.put(MintInfo(mint, TOKEN_PROGRAM_ID, int(pool_keys[f"{side}_decimals"])))
+
+    async def load_many(self, mints, ctx=None) -> dict:
+        """
+        Loads every mint not cached yet with chunked getMultipleAccounts calls.
+
+        Args:
+            mints: Mint addresses as strings or Pubkeys.
+            ctx: Async client, self.ctx or the shared client by default.
+
+        Returns:
+            dict: Maps each requested mint string to its MintInfo, or None if the
+            account does not exist or is not a mint.
+        """
+        missing = []
+        for mint in mints:
+            if str(mint) not in self._mints and str(mint) not in missing:
+                missing.append(str(mint))
+
+        if missing:
+            ctx = ctx or self.ctx or get_async_client(commitment=Confirmed)
+            pubkeys = [Pubkey.from_string(mint) for mint in missing]
+            _, accounts = await get_multiple_accounts(ctx, pubkeys)
+            for mint, account in zip(pubkeys, accounts):
+                if account is None or account.owner not in (TOKEN_PROGRAM_ID, TOKEN_PROGRAM_ID_2022):
+                    continue
+                if not is_mint_data(account.data):
+                    continue
+                self.put(decode_mint(mint, account.owner, account.data))
+
+        return {str(mint): self._mints.get(str(mint)) for mint in mints}
+
+    async def load(self, mint, ctx=None):
+        """
+        Cached MintInfo of one mint, loaded on a miss.
+        """
+        return (await self.load_many([mint], ctx))[str(mint)]
+
+
+mint_info_cache = MintInfoCache()
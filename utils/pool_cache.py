@@ -0,0 +1,290 @@
+# utils/pool_cache.py
+
+import asyncio
+import contextlib
+import json
+import os
+import time
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:  # Windows: saves are not serialised between processes
+    fcntl = None
+
+from dotenv import load_dotenv
+from solders.pubkey import Pubkey
+
+# Load .env file
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
+
+"""
+Cache in front of gen_pool.
+
+gen_pool resolves a pool with two account reads (AMM, then OpenBook market) and a
+create_program_address call, although these accounts almost never change for a
+given amm_id. The cache keeps the AMM-derived fields keyed by amm_id and the
+market-derived fields keyed by market id, each in a size-bounded LRU with its own
+TTL. Market fields are immutable once the market exists, so they get a long TTL.
+A third tier maps mints to the AMM id of their WSOL pool, so discovery can skip
+getProgramAccounts for pools that were seen before.
+Entries can optionally be persisted to a JSON file so short-lived scripts share them.
+Several processes may share the file (e.g. utils.pool_watcher next to the trade
+scripts): every save re-reads it under a file lock and merges its entries in,
+keeping the later expiry of each key, and a cache miss re-reads the file when
+another process has written it since.
+"""
+
+AMM_TTL = 300
+MARKET_TTL = 24 * 60 * 60
+MAX_SIZE = 1024
+
+
+def _dump_fields(fields: dict) -> dict:
+    return {k: str(v) if isinstance(v, Pubkey) else v for k, v in fields.items()}
+
+
+def _load_fields(fields: dict) -> dict:
+    return {k: Pubkey.from_string(v) if isinstance(v, str) else v for k, v in fields.items()}
+
+
+@contextlib.contextmanager
+def _file_lock(path: str):
+    """
+    Exclusive lock on `path`.lock for the duration of a read-merge-write.
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(path + ".lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class _TTLCache:
+    """
+    Size-bounded LRU mapping with a per-entry expiry time.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expiry, value = entry
+        if expiry <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value, expiry=None):
+        self._entries[key] = (expiry or time.time() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def merge(self, key, value, expiry: float):
+        """
+        Stores an entry read from elsewhere unless the one held expires later.
+        Does not count as a use for the LRU order of an existing key.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] >= expiry:
+            return
+        self._entries[key] = (expiry, value)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def pop(self, key):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def items(self):
+        return self._entries.items()
+
+
+class PoolKeysCache:
+    """
+    Two-tier gen_pool cache: AMM fields by amm_id and market fields by market id,
+    plus the AMM id of each known mint's WSOL pool.
+
+    Args:
+        maxsize (int): Maximum number of entries per tier.
+        amm_ttl (float): Seconds an AMM entry stays fresh.
+        market_ttl (float): Seconds a market entry stays fresh.
+        path (str): Optional JSON file the cache is loaded from and saved to.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = MAX_SIZE,
+        amm_ttl: float = AMM_TTL,
+        market_ttl: float = MARKET_TTL,
+        path: str = None,
+    ):
+        self.amm = _TTLCache(maxsize, amm_ttl)
+        self.market = _TTLCache(maxsize, market_ttl)
+        self.pool = _TTLCache(maxsize, market_ttl)
+        self.path = path
+        self._locks = {}
+        # Modification time of the file as last read or written by this process
+        self._mtime = None
+        if path and os.path.exists(path):
+            self.load()
+
+    def lock(self, amm_id) -> asyncio.Lock:
+        """
+        Per-pool lock, so concurrent resolutions of the same pool share one fetch.
+        """
+        key = str(amm_id)
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        return lock
+
+    def _get(self, tier: _TTLCache, key: str):
+        value = tier.get(key)
+        if value is None and self.refresh():
+            value = tier.get(key)
+        return value
+
+    def get_amm(self, amm_id):
+        return self._get(self.amm, str(amm_id))
+
+    def put_amm(self, amm_id, fields: dict, save: bool = True, ttl: float = None):
+        """
+        Args:
+            ttl (float): Seconds the entry stays fresh, the AMM tier's TTL by
+                default. Fields that cannot change, e.g. decoded from the pool's
+                initialize2, may be given the market TTL.
+        """
+        self.amm.put(str(amm_id), fields, None if ttl is None else time.time() + ttl)
+        if save:
+            self.save()
+
+    def get_market(self, market_id):
+        return self._get(self.market, str(market_id))
+
+    def put_market(self, market_id, fields: dict, save: bool = True):
+        self.market.put(str(market_id), fields)
+        if save:
+            self.save()
+
+    def get_pool_id(self, mint):
+        """
+        AMM id of the mint's WSOL pool, or None.
+        """
+        fields = self._get(self.pool, str(mint))
+        return None if fields is None else fields["amm_id"]
+
+    def put_pool_id(self, mint, amm_id, save: bool = True):
+        amm_id = amm_id if isinstance(amm_id, Pubkey) else Pubkey.from_string(amm_id)
+        self.pool.put(str(mint), {"amm_id": amm_id})
+        if save:
+            self.save()
+
+    def invalidate(self, amm_id):
+        """
+        Drops the AMM entry from memory and from the file. Processes that already
+        hold it keep their copy, and save it again, until it expires.
+        """
+        key = str(amm_id)
+        self.amm.pop(key)
+        if not self.path:
+            return
+        with _file_lock(self.path):
+            self._merge_file()
+            self.amm.pop(key)
+            self._write()
+
+    def clear(self):
+        """
+        Drops every entry in memory, the file is left as it is.
+        """
+        for tier in (self.amm, self.market, self.pool):
+            tier.clear()
+
+    def _file_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _merge_file(self):
+        """
+        Merges the file's unexpired entries into memory, the later expiry of each
+        key wins. A missing file is not an error.
+        """
+        mtime = self._file_mtime()
+        if mtime is None:
+            return
+        try:
+            with open(self.path, "r") as file:
+                data = json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"Failed to load pool cache. Error: {e}")
+            return
+        now = time.time()
+        for tier, name in ((self.amm, "amm"), (self.market, "market"), (self.pool, "pool")):
+            for key, (expiry, fields) in data.get(name, {}).items():
+                if expiry > now:
+                    tier.merge(key, _load_fields(fields), expiry)
+        self._mtime = mtime
+
+    def load(self):
+        with _file_lock(self.path):
+            self._merge_file()
+
+    def refresh(self) -> bool:
+        """
+        Re-reads the file if another process wrote it since this one last read or
+        wrote it.
+
+        Returns:
+            bool: True if the file was read.
+        """
+        if not self.path:
+            return False
+        mtime = self._file_mtime()
+        if mtime is None or mtime == self._mtime:
+            return False
+        self.load()
+        return True
+
+    def save(self):
+        """
+        Writes the cache to the file, merged with what other processes saved there
+        since it was last read.
+        """
+        if not self.path:
+            return
+        with _file_lock(self.path):
+            self._merge_file()
+            self._write()
+
+    def _write(self):
+        data = {
+            name: {
+                key: [expiry, _dump_fields(fields)]
+                for key, (expiry, fields) in tier.items()
+            }
+            for tier, name in ((self.amm, "amm"), (self.market, "market"), (self.pool, "pool"))
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(data, file)
+        os.replace(tmp_path, self.path)
+        self._mtime = self._file_mtime()
+
+
+pool_keys_cache = PoolKeysCache(path=os.getenv("POOL_CACHE_PATH"))
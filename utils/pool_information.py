@@ -1,16 +1,26 @@
 # utils/pool_information.py
 
-import json
-import requests
-from solana.rpc.async_api import AsyncClient
-from solana.rpc.types import MemcmpOpts
+import asyncio
+import random
+from solana.rpc.types import DataSliceOpts, MemcmpOpts
 from solana.rpc.commitment import Confirmed
 from solders.pubkey import Pubkey
 import os
 from dotenv import load_dotenv
 import time
 
-from utils.layouts import AMM_INFO_LAYOUT_V4_1, MARKET_LAYOUT, get_offset
+from utils.layouts import (
+    AMM_INFO_LAYOUT_V4_1,
+    VERIFY_LAYOUTS,
+    AmmInfoView,
+    MarketView,
+    check_view,
+    get_offset,
+)
+from utils.mint_info import mint_info_cache
+from utils.pool_cache import pool_keys_cache
+from utils.pool_refresh import resolve_pool_keys
+from utils.rpc import get_async_client, get_multiple_accounts
 
 # Load .env file
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
@@ -45,243 +55,325 @@ OPEN_BOOK_PROGRAM = Pubkey.from_string("srmqPvymJeFKQ4zGQed1GFppgkRHL9kaELCbyksJ
 
 offset_base_mint = get_offset(AMM_INFO_LAYOUT_V4_1, "coinMintAddress")
 offset_quote_mint = get_offset(AMM_INFO_LAYOUT_V4_1, "pcMintAddress")
+AMM_ACCOUNT_SIZE = AMM_INFO_LAYOUT_V4_1.sizeof()
 
 LAMPORTS_PER_SOL = 1000000000
+DISCOVERY_TIMEOUT = 5
+DISCOVERY_BACKOFF = 0.05
+DISCOVERY_BACKOFF_MAX = 1
 
 
-def is_solana_address_pump(address):
-    address = str(address)
+async def _find_pool_ids(ctx, mint, mint_offset: int, wsol_offset: int) -> list:
+    """
+    Lists the RAY_V4 pools with `mint` at `mint_offset` and WSOL at `wsol_offset`.
+    Only pubkeys come back: the dataSize filter selects AMM accounts and the
+    zero-length dataSlice drops their data.
     """
-    Check if the given Solana address ends with 'pump'.
+    return (
+        await ctx.get_program_accounts(
+            pubkey=RAY_V4,
+            commitment=Confirmed,
+            encoding="base64",
+            data_slice=DataSliceOpts(offset=0, length=0),
+            filters=[
+                AMM_ACCOUNT_SIZE,
+                MemcmpOpts(offset=mint_offset, bytes=str(mint)),
+                MemcmpOpts(offset=wsol_offset, bytes=str(WSOL)),
+            ],
+        )
+    ).value
+
 
-    :param address: The Solana address string to check.
-    :return: True if the address ends with 'pump', False otherwise.
+async def getpoolIdByMint(mint, ctx):
     """
+    Finds the AMM id of the mint's WSOL pool on Raydium V4.
 
-    return address.endswith("pump")
+    The mint-as-base and mint-as-quote orientations are queried concurrently.
+    Failed attempts are retried with jittered exponential backoff for up to
+    DISCOVERY_TIMEOUT seconds.
 
+    Pools already seen, e.g. announced by utils.pool_watcher, are answered from
+    pool_keys_cache without any RPC call.
+
+    Returns:
+        Pubkey or None: The AMM id, None if no pool exists, False on timeout.
+    """
+    cached = pool_keys_cache.get_pool_id(mint)
+    if cached is not None:
+        return cached
 
-async def getpoolIdByMint(mint, ctx):
     start_time = time.time()
-    pump_token = is_solana_address_pump(str(mint))
-    print(pump_token)
-    if pump_token:
-        memcmp_opts_base = MemcmpOpts(offset=432, bytes=str(mint))
-    else:
-        memcmp_opts_base = MemcmpOpts(offset=400, bytes=str(mint))
-    filters_tokens = [memcmp_opts_base]
+    delay = DISCOVERY_BACKOFF
 
     while True:
         try:
-            if time.time() - start_time > 5:
+            base_side, quote_side = await asyncio.gather(
+                _find_pool_ids(ctx, mint, offset_base_mint, offset_quote_mint),
+                _find_pool_ids(ctx, mint, offset_quote_mint, offset_base_mint),
+            )
+            break
+        except Exception:
+            if time.time() - start_time > DISCOVERY_TIMEOUT:
                 return False
+            await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+            delay = min(delay * 2, DISCOVERY_BACKOFF_MAX)
 
-            poolids = (
-                await ctx.get_program_accounts(
-                    pubkey=RAY_V4,
-                    commitment=Confirmed,
-                    encoding="jsonParsed",
-                    filters=filters_tokens,
-                )
-            ).value
-            break
-        except:
-            pass
+    poolids = base_side + quote_side
     if len(poolids) > 0:
+        pool_keys_cache.put_pool_id(mint, poolids[0].pubkey)
         return poolids[0].pubkey
     else:
         return None
 
 
+Buy_keys = [
+    "amm_id",
+    "authority",
+    "base_mint",
+    "base_decimals",
+    "quote_mint",
+    "quote_decimals",
+    "lp_mint",
+    "open_orders",
+    "target_orders",
+    "base_vault",
+    "quote_vault",
+    "market_id",
+    "market_base_vault",
+    "market_quote_vault",
+    "market_authority",
+    "bids",
+    "asks",
+    "event_queue",
+]
+
+
+def decode_amm_fields(amm_id: Pubkey, amm_data) -> dict:
+    """
+    Extracts the pool keys that live in the AMM account.
+    """
+    if VERIFY_LAYOUTS:
+        check_view(AmmInfoView, amm_data)
+    amm = AmmInfoView(amm_data)
+    return {
+        "amm_id": amm_id,
+        "lp_mint": amm.pubkey("lpMintAddress"),
+        "version": 4,
+        "base_decimals": amm.u64("coinDecimals"),
+        "quote_decimals": amm.u64("pcDecimals"),
+        "lpDecimals": amm.u64("coinDecimals"),
+        "programId": RAY_V4,
+        "authority": RAY_AUTHORITY_V4,
+        "open_orders": amm.pubkey("ammOpenOrders"),
+        "target_orders": amm.pubkey("ammTargetOrders"),
+        "base_vault": amm.pubkey("poolCoinTokenAccount"),
+        "quote_vault": amm.pubkey("poolPcTokenAccount"),
+        "withdrawQueue": amm.pubkey("poolWithdrawQueue"),
+        "lpVault": amm.pubkey("poolTempLpTokenAccount"),
+        "marketProgramId": amm.pubkey("serumProgramId"),
+        "market_id": amm.pubkey("serumMarket"),
+        "pool_open_time": amm.u64("poolOpenTime"),
+    }
+
+
+def decode_market_fields(market_id: Pubkey, market_program_id: Pubkey, market_data) -> dict:
+    """
+    Extracts the pool keys that live in the OpenBook market account.
+    """
+    if VERIFY_LAYOUTS:
+        check_view(MarketView, market_data)
+    market = MarketView(market_data)
+    return {
+        "base_mint": market.pubkey("base_mint"),
+        "quote_mint": market.pubkey("quote_mint"),
+        "market_authority": Pubkey.create_program_address(
+            [bytes(market_id)]
+            + [bytes([market.u64("vault_signer_nonce")])]
+            + [bytes(7)],
+            market_program_id,
+        ),
+        "market_base_vault": market.pubkey("base_vault"),
+        "market_quote_vault": market.pubkey("quote_vault"),
+        "bids": market.pubkey("bids"),
+        "asks": market.pubkey("asks"),
+        "event_queue": market.pubkey("event_queue"),
+    }
+
+
 async def gen_pool(amm_id, ctx):
+    """
+    Resolves the swap keys of a Raydium V4 pool from its AMM id.
 
+    AMM and market fields are served from pool_keys_cache when fresh, so repeat
+    trades on a hot pool skip both account reads.
+    """
     try:
         amm_id = Pubkey.from_string(amm_id)
-        ctx = AsyncClient(RPC_HTTPS_URL, commitment=Confirmed)
-
-        start = time.time()
-        while True:
+        ctx = ctx or get_async_client(RPC_HTTPS_URL, Confirmed)
+
+        async with pool_keys_cache.lock(amm_id):
+            start = time.time()
+            amm_fields = pool_keys_cache.get_amm(amm_id)
+            if amm_fields is None:
+                while True:
+                    try:
+                        amm_data = (
+                            await ctx.get_account_info_json_parsed(amm_id)
+                        ).value.data
+                        break
+                    except:
+                        if (time.time() - start) > 3:
+                            return {
+                                "error": "server timeout - took too long to find the pool info"
+                            }
+                        pass
+
+                amm_fields = decode_amm_fields(amm_id, amm_data)
+                pool_keys_cache.put_amm(amm_id, amm_fields)
+
+            marketId = amm_fields["market_id"]
+            # print("Market --- ", marketId))
             try:
-                amm_data = (await ctx.get_account_info_json_parsed(amm_id)).value.data
-                break
+                market_fields = pool_keys_cache.get_market(marketId)
+                if market_fields is None:
+                    while True:
+                        try:
+                            marketInfo = (
+                                await ctx.get_account_info_json_parsed(marketId)
+                            ).value.data
+                            break
+                        except:
+                            if (time.time() - start) > 3:
+                                return {
+                                    "error": "server timeout - took too long to find the pool info"
+                                }
+                            pass
+
+                    market_fields = decode_market_fields(
+                        marketId, amm_fields["marketProgramId"], marketInfo
+                    )
+                    pool_keys_cache.put_market(marketId, market_fields)
+
+                pool_keys = {**amm_fields, **market_fields}
+
+                transactionkeys = {key: pool_keys[key] for key in Buy_keys}
+                mint_info_cache.seed_from_pool(transactionkeys)
+
+                return transactionkeys
+
             except:
-                if (time.time() - start) > 3:
-                    return {
-                        "error": "server timeout - took too long to find the pool info"
-                    }
-                pass
-
-        amm_data_decoded = AMM_INFO_LAYOUT_V4_1.parse(amm_data)
-        OPEN_BOOK_PROGRAM = Pubkey.from_bytes(amm_data_decoded.serumProgramId)
-        marketId = Pubkey.from_bytes(amm_data_decoded.serumMarket)
-        # print("Market --- ", marketId))
-        try:
-            while True:
-                try:
-                    marketInfo = (
-                        await ctx.get_account_info_json_parsed(marketId)
-                    ).value.data
-                    break
-                except:
-                    if (time.time() - start) > 3:
-                        return {
-                            "error": "server timeout - took too long to find the pool info"
-                        }
-                    pass
-
-            market_decoded = MARKET_LAYOUT.parse(marketInfo)
-
-            pool_keys = {
-                "amm_id": amm_id,
-                "base_mint": Pubkey.from_bytes(market_decoded.base_mint),
-                "quote_mint": Pubkey.from_bytes(market_decoded.quote_mint),
-                "lp_mint": Pubkey.from_bytes(amm_data_decoded.lpMintAddress),
-                "version": 4,
-                "base_decimals": amm_data_decoded.coinDecimals,
-                "quote_decimals": amm_data_decoded.pcDecimals,
-                "lpDecimals": amm_data_decoded.coinDecimals,
-                "programId": RAY_V4,
-                "authority": RAY_AUTHORITY_V4,
-                "open_orders": Pubkey.from_bytes(amm_data_decoded.ammOpenOrders),
-                "target_orders": Pubkey.from_bytes(amm_data_decoded.ammTargetOrders),
-                "base_vault": Pubkey.from_bytes(amm_data_decoded.poolCoinTokenAccount),
-                "quote_vault": Pubkey.from_bytes(amm_data_decoded.poolPcTokenAccount),
-                "withdrawQueue": Pubkey.from_bytes(amm_data_decoded.poolWithdrawQueue),
-                "lpVault": Pubkey.from_bytes(amm_data_decoded.poolTempLpTokenAccount),
-                "marketProgramId": OPEN_BOOK_PROGRAM,
-                "market_id": marketId,
-                "market_authority": Pubkey.create_program_address(
-                    [bytes(marketId)]
-                    + [bytes([market_decoded.vault_signer_nonce])]
-                    + [bytes(7)],
-                    OPEN_BOOK_PROGRAM,
-                ),
-                "market_base_vault": Pubkey.from_bytes(market_decoded.base_vault),
-                "market_quote_vault": Pubkey.from_bytes(market_decoded.quote_vault),
-                "bids": Pubkey.from_bytes(market_decoded.bids),
-                "asks": Pubkey.from_bytes(market_decoded.asks),
-                "event_queue": Pubkey.from_bytes(market_decoded.event_queue),
-                "pool_open_time": amm_data_decoded.poolOpenTime,
-            }
-
-            Buy_keys = [
-                "amm_id",
-                "authority",
-                "base_mint",
-                "base_decimals",
-                "quote_mint",
-                "quote_decimals",
-                "lp_mint",
-                "open_orders",
-                "target_orders",
-                "base_vault",
-                "quote_vault",
-                "market_id",
-                "market_base_vault",
-                "market_quote_vault",
-                "market_authority",
-                "bids",
-                "asks",
-                "event_queue",
-            ]
-
-            transactionkeys = {key: pool_keys[key] for key in Buy_keys}
-
-            return transactionkeys
-
-        except:
-            {"error": "unexpected error occured"}
+                {"error": "unexpected error occured"}
     except:
         return {"error": "incorrect pair address"}
 
 
-async def fetch_pool_keys(mint: str):
+async def gen_pool_many(amm_ids, ctx=None) -> dict:
     """
-    Fetches and parses pool keys for a given mint. Caches the pools in a JSON file.
+    Resolves the swap keys of many Raydium V4 pools in two stages: every AMM
+    account is read with chunked getMultipleAccounts calls, then every market they
+    reference is read the same way. Fresh pool_keys_cache entries are skipped.
 
     Args:
-        mint (str): The mint address to search for.
+        amm_ids (list): AMM ids as strings or Pubkeys.
+        ctx: The Solana async client.
 
     Returns:
-        dict or str: A dictionary of pool keys if found, else "failed".
+        dict: Maps each AMM id string to the same keys dict gen_pool returns, or to
+        an {"error": ...} dict if it could not be resolved.
     """
-    amm_info = {}
-    all_pools = {}
-    try:
-        # Attempt to load cached pools
-        with open("all_pools.json", "r") as file:
-            all_pools = json.load(file)
-        amm_info = extract_pool_info(all_pools, mint)
-    except Exception as e:
-        print(f"Failed to load cached pools. Fetching from API. Error: {e}")
-        # Fetch pools from Raydium API if cache not available
+    ctx = ctx or get_async_client(RPC_HTTPS_URL, Confirmed)
+    results = {}
+    amm_fields = {}
+    for amm_id in amm_ids:
         try:
-            resp = requests.get(
-                "https://api.raydium.io/v2/sdk/liquidity/mainnet.json", stream=True
-            )
-            pools = resp.json()
-            official = pools.get("official", [])
-            unofficial = pools.get("unOfficial", [])
-            all_pools = official + unofficial
-
-            # Store all_pools in a JSON file for future use
-            with open("all_pools.json", "w") as file:
-                json.dump(all_pools, file)
-            amm_info = extract_pool_info(all_pools, mint)
-        except Exception as ex:
-            print(f"Failed to fetch pools from API. Error: {ex}")
-            return "failed"
-
-    # Construct and return the pool keys dictionary
-    try:
-        return {
-            "amm_id": Pubkey.from_string(amm_info["id"]),
-            "authority": Pubkey.from_string(amm_info["authority"]),
-            "base_mint": Pubkey.from_string(amm_info["baseMint"]),
-            "base_decimals": amm_info["baseDecimals"],
-            "quote_mint": Pubkey.from_string(amm_info["quoteMint"]),
-            "quote_decimals": amm_info["quoteDecimals"],
-            "lp_mint": Pubkey.from_string(amm_info["lpMint"]),
-            "open_orders": Pubkey.from_string(amm_info["openOrders"]),
-            "target_orders": Pubkey.from_string(amm_info["targetOrders"]),
-            "base_vault": Pubkey.from_string(amm_info["baseVault"]),
-            "quote_vault": Pubkey.from_string(amm_info["quoteVault"]),
-            "market_id": Pubkey.from_string(amm_info["marketId"]),
-            "market_base_vault": Pubkey.from_string(amm_info["marketBaseVault"]),
-            "market_quote_vault": Pubkey.from_string(amm_info["marketQuoteVault"]),
-            "market_authority": Pubkey.from_string(amm_info["marketAuthority"]),
-            "bids": Pubkey.from_string(amm_info["marketBids"]),
-            "asks": Pubkey.from_string(amm_info["marketAsks"]),
-            "event_queue": Pubkey.from_string(amm_info["marketEventQueue"]),
+            pubkey = amm_id if isinstance(amm_id, Pubkey) else Pubkey.from_string(amm_id)
+        except Exception:
+            results[str(amm_id)] = {"error": "incorrect pair address"}
+            continue
+        amm_fields[str(pubkey)] = pool_keys_cache.get_amm(pubkey)
+
+    # Stage 1: AMM accounts
+    missing = [Pubkey.from_string(k) for k, v in amm_fields.items() if v is None]
+    if missing:
+        try:
+            _, accounts = await get_multiple_accounts(ctx, missing)
+        except Exception as e:
+            print(f"Failed to fetch AMM accounts. Error: {e}")
+            accounts = [None] * len(missing)
+        for pubkey, account in zip(missing, accounts):
+            if account is None:
+                continue
+            try:
+                fields = decode_amm_fields(pubkey, account.data)
+            except Exception:
+                continue
+            pool_keys_cache.put_amm(pubkey, fields, save=False)
+            amm_fields[str(pubkey)] = fields
+
+    # Stage 2: market accounts
+    market_fields = {}
+    for fields in amm_fields.values():
+        if fields is not None:
+            market_id = fields["market_id"]
+            market_fields[str(market_id)] = pool_keys_cache.get_market(market_id)
+    missing = [Pubkey.from_string(k) for k, v in market_fields.items() if v is None]
+    if missing:
+        program_ids = {
+            str(fields["market_id"]): fields["marketProgramId"]
+            for fields in amm_fields.values()
+            if fields is not None
         }
-    except Exception as e:
-        print(f"Failed to construct pool keys. Error: {e}")
-        return "failed"
+        try:
+            _, accounts = await get_multiple_accounts(ctx, missing)
+        except Exception as e:
+            print(f"Failed to fetch market accounts. Error: {e}")
+            accounts = [None] * len(missing)
+        for pubkey, account in zip(missing, accounts):
+            if account is None:
+                continue
+            try:
+                fields = decode_market_fields(
+                    pubkey, program_ids[str(pubkey)], account.data
+                )
+            except Exception:
+                continue
+            pool_keys_cache.put_market(pubkey, fields, save=False)
+            market_fields[str(pubkey)] = fields
+
+    pool_keys_cache.save()
+
+    for amm_id, fields in amm_fields.items():
+        if fields is None:
+            results[amm_id] = {"error": "incorrect pair address"}
+            continue
+        market = market_fields.get(str(fields["market_id"]))
+        if market is None:
+            results[amm_id] = {"error": "unexpected error occured"}
+            continue
+        pool_keys = {**fields, **market}
+        results[amm_id] = {key: pool_keys[key] for key in Buy_keys}
+        mint_info_cache.seed_from_pool(results[amm_id])
+    return results
 
 
-def extract_pool_info(pools_list: list, mint: str) -> dict:
+async def fetch_pool_keys(mint: str):
     """
-    Extracts pool information for a given mint from a list of pools.
+    Fetches the pool keys for a given mint from the local pool registry. If the
+    registry does not contain the mint, new pools are merged in from the Raydium
+    API unless the mint is already known to be missing.
 
     Args:
-        pools_list (list): List of pool dictionaries.
         mint (str): The mint address to search for.
 
     Returns:
-        dict: The pool information dictionary.
-
-    Raises:
-        Exception: If the pool is not found.
+        dict or str: A dictionary of pool keys if found, else "failed".
     """
-    for pool in pools_list:
-        if (
-            pool["baseMint"] == mint
-            and pool["quoteMint"] == "So11111111111111111111111111111111111111112"
-        ):
-            return pool
-        elif (
-            pool["quoteMint"] == mint
-            and pool["baseMint"] == "So11111111111111111111111111111111111111112"
-        ):
-            return pool
-    raise Exception(f"{mint} pool not found!")
+    try:
+        # Registry lookups and refreshes block on file and network I/O
+        pool_keys = await asyncio.to_thread(resolve_pool_keys, mint)
+        if pool_keys is None:
+            raise Exception(f"{mint} pool not found!")
+        return pool_keys
+    except Exception as e:
+        print(f"Failed to fetch pool keys. Error: {e}")
+        return "failed"
@@ -0,0 +1,172 @@
+# utils/pool_refresh.py
+
+import json
+import os
+import threading
+import time
+
+import requests
+
+from utils.pool_registry import (
+    REGISTRY_PATH,
+    WSOL,
+    build_registry,
+    encode_pool,
+    lookup_pool_keys,
+)
+from utils.pool_stream import iter_pools
+
+"""
+Refresh layer in front of the pool registry.
+
+A miss used to trigger a full re-download of the Raydium pool list. Now:
+  - mints known to be missing are remembered in a TTL negative cache,
+  - the download is a conditional GET (ETag / If-Modified-Since), so an unchanged
+    list costs one round trip and no parsing,
+  - a changed list is merged into the registry, appending only pools it does not
+    contain yet.
+"""
+
+RAYDIUM_LIQUIDITY_URL = "https://api.raydium.io/v2/sdk/liquidity/mainnet.json"
+DOWNLOAD_CHUNK_SIZE = 1 << 16
+
+NEGATIVE_CACHE_PATH = "all_pools.missing.json"
+NEGATIVE_TTL = 600
+
+# resolve_pool_keys runs in worker threads (fetch_pool_keys), one refresh at a time
+_refresh_lock = threading.Lock()
+
+
+def _meta_path(path: str) -> str:
+    return path + ".meta.json"
+
+
+def _read_json(path: str) -> dict:
+    try:
+        with open(path, "r") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_json(path: str, data: dict):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(data, file)
+    os.replace(tmp_path, path)
+
+
+class NegativeCache:
+    """
+    TTL set of mint pairs that were not found in the registry after a refresh.
+
+    Entries are persisted to `path` so short-lived scripts share them.
+    """
+
+    def __init__(self, path: str = NEGATIVE_CACHE_PATH, ttl: float = NEGATIVE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._expiry = None
+
+    def _entries(self) -> dict:
+        if self._expiry is None:
+            now = time.time()
+            self._expiry = {
+                key: expiry
+                for key, expiry in _read_json(self.path).items()
+                if expiry > now
+            }
+        return self._expiry
+
+    def __contains__(self, key) -> bool:
+        entries = self._entries()
+        expiry = entries.get(key)
+        if expiry is None:
+            return False
+        if expiry <= time.time():
+            del entries[key]
+            return False
+        return True
+
+    def add(self, key):
+        self._entries()[key] = time.time() + self.ttl
+        self.save()
+
+    def clear(self):
+        self._expiry = {}
+        self.save()
+
+    def save(self):
+        if self.path:
+            _write_json(self.path, self._entries())
+
+
+negative_cache = NegativeCache()
+
+
+def refresh_registry(path: str = REGISTRY_PATH) -> int:
+    """
+    Conditionally downloads the Raydium liquidity list and merges new pools into
+    the registry.
+
+    The ETag and Last-Modified of the last download are kept next to the registry.
+    If the server answers 304 nothing is parsed or written.
+
+    Returns:
+        int: Number of pools added to the registry.
+    """
+    meta = _read_json(_meta_path(path)) if os.path.exists(path) else {}
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+
+    with requests.get(RAYDIUM_LIQUIDITY_URL, headers=headers, stream=True) as resp:
+        if resp.status_code == 304:
+            print("Pool list not modified since last download")
+            return 0
+        resp.raise_for_status()
+        pools = iter_pools(resp.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE))
+        added = build_registry((encode_pool(pool) for pool in pools), path, merge=True)
+        _write_json(
+            _meta_path(path),
+            {
+                "etag": resp.headers.get("ETag"),
+                "last_modified": resp.headers.get("Last-Modified"),
+            },
+        )
+
+    print(f"Merged {added} new pools into the registry")
+    if added:
+        negative_cache.clear()
+    return added
+
+
+def resolve_pool_keys(mint, quote_mint=WSOL, path: str = REGISTRY_PATH):
+    """
+    Looks a mint up in the registry, refreshing it at most once per miss.
+
+    Mints still missing after a refresh go into the negative cache, so asking for
+    them again within the TTL returns immediately without any download.
+
+    Returns:
+        dict or None: The pool keys dictionary, or None if no pool is known.
+    """
+    pool_keys = lookup_pool_keys(mint, quote_mint, path)
+    if pool_keys is not None:
+        return pool_keys
+    missing_key = f"{mint}/{quote_mint}"
+    if missing_key in negative_cache:
+        return None
+
+    with _refresh_lock:
+        # A refresh that finished while waiting may already have added the pool
+        pool_keys = lookup_pool_keys(mint, quote_mint, path)
+        if pool_keys is not None:
+            return pool_keys
+        refresh_registry(path)
+        pool_keys = lookup_pool_keys(mint, quote_mint, path)
+        if pool_keys is None:
+            negative_cache.add(missing_key)
+    return pool_keys
@@ -0,0 +1,386 @@
+# utils/pool_registry.py
+
+import hashlib
+import mmap
+import os
+import struct
+import threading
+
+from solders.pubkey import Pubkey
+
+"""
+Compact on-disk registry of Raydium liquidity pools.
+
+The registry replaces the all_pools.json cache. Every pool is stored as a fixed-width
+record of raw 32-byte keys plus the two decimals bytes, and an open-addressing hash
+index keyed by (mint, quote mint) points at the records. The file is memory-mapped,
+so a lookup only touches the header, a few index slots and one record. A second
+index keyed by AMM id lets refreshes merge new pools without re-reading old ones.
+
+File layout (little-endian):
+    header      MAGIC, version, record count, pair slot count, id slot count
+    records     record count * RECORD_SIZE bytes
+    pair index  pair slot count * u32 (record number + 1, 0 means empty)
+    id index    id slot count * u32
+"""
+
+REGISTRY_PATH = "all_pools.bin"
+
+WSOL = Pubkey.from_string("So11111111111111111111111111111111111111112")
+
+MAGIC = b"RAYPOOL\x00"
+VERSION = 2
+HEADER = struct.Struct("<8sIIII")
+HEADER_SIZE = 32
+SLOT = struct.Struct("<I")
+
+# (pool keys name, Raydium liquidity JSON name) in record order
+KEY_FIELDS = [
+    ("amm_id", "id"),
+    ("authority", "authority"),
+    ("base_mint", "baseMint"),
+    ("quote_mint", "quoteMint"),
+    ("lp_mint", "lpMint"),
+    ("open_orders", "openOrders"),
+    ("target_orders", "targetOrders"),
+    ("base_vault", "baseVault"),
+    ("quote_vault", "quoteVault"),
+    ("market_id", "marketId"),
+    ("market_base_vault", "marketBaseVault"),
+    ("market_quote_vault", "marketQuoteVault"),
+    ("market_authority", "marketAuthority"),
+    ("bids", "marketBids"),
+    ("asks", "marketAsks"),
+    ("event_queue", "marketEventQueue"),
+]
+DECIMAL_FIELDS = [
+    ("base_decimals", "baseDecimals"),
+    ("quote_decimals", "quoteDecimals"),
+]
+
+RECORD_SIZE = 32 * len(KEY_FIELDS) + len(DECIMAL_FIELDS)
+BASE_MINT_OFFSET = 32 * 2
+QUOTE_MINT_OFFSET = 32 * 3
+
+
+def pair_hash(mint: bytes, quote_mint: bytes) -> int:
+    """
+    Hash of an ordered (mint, quote mint) pair, used to place records in the index.
+    """
+    return int.from_bytes(
+        hashlib.blake2b(mint + quote_mint, digest_size=8).digest(), "little"
+    )
+
+
+def id_hash(amm_id: bytes) -> int:
+    """
+    Hash of an AMM id, used to place records in the id index.
+    """
+    return int.from_bytes(hashlib.blake2b(amm_id, digest_size=8).digest(), "little")
+
+
+def encode_pool(pool: dict) -> bytes:
+    """
+    Packs a Raydium liquidity JSON pool entry into a fixed-width record.
+
+    Args:
+        pool (dict): Pool entry as found in the Raydium liquidity JSON.
+
+    Returns:
+        bytes: RECORD_SIZE bytes.
+    """
+    record = bytearray()
+    for _, json_name in KEY_FIELDS:
+        record += bytes(Pubkey.from_string(pool[json_name]))
+    for _, json_name in DECIMAL_FIELDS:
+        record.append(int(pool[json_name]))
+    return bytes(record)
+
+
+def decode_record(record) -> dict:
+    """
+    Unpacks a fixed-width record into the pool keys dict used by make_swap_instruction.
+    """
+    pool_keys = {}
+    for i, (name, _) in enumerate(KEY_FIELDS):
+        pool_keys[name] = Pubkey.from_bytes(bytes(record[i * 32 : (i + 1) * 32]))
+    decimals_offset = 32 * len(KEY_FIELDS)
+    for i, (name, _) in enumerate(DECIMAL_FIELDS):
+        pool_keys[name] = record[decimals_offset + i]
+    return pool_keys
+
+
+def _index_slots(entries: int) -> int:
+    # Power of two with a load factor <= 0.5
+    return max(8, 1 << (entries * 2 - 1).bit_length())
+
+
+def _insert(index: bytearray, mask: int, key_hash: int, number: int):
+    slot = key_hash & mask
+    while SLOT.unpack_from(index, slot * SLOT.size)[0]:
+        slot = (slot + 1) & mask
+    SLOT.pack_into(index, slot * SLOT.size, number + 1)
+
+
+def _contains(index: bytearray, mask: int, key_hash: int, matches) -> bool:
+    slot = key_hash & mask
+    while True:
+        entry = SLOT.unpack_from(index, slot * SLOT.size)[0]
+        if not entry:
+            return False
+        if matches(entry - 1):
+            return True
+        slot = (slot + 1) & mask
+
+
+def _build_indexes(file, count: int):
+    """
+    Builds the pair and id indexes over the first `count` records of `file`.
+
+    Returns:
+        tuple: (pair slots, id slots, pair index, id index, record numbers whose
+        AMM id an earlier record already has). Duplicates are left out of both
+        indexes.
+    """
+    pair_slots = _index_slots(count * 2)
+    id_slots = _index_slots(count)
+    pair_index = bytearray(pair_slots * SLOT.size)
+    id_index = bytearray(id_slots * SLOT.size)
+    duplicates = []
+    if count:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+
+            def amm_id_at(number):
+                start = HEADER_SIZE + number * RECORD_SIZE
+                return mapped[start : start + 32]
+
+            for number in range(count):
+                start = HEADER_SIZE + number * RECORD_SIZE
+                amm_id = mapped[start : start + 32]
+                key_hash = id_hash(amm_id)
+                if _contains(id_index, id_slots - 1, key_hash, lambda other: amm_id_at(other) == amm_id):
+                    duplicates.append(number)
+                    continue
+                base_mint = mapped[start + BASE_MINT_OFFSET : start + BASE_MINT_OFFSET + 32]
+                quote_mint = mapped[start + QUOTE_MINT_OFFSET : start + QUOTE_MINT_OFFSET + 32]
+                # Both orientations, so either mint finds the pool
+                _insert(pair_index, pair_slots - 1, pair_hash(base_mint, quote_mint), number)
+                _insert(pair_index, pair_slots - 1, pair_hash(quote_mint, base_mint), number)
+                _insert(id_index, id_slots - 1, key_hash, number)
+    return pair_slots, id_slots, pair_index, id_index, duplicates
+
+
+def _drop_records(file, count: int, numbers: list) -> int:
+    """
+    Removes records from `file` in place, shifting the later ones down.
+
+    Returns:
+        int: The new record count.
+    """
+    dropped = set(numbers)
+    write_at = HEADER_SIZE + min(dropped) * RECORD_SIZE
+    for number in range(min(dropped), count):
+        if number in dropped:
+            continue
+        file.seek(HEADER_SIZE + number * RECORD_SIZE)
+        record = file.read(RECORD_SIZE)
+        file.seek(write_at)
+        file.write(record)
+        write_at += RECORD_SIZE
+    file.truncate(write_at)
+    file.flush()
+    return count - len(dropped)
+
+
+def build_registry(records, path: str = REGISTRY_PATH, merge: bool = False) -> int:
+    """
+    Writes a registry file from an iterable of encoded records.
+
+    The records are streamed to a temporary file, then the indexes are built by
+    re-reading the mapped records, so memory use does not grow with the pool count.
+    The finished file atomically replaces `path`.
+
+    With `merge`, the records of the existing registry at `path` are kept and only
+    pools whose AMM id it does not contain yet are appended. If nothing is new the
+    existing file is left untouched. An AMM id repeated within `records` is kept
+    once, at its first occurrence.
+
+    Args:
+        records: Iterable of RECORD_SIZE byte strings (see encode_pool).
+        path (str): Destination registry file.
+        merge (bool): Merge into the existing registry instead of replacing it.
+
+    Returns:
+        int: Number of records added from `records`.
+    """
+    base = PoolRegistry(path) if merge and os.path.exists(path) else None
+    tmp_path = path + ".tmp"
+    added = 0
+    try:
+        with open(tmp_path, "w+b") as file:
+            file.write(bytes(HEADER_SIZE))
+            count = 0
+            if base is not None:
+                file.write(base.records_region())
+                count = len(base)
+            for record in records:
+                if base is not None and base.find_id(record[:32]) is not None:
+                    continue
+                file.write(record)
+                added += 1
+            count += added
+
+            file.flush()
+            pair_slots, id_slots, pair_index, id_index, duplicates = _build_indexes(file, count)
+            if duplicates:
+                # Only new records can repeat an id, the base registry is unique
+                count = _drop_records(file, count, duplicates)
+                added -= len(duplicates)
+                pair_slots, id_slots, pair_index, id_index, _ = _build_indexes(file, count)
+
+            file.seek(0, os.SEEK_END)
+            file.write(pair_index)
+            file.write(id_index)
+            file.seek(0)
+            file.write(HEADER.pack(MAGIC, VERSION, count, pair_slots, id_slots))
+    finally:
+        if base is not None:
+            base.close()
+
+    if merge and base is not None and not added:
+        os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, path)
+    return added
+
+
+class PoolRegistry:
+    """
+    Read-only, memory-mapped view of a registry file written by build_registry.
+    """
+
+    def __init__(self, path: str = REGISTRY_PATH):
+        self.path = path
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, self.pair_slots, self.id_slots = HEADER.unpack_from(
+            self._mmap
+        )
+        if magic != MAGIC or version != VERSION:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a pool registry file")
+        self._pair_index_offset = HEADER_SIZE + self.count * RECORD_SIZE
+        self._id_index_offset = self._pair_index_offset + self.pair_slots * SLOT.size
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._mmap.close()
+
+    def record(self, number: int) -> bytes:
+        start = HEADER_SIZE + number * RECORD_SIZE
+        return self._mmap[start : start + RECORD_SIZE]
+
+    def records_region(self) -> bytes:
+        return self._mmap[HEADER_SIZE : self._pair_index_offset]
+
+    def _probe(self, index_offset: int, slots: int, key_hash: int, matches):
+        mask = slots - 1
+        slot = key_hash & mask
+        while True:
+            entry = SLOT.unpack_from(self._mmap, index_offset + slot * SLOT.size)[0]
+            if not entry:
+                return None
+            if matches(HEADER_SIZE + (entry - 1) * RECORD_SIZE):
+                return entry - 1
+            slot = (slot + 1) & mask
+
+    def find(self, mint, quote_mint=WSOL):
+        """
+        Returns the record number of the pool trading `mint` against `quote_mint`
+        (in either orientation), or None.
+        """
+        mint = bytes(mint)
+        quote_mint = bytes(quote_mint)
+
+        def matches(start):
+            base = self._mmap[start + BASE_MINT_OFFSET : start + BASE_MINT_OFFSET + 32]
+            quote = self._mmap[start + QUOTE_MINT_OFFSET : start + QUOTE_MINT_OFFSET + 32]
+            return (base == mint and quote == quote_mint) or (
+                base == quote_mint and quote == mint
+            )
+
+        return self._probe(
+            self._pair_index_offset, self.pair_slots, pair_hash(mint, quote_mint), matches
+        )
+
+    def find_id(self, amm_id):
+        """
+        Returns the record number of the pool with the given AMM id, or None.
+        """
+        amm_id = bytes(amm_id)
+        return self._probe(
+            self._id_index_offset,
+            self.id_slots,
+            id_hash(amm_id),
+            lambda start: self._mmap[start : start + 32] == amm_id,
+        )
+
+    def get(self, mint, quote_mint=WSOL):
+        """
+        Looks up the pool keys for a mint.
+
+        Args:
+            mint (Pubkey | str): The mint address to search for.
+            quote_mint (Pubkey | str): The other side of the pair, WSOL by default.
+
+        Returns:
+            dict or None: The pool keys dictionary if found.
+        """
+        if isinstance(mint, str):
+            mint = Pubkey.from_string(mint)
+        if isinstance(quote_mint, str):
+            quote_mint = Pubkey.from_string(quote_mint)
+        number = self.find(mint, quote_mint)
+        if number is None:
+            return None
+        return decode_record(self.record(number))
+
+
+# Open registries by path, with the (inode, mtime) they were opened at. Lookups run
+# in worker threads, so swapping and reading a registry happen under the lock.
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def lookup_pool_keys(mint, quote_mint=WSOL, path: str = REGISTRY_PATH):
+    """
+    Looks up the pool keys for a mint in the registry at `path`.
+
+    The registry stays mapped between calls and is reopened only once the file has
+    been replaced, e.g. by a refresh.
+
+    Returns:
+        dict or None: The pool keys dictionary, or None if the registry is missing
+        or does not contain the pair.
+    """
+    with _registries_lock:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        version = (stat.st_ino, stat.st_mtime_ns)
+        opened = _registries.get(path)
+        if opened is None or opened[0] != version:
+            if opened is not None:
+                opened[1].close()
+            opened = _registries[path] = (version, PoolRegistry(path))
+        return opened[1].get(mint, quote_mint)
+
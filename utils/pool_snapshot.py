@@ -0,0 +1,188 @@
+# utils/pool_snapshot.py
+
+import asyncio
+import importlib.util
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from solana.rpc.commitment import Confirmed
+from solders.pubkey import Pubkey
+
+from utils.layouts import AMM_INFO_LAYOUT_V4_1, get_field_offsets
+from utils.rpc import get_async_client
+from utils.shutdown import shutdown
+
+"""
+Columnar snapshot of every Raydium V4 pool.
+
+All AMM accounts of the RAY_V4 program are fetched with one getProgramAccounts call
+(dataSize filter on the V4 account size) and decoded in a single pass by viewing the
+concatenated account data through a NumPy structured dtype that mirrors
+AMM_INFO_LAYOUT_V4_1. The result is exported as a pandas DataFrame / Parquet file
+for fleet-wide analytics. Without pyarrow or fastparquet the file is written as CSV.
+
+Run with `python -m utils.pool_snapshot`.
+"""
+
+RAY_V4 = Pubkey.from_string("675kPX9MHTjS2zt1qfr1NYHuzeLXfQM9H24wFSUt1Mp8")
+
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "ray_v4_pools.parquet")
+PARQUET_ENGINES = ("pyarrow", "fastparquet")
+
+AMM_ACCOUNT_SIZE = AMM_INFO_LAYOUT_V4_1.sizeof()
+
+
+def amm_dtype() -> np.dtype:
+    """
+    Structured dtype with the same offsets as AMM_INFO_LAYOUT_V4_1.
+
+    u64 fields map to little-endian uint64, 16-byte integers to two uint64 words
+    (low, high) and 32-byte keys to raw uint8[32].
+    """
+    names, formats, offsets = [], [], []
+    for name, (offset, size) in get_field_offsets(AMM_INFO_LAYOUT_V4_1).items():
+        names.append(name)
+        offsets.append(offset)
+        if size == 8:
+            formats.append("<u8")
+        elif size == 16:
+            formats.append(("<u8", (2,)))
+        else:
+            formats.append(("u1", (size,)))
+    return np.dtype(
+        {"names": names, "formats": formats, "offsets": offsets, "itemsize": AMM_ACCOUNT_SIZE}
+    )
+
+
+AMM_DTYPE = amm_dtype()
+
+# (column name, AMM_INFO_LAYOUT_V4_1 field)
+INT_COLUMNS = [
+    ("status", "status"),
+    ("base_decimals", "coinDecimals"),
+    ("quote_decimals", "pcDecimals"),
+    ("trade_fee_numerator", "tradeFeeNumerator"),
+    ("trade_fee_denominator", "tradeFeeDenominator"),
+    ("swap_fee_numerator", "swapFeeNumerator"),
+    ("swap_fee_denominator", "swapFeeDenominator"),
+    ("need_take_pnl_coin", "needTakePnlCoin"),
+    ("need_take_pnl_pc", "needTakePnlPc"),
+    ("pool_open_time", "poolOpenTime"),
+]
+KEY_COLUMNS = [
+    ("base_vault", "poolCoinTokenAccount"),
+    ("quote_vault", "poolPcTokenAccount"),
+    ("base_mint", "coinMintAddress"),
+    ("quote_mint", "pcMintAddress"),
+    ("lp_mint", "lpMintAddress"),
+    ("open_orders", "ammOpenOrders"),
+    ("target_orders", "ammTargetOrders"),
+    ("market_id", "serumMarket"),
+    ("market_program_id", "serumProgramId"),
+]
+
+
+def decode_accounts(datas) -> np.ndarray:
+    """
+    Decodes raw AMM account datas into one structured array, without a per-account
+    parse.
+    """
+    return np.frombuffer(b"".join(datas), dtype=AMM_DTYPE)
+
+
+def _keys_to_strings(column: np.ndarray) -> list:
+    raw = np.ascontiguousarray(column).tobytes()
+    return [str(Pubkey.from_bytes(raw[i : i + 32])) for i in range(0, len(raw), 32)]
+
+
+def snapshot_frame(amm_ids, records: np.ndarray) -> pd.DataFrame:
+    """
+    Builds the columnar table of a decoded snapshot.
+
+    Args:
+        amm_ids (list): AMM account pubkeys, in the same order as `records`.
+        records (np.ndarray): Output of decode_accounts.
+
+    Returns:
+        pd.DataFrame: One row per pool, keys as base58 strings.
+    """
+    columns = {"amm_id": [str(amm_id) for amm_id in amm_ids]}
+    for column, field in INT_COLUMNS:
+        columns[column] = records[field]
+    for column, field in KEY_COLUMNS:
+        columns[column] = _keys_to_strings(records[field])
+    return pd.DataFrame(columns)
+
+
+async def fetch_snapshot(ctx=None):
+    """
+    Fetches and decodes every RAY_V4 AMM account.
+
+    Returns:
+        tuple: (amm_ids, records) with records a structured array of AMM_DTYPE.
+    """
+    ctx = ctx or get_async_client(commitment=Confirmed)
+    resp = await ctx.get_program_accounts(
+        RAY_V4,
+        commitment=Confirmed,
+        encoding="base64",
+        filters=[AMM_ACCOUNT_SIZE],
+    )
+    amm_ids = [account.pubkey for account in resp.value]
+    records = decode_accounts(account.account.data for account in resp.value)
+    return amm_ids, records
+
+
+def parquet_engine() -> str:
+    """
+    Name of the first installed pandas Parquet engine, or None.
+    """
+    for engine in PARQUET_ENGINES:
+        if importlib.util.find_spec(engine) is not None:
+            return engine
+    return None
+
+
+def output_path(path: str) -> str:
+    """
+    Where write_snapshot will write `path`: a .parquet path becomes .csv when no
+    Parquet engine is installed. Checked before fetching, so a missing engine does
+    not cost a full getProgramAccounts download.
+    """
+    if path.endswith(".parquet") and parquet_engine() is None:
+        csv_path = path[: -len(".parquet")] + ".csv"
+        print(f"Neither {' nor '.join(PARQUET_ENGINES)} is installed, writing {csv_path} instead")
+        return csv_path
+    return path
+
+
+def write_snapshot(frame: pd.DataFrame, path: str):
+    """
+    Writes the snapshot table. Parquet output needs pyarrow (or fastparquet);
+    any other extension is written as CSV.
+    """
+    if path.endswith(".parquet"):
+        frame.to_parquet(path, index=False)
+    else:
+        frame.to_csv(path, index=False)
+
+
+async def main():
+    path = output_path(SNAPSHOT_PATH)
+    start = time.time()
+    try:
+        amm_ids, records = await fetch_snapshot()
+    finally:
+        await shutdown()
+    print(f"Fetched {len(amm_ids)} pools in {time.time() - start:.2f}s")
+
+    start = time.time()
+    frame = snapshot_frame(amm_ids, records)
+    write_snapshot(frame, path)
+    print(f"Decoded and wrote {path} in {time.time() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
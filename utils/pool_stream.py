@@ -0,0 +1,147 @@
+# utils/pool_stream.py
+
+import codecs
+import json
+
+"""
+Incremental parser for the Raydium liquidity JSON.
+
+The document is a single object whose "official" and "unOfficial" members are
+arrays with one object per pool. Instead of materializing the whole document, the
+parser walks it as chunks arrive, decodes one pool object at a time and yields only
+the fields the pool registry stores. Peak memory is bounded by the chunk size plus
+one pool entry, however big the upstream file gets.
+"""
+
+POOL_LISTS = ("official", "unOfficial")
+
+POOL_FIELDS = (
+    "id",
+    "authority",
+    "baseMint",
+    "quoteMint",
+    "lpMint",
+    "baseDecimals",
+    "quoteDecimals",
+    "openOrders",
+    "targetOrders",
+    "baseVault",
+    "quoteVault",
+    "marketId",
+    "marketBaseVault",
+    "marketQuoteVault",
+    "marketAuthority",
+    "marketBids",
+    "marketAsks",
+    "marketEventQueue",
+)
+
+WHITESPACE = " \t\n\r"
+
+
+class _Reader:
+    """
+    Text buffer over an iterator of byte chunks that is refilled on demand and
+    trimmed as values are consumed.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        if self.pos > 65536:
+            self.buf = self.buf[self.pos :]
+            self.pos = 0
+        for chunk in self._chunks:
+            text = self._decoder.decode(chunk)
+            if text:
+                self.buf += text
+                return True
+        self.buf += self._decoder.decode(b"", final=True)
+        self.eof = True
+        return False
+
+    def peek(self) -> str:
+        """
+        Skips whitespace and returns the next character without consuming it,
+        or "" at the end of the stream.
+        """
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos}, found {found!r}")
+        self.pos += 1
+
+    def value(self):
+        """
+        Decodes the next complete JSON value, pulling more chunks while it is
+        truncated.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self.buf, self.pos)
+                # A number at the very end of the buffer may still be incomplete
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+
+def iter_pools(chunks, lists=POOL_LISTS, fields=POOL_FIELDS):
+    """
+    Yields the pool entries of a Raydium liquidity JSON document as it streams in.
+
+    Args:
+        chunks: Iterable of byte chunks, e.g. `resp.iter_content(chunk_size)`.
+        lists (tuple): Top-level members holding pool arrays.
+        fields (tuple): Pool fields to keep.
+
+    Yields:
+        dict: One pool entry restricted to `fields`.
+    """
+    reader = _Reader(chunks)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.value()
+        reader.expect(":")
+        if key in lists and reader.peek() == "[":
+            reader.expect("[")
+            if reader.peek() == "]":
+                reader.pos += 1
+            else:
+                while True:
+                    pool = reader.value()
+                    yield {field: pool[field] for field in fields}
+                    if reader.peek() == ",":
+                        reader.pos += 1
+                        continue
+                    reader.expect("]")
+                    break
+        else:
+            reader.value()
+        if reader.peek() == ",":
+            reader.pos += 1
+            continue
+        reader.expect("}")
+        return
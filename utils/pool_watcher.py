@@ -0,0 +1,276 @@
+# utils/pool_watcher.py
+
+import asyncio
+import os
+import struct
+import sys
+
+import base58
+from dotenv import load_dotenv
+from solana.rpc.commitment import Confirmed
+from solders.pubkey import Pubkey
+
+from utils.mint_info import mint_info_cache
+from utils.pool_cache import pool_keys_cache
+from utils.pool_information import (
+    Buy_keys,
+    PUMP_LIQUIDITY_MIGRATOR,
+    RAY_AUTHORITY_V4,
+    RAY_V4,
+    WSOL,
+    decode_market_fields,
+)
+from utils.rpc import RPC_HTTPS_URL, get_async_client, rpc_request
+from utils.shutdown import shutdown
+from utils.ws import get_mux
+
+# Load .env file
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
+
+"""
+New Raydium V4 pool detector.
+
+A logsSubscribe on RAY_V4 sees every pool initialization the moment it is
+confirmed. For each transaction whose logs contain initialize2, the watcher reads
+the transaction once, takes the AMM accounts straight from the instruction's
+account list, reads the OpenBook market account and stores everything in
+pool_keys_cache, including the mint -> AMM id mapping. A later buy of the token
+then resolves the pool without getProgramAccounts, AMM or market reads.
+
+Run it next to the trading scripts with `python -m utils.pool_watcher`, with
+POOL_CACHE_PATH set so the cache file is shared between processes. `--pump` only
+keeps pools created by the pump.fun liquidity migrator.
+"""
+
+INITIALIZE2 = 1
+# tag, nonce, open_time, init_pc_amount, init_coin_amount
+INITIALIZE2_DATA = struct.Struct("<BBQQQ")
+INITIALIZE2_ACCOUNTS = 21
+# Positions in the initialize2 account list
+INITIALIZE2_FIELDS = {
+    "amm_id": 4,
+    "authority": 5,
+    "open_orders": 6,
+    "lp_mint": 7,
+    "base_mint": 8,
+    "quote_mint": 9,
+    "base_vault": 10,
+    "quote_vault": 11,
+    "target_orders": 12,
+    "marketProgramId": 15,
+    "market_id": 16,
+}
+INITIALIZE2_CREATOR = 17
+
+TRANSACTION_ATTEMPTS = 5
+TRANSACTION_RETRY_DELAY = 0.4
+
+
+def transaction_account_keys(transaction: dict) -> list:
+    """
+    Account keys of a json-encoded getTransaction result, including the ones
+    loaded from address lookup tables.
+    """
+    keys = list(transaction["transaction"]["message"]["accountKeys"])
+    loaded = (transaction.get("meta") or {}).get("loadedAddresses") or {}
+    return keys + loaded.get("writable", []) + loaded.get("readonly", [])
+
+
+def find_initialize2(transaction: dict):
+    """
+    Returns (account addresses, data bytes) of the first RAY_V4 initialize2
+    instruction in a transaction, top-level or inner, or None.
+    """
+    keys = transaction_account_keys(transaction)
+    instructions = list(transaction["transaction"]["message"]["instructions"])
+    for inner in (transaction.get("meta") or {}).get("innerInstructions") or []:
+        instructions.extend(inner["instructions"])
+    for ix in instructions:
+        if keys[ix["programIdIndex"]] != str(RAY_V4):
+            continue
+        data = base58.b58decode(ix["data"])
+        if data[:1] == bytes([INITIALIZE2]) and len(ix["accounts"]) >= INITIALIZE2_ACCOUNTS:
+            return [keys[i] for i in ix["accounts"]], data
+    return None
+
+
+def decode_initialize2(accounts: list, data: bytes, transaction: dict) -> dict:
+    """
+    AMM fields as decode_amm_fields returns them, built from an initialize2
+    instruction instead of the AMM account. Decimals come from the token balances
+    the transaction reports for both mints.
+    """
+    fields = {
+        name: Pubkey.from_string(accounts[index]) for name, index in INITIALIZE2_FIELDS.items()
+    }
+    decimals = {
+        balance["mint"]: balance["uiTokenAmount"]["decimals"]
+        for balance in (transaction.get("meta") or {}).get("postTokenBalances") or []
+    }
+    _, _, open_time, _, _ = INITIALIZE2_DATA.unpack_from(data)
+    base_decimals = decimals[str(fields["base_mint"])]
+    return {
+        "amm_id": fields["amm_id"],
+        "lp_mint": fields["lp_mint"],
+        "version": 4,
+        "base_decimals": base_decimals,
+        "quote_decimals": decimals[str(fields["quote_mint"])],
+        "lpDecimals": base_decimals,
+        "programId": RAY_V4,
+        "authority": RAY_AUTHORITY_V4,
+        "open_orders": fields["open_orders"],
+        "target_orders": fields["target_orders"],
+        "base_vault": fields["base_vault"],
+        "quote_vault": fields["quote_vault"],
+        # initialize2 leaves both unset
+        "withdrawQueue": Pubkey.default(),
+        "lpVault": Pubkey.default(),
+        "marketProgramId": fields["marketProgramId"],
+        "market_id": fields["market_id"],
+        "pool_open_time": open_time,
+    }
+
+
+class NewPoolWatcher:
+    """
+    Pre-warms pool_keys_cache with pools as they are initialized.
+
+    Args:
+        ctx: Async client used to read market accounts.
+        endpoint (str): RPC URL for getTransaction, RPC_HTTPS_URL by default.
+        creators: Only keep pools whose initialize2 signer is one of these, e.g.
+            (PUMP_LIQUIDITY_MIGRATOR,). All pools when None.
+        on_pool: Optional callback receiving the keys dict of each new pool.
+    """
+
+    def __init__(self, ctx=None, endpoint: str = None, creators=None, on_pool=None):
+        self.ctx = ctx
+        self.endpoint = endpoint or RPC_HTTPS_URL
+        self.creators = None if creators is None else {str(creator) for creator in creators}
+        self.on_pool = on_pool
+        self.seen = set()
+        self._handle = None
+        self._background = set()
+
+    async def start(self):
+        if self._handle is not None:
+            return
+        self._handle = await get_mux().subscribe(
+            "logsSubscribe",
+            [{"mentions": [str(RAY_V4)]}, {"commitment": "confirmed"}],
+            self._on_logs,
+        )
+
+    async def stop(self):
+        handle, self._handle = self._handle, None
+        if handle is not None:
+            await get_mux().unsubscribe(handle)
+        for task in list(self._background):
+            task.cancel()
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+
+    def _on_logs(self, result: dict):
+        value = result["value"]
+        if value.get("err") is not None:
+            return
+        if not any("initialize2" in log for log in value.get("logs") or ()):
+            return
+        signature = value["signature"]
+        if signature in self.seen:
+            return
+        self.seen.add(signature)
+        task = asyncio.create_task(self._resolve_quietly(signature))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _resolve_quietly(self, signature: str):
+        try:
+            await self.resolve(signature)
+        except Exception as e:
+            print(f"[pool_watcher] failed to resolve {signature}: {e}")
+
+    async def get_transaction(self, signature: str) -> dict:
+        params = [
+            signature,
+            {
+                "encoding": "json",
+                "commitment": "confirmed",
+                "maxSupportedTransactionVersion": 0,
+            },
+        ]
+        # The notification can arrive before the node serves the transaction
+        for _ in range(TRANSACTION_ATTEMPTS):
+            result = await rpc_request(self.endpoint, "getTransaction", params)
+            if result is not None:
+                return result
+            await asyncio.sleep(TRANSACTION_RETRY_DELAY)
+        raise RuntimeError("transaction not available")
+
+    async def resolve(self, signature: str):
+        """
+        Decodes the pool initialized by `signature` and stores it in
+        pool_keys_cache.
+
+        Returns:
+            dict or None: The keys dict gen_pool would return, None if the
+            transaction holds no initialize2 or the creator is filtered out.
+        """
+        transaction = await self.get_transaction(signature)
+        found = find_initialize2(transaction)
+        if found is None:
+            return None
+        accounts, data = found
+        if self.creators is not None and accounts[INITIALIZE2_CREATOR] not in self.creators:
+            return None
+        amm_fields = decode_initialize2(accounts, data, transaction)
+
+        market_id = amm_fields["market_id"]
+        market_fields = pool_keys_cache.get_market(market_id)
+        if market_fields is None:
+            ctx = self.ctx or get_async_client(RPC_HTTPS_URL, Confirmed)
+            account = (await ctx.get_account_info(market_id, commitment=Confirmed)).value
+            if account is None:
+                raise RuntimeError(f"market {market_id} not found")
+            market_fields = decode_market_fields(
+                market_id, amm_fields["marketProgramId"], account.data
+            )
+            pool_keys_cache.put_market(market_id, market_fields, save=False)
+
+        amm_id = amm_fields["amm_id"]
+        # initialize2 only carries keys fixed at pool creation, so they stay
+        # fresh as long as the market fields do
+        pool_keys_cache.put_amm(amm_id, amm_fields, save=False, ttl=pool_keys_cache.market.ttl)
+        base_mint = market_fields["base_mint"]
+        quote_mint = market_fields["quote_mint"]
+        if quote_mint == WSOL:
+            pool_keys_cache.put_pool_id(base_mint, amm_id, save=False)
+        elif base_mint == WSOL:
+            pool_keys_cache.put_pool_id(quote_mint, amm_id, save=False)
+        pool_keys_cache.save()
+
+        pool_keys = {**amm_fields, **market_fields}
+        pool_keys = {key: pool_keys[key] for key in Buy_keys}
+        mint_info_cache.seed_from_pool(pool_keys)
+        print(f"[pool_watcher] new pool {amm_id}: {base_mint} / {quote_mint}")
+        if self.on_pool is not None:
+            self.on_pool(pool_keys)
+        return pool_keys
+
+
+pool_watcher = NewPoolWatcher()
+
+
+async def main(pump_only: bool):
+    watcher = NewPoolWatcher(creators=(PUMP_LIQUIDITY_MIGRATOR,)) if pump_only else pool_watcher
+    try:
+        await watcher.start()
+        print(f"[pool_watcher] watching {RAY_V4} for initialize2")
+        await asyncio.Event().wait()
+    finally:
+        await watcher.stop()
+        await shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main("--pump" in sys.argv[1:]))
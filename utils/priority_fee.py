@@ -0,0 +1,177 @@
+# utils/priority_fee.py
+
+import asyncio
+import os
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+from utils.rpc import RPC_HTTPS_URL, rpc_request
+
+# Load .env file
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
+
+"""
+Priority fee oracle.
+
+A background task samples getRecentPrioritizationFees (per-slot minimum fees that
+landed a transaction writing the given accounts) for every account set a price was
+asked for, plus once without accounts for the network-wide view. The samples of the
+last WINDOW_SLOTS slots are kept in memory, and price() returns the configured
+percentile of that window, so the send path never waits on an RPC call.
+
+The landing-speed target is PRIORITY_FEE_LEVEL: one of the named levels below or a
+percentile from 0 to 100. Until the first sample arrives, price() returns the
+previous hard-coded price.
+"""
+
+FEE_LEVELS = {"low": 25, "medium": 50, "high": 75, "very_high": 90, "max": 99}
+PRIORITY_FEE_LEVEL = os.getenv("PRIORITY_FEE_LEVEL", "high")
+PRIORITY_FEE_MIN = int(os.getenv("PRIORITY_FEE_MIN", 1_000))
+PRIORITY_FEE_MAX = int(os.getenv("PRIORITY_FEE_MAX", 2_000_000))
+FALLBACK_PRICE = 498_750
+
+REFRESH_INTERVAL = 2.0
+WINDOW_SLOTS = 150
+MAX_ACCOUNT_SETS = 32
+# getRecentPrioritizationFees accepts up to 128 accounts
+MAX_FEE_ACCOUNTS = 128
+
+
+def level_percentile(level) -> float:
+    if str(level) in FEE_LEVELS:
+        return FEE_LEVELS[str(level)]
+    return float(level)
+
+
+def percentile(values, q: float) -> int:
+    """
+    Nearest-rank percentile of a non-empty sequence.
+    """
+    values = sorted(values)
+    rank = max(0, min(len(values) - 1, int(round(q / 100 * (len(values) - 1)))))
+    return values[rank]
+
+
+def swap_fee_accounts(pool_keys: dict) -> tuple:
+    """
+    The writable pool accounts of a Raydium V4 swap, which decide its fee market.
+    """
+    return tuple(
+        str(pool_keys[field])
+        for field in (
+            "amm_id",
+            "open_orders",
+            "target_orders",
+            "base_vault",
+            "quote_vault",
+            "market_id",
+            "bids",
+            "asks",
+            "event_queue",
+            "market_base_vault",
+            "market_quote_vault",
+        )
+    )
+
+
+class PriorityFeeOracle:
+    """
+    Rolling per-account-set prioritization fee percentiles.
+
+    Args:
+        endpoint (str): RPC URL to sample, RPC_HTTPS_URL by default.
+        level: Default landing-speed target, a FEE_LEVELS name or a percentile.
+        refresh_interval (float): Seconds between sampling rounds.
+    """
+
+    def __init__(self, endpoint: str = None, level=PRIORITY_FEE_LEVEL, refresh_interval: float = REFRESH_INTERVAL):
+        self.endpoint = endpoint or RPC_HTTPS_URL
+        self.level = level
+        self.refresh_interval = refresh_interval
+        self._fees = OrderedDict()
+        self._task = None
+        self._lock = asyncio.Lock()
+
+    def watch(self, accounts=()) -> tuple:
+        """
+        Adds an account set to the sampling rounds and returns its key.
+        """
+        key = tuple(sorted(str(account) for account in accounts))[:MAX_FEE_ACCOUNTS]
+        if key in self._fees:
+            self._fees.move_to_end(key)
+        else:
+            self._fees[key] = None
+            while len(self._fees) > MAX_ACCOUNT_SETS:
+                oldest = next(k for k in self._fees if k)
+                del self._fees[oldest]
+        return key
+
+    async def sample(self, key: tuple):
+        result = await rpc_request(
+            self.endpoint, "getRecentPrioritizationFees", [list(key)] if key else []
+        )
+        fees = self._fees.get(key) or {}
+        for entry in result:
+            fees[entry["slot"]] = entry["prioritizationFee"]
+        if fees:
+            newest = max(fees)
+            fees = {slot: fee for slot, fee in fees.items() if slot > newest - WINDOW_SLOTS}
+        if key in self._fees:
+            self._fees[key] = fees
+
+    async def refresh(self):
+        keys = list(self._fees)
+        results = await asyncio.gather(*(self.sample(key) for key in keys), return_exceptions=True)
+        for key, result in zip(keys, results):
+            if isinstance(result, Exception):
+                print(f"[priority_fee] sampling {len(key)} accounts failed: {result}")
+
+    async def start(self, accounts=()):
+        """
+        Samples the network-wide fees and `accounts` once and starts the
+        background refresh. Safe to call repeatedly and concurrently.
+        """
+        self.watch()
+        self.watch(accounts)
+        async with self._lock:
+            if self._task is not None:
+                return
+            await self.refresh()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[priority_fee] refresh failed: {e}")
+
+    def price(self, accounts=(), level=None) -> int:
+        """
+        Compute unit price in micro-lamports for a transaction writing `accounts`.
+
+        Served from memory: a new account set is sampled from the next refresh on,
+        and until then the network-wide window (or FALLBACK_PRICE) is used.
+        """
+        key = self.watch(accounts)
+        fees = self._fees.get(key) or self._fees.get(())
+        if not fees:
+            return FALLBACK_PRICE
+        value = percentile(fees.values(), level_percentile(level or self.level))
+        return max(PRIORITY_FEE_MIN, min(PRIORITY_FEE_MAX, int(value)))
+
+
+priority_fee_oracle = PriorityFeeOracle()
@@ -0,0 +1,125 @@
+# utils/quote.py
+
+import os
+
+import numpy as np
+
+"""
+Local constant-product quotes for Raydium AMM V4 swap_base_in.
+
+Mirrors the on-chain math: the swap fee (swapFeeNumerator/swapFeeDenominator, of
+which the trade fee is the LP share) is taken from the input rounding up, and the
+output is floor(reserve_out * in_after_fee / (reserve_in + in_after_fee)) with the
+reserves being the vault balances minus needTakePnlCoin/needTakePnlPc. No network
+round trip is needed once the reserves are known (see utils.reserve_tracker).
+"""
+
+SLIPPAGE_BPS = int(os.getenv("SLIPPAGE_BPS", 100))
+BPS = 10_000
+
+
+def swap_base_in(
+    amount_in: int,
+    reserve_in: int,
+    reserve_out: int,
+    fee_numerator: int,
+    fee_denominator: int,
+) -> int:
+    """
+    Exact output amount of a swap_base_in, in integer arithmetic.
+    """
+    amount_in = int(amount_in)
+    fee = -(-amount_in * fee_numerator // fee_denominator)
+    amount_in_after_fee = amount_in - fee
+    if amount_in_after_fee <= 0:
+        return 0
+    return reserve_out * amount_in_after_fee // (reserve_in + amount_in_after_fee)
+
+
+def swap_base_in_many(
+    amounts_in,
+    reserve_in: int,
+    reserve_out: int,
+    fee_numerator: int,
+    fee_denominator: int,
+    exact: bool = False,
+) -> np.ndarray:
+    """
+    Vectorized swap_base_in over an array of input sizes.
+
+    By default the curve is evaluated in float64, which is fast but can be off by a
+    few units for large amounts. With `exact`, the same expression runs over Python
+    integers (object arrays) and matches swap_base_in exactly.
+    """
+    if exact:
+        amounts = np.asarray([int(a) for a in np.ravel(amounts_in)], dtype=object)
+        fees = -(-amounts * fee_numerator // fee_denominator)
+        after_fee = np.maximum(amounts - fees, 0)
+        return reserve_out * after_fee // (reserve_in + after_fee)
+
+    amounts = np.asarray(amounts_in, dtype=np.float64)
+    fees = np.ceil(amounts * fee_numerator / fee_denominator)
+    after_fee = np.maximum(amounts - fees, 0.0)
+    return np.floor(float(reserve_out) * after_fee / (float(reserve_in) + after_fee))
+
+
+def apply_slippage(amount_out: int, slippage_bps: int = SLIPPAGE_BPS) -> int:
+    """
+    Lowest acceptable output for a quote, at least 1.
+    """
+    return max(1, int(amount_out) * (BPS - slippage_bps) // BPS)
+
+
+def pool_sides(pool_keys: dict, reserves, input_mint):
+    """
+    Returns (reserve_in, reserve_out) for a swap that sells `input_mint` into the pool.
+    """
+    if str(pool_keys["base_mint"]) == str(input_mint):
+        return reserves.base_reserve, reserves.quote_reserve
+    if str(pool_keys["quote_mint"]) == str(input_mint):
+        return reserves.quote_reserve, reserves.base_reserve
+    raise ValueError(f"{input_mint} is not traded by pool {pool_keys['amm_id']}")
+
+
+def quote(pool_keys: dict, reserves, input_mint, amount_in: int) -> int:
+    """
+    Exact swap_base_in output for `amount_in` of `input_mint`.
+    """
+    reserve_in, reserve_out = pool_sides(pool_keys, reserves, input_mint)
+    return swap_base_in(
+        amount_in,
+        reserve_in,
+        reserve_out,
+        reserves.swap_fee_numerator,
+        reserves.swap_fee_denominator,
+    )
+
+
+def quote_many(pool_keys: dict, reserves, input_mint, amounts_in, exact: bool = False):
+    """
+    swap_base_in outputs for an array of input sizes of `input_mint`.
+    """
+    reserve_in, reserve_out = pool_sides(pool_keys, reserves, input_mint)
+    return swap_base_in_many(
+        amounts_in,
+        reserve_in,
+        reserve_out,
+        reserves.swap_fee_numerator,
+        reserves.swap_fee_denominator,
+        exact=exact,
+    )
+
+
+def min_amount_out(
+    pool_keys: dict, reserves, input_mint, amount_in: int, slippage_bps: int = SLIPPAGE_BPS
+) -> int:
+    """
+    Slippage-bounded min_amount_out for a swap instruction.
+
+    Raises:
+        ValueError: If no reserves are known for the pool. Sending with
+            min_amount_out=1 would accept any fill.
+    """
+    if reserves is None:
+        raise ValueError(f"No reserves known for pool {pool_keys['amm_id']}, refusing an unbounded swap")
+    return apply_slippage(quote(pool_keys, reserves, input_mint, amount_in), slippage_bps)
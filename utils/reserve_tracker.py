@@ -0,0 +1,254 @@
+# utils/reserve_tracker.py
+
+import asyncio
+import base64
+
+from solana.rpc.commitment import Confirmed
+
+from utils.layouts import AmmInfoView, SplAccountView
+from utils.rpc import get_async_client, get_multiple_accounts
+from utils.ws import get_mux
+
+"""
+Live pool reserves fed by websocket account subscriptions.
+
+For every tracked pool the base vault, quote vault and AMM account are subscribed
+over the shared SubscriptionMux. Each update is stamped with its slot and older
+updates are ignored, so quote, slippage and valuation code can read the current
+reserves without an RPC round trip.
+"""
+
+
+class PoolReserves:
+    """
+    Slot-stamped reserves of one pool.
+
+    base_reserve/quote_reserve are the vault balances minus the PnL the AMM still
+    has to take (needTakePnlCoin/needTakePnlPc), i.e. the amounts the swap math uses.
+    """
+
+    __slots__ = (
+        "base_vault_amount",
+        "quote_vault_amount",
+        "need_take_pnl_coin",
+        "need_take_pnl_pc",
+        "trade_fee_numerator",
+        "trade_fee_denominator",
+        "swap_fee_numerator",
+        "swap_fee_denominator",
+        "slots",
+    )
+
+    def __init__(self):
+        self.base_vault_amount = None
+        self.quote_vault_amount = None
+        self.need_take_pnl_coin = None
+        self.need_take_pnl_pc = None
+        self.trade_fee_numerator = None
+        self.trade_fee_denominator = None
+        self.swap_fee_numerator = None
+        self.swap_fee_denominator = None
+        self.slots = {"base": -1, "quote": -1, "amm": -1}
+
+    @property
+    def ready(self) -> bool:
+        return min(self.slots.values()) >= 0
+
+    @property
+    def slot(self) -> int:
+        return max(self.slots.values())
+
+    @property
+    def base_reserve(self) -> int:
+        return self.base_vault_amount - self.need_take_pnl_coin
+
+    @property
+    def quote_reserve(self) -> int:
+        return self.quote_vault_amount - self.need_take_pnl_pc
+
+    def update(self, part: str, slot: int, data: bytes) -> bool:
+        if slot < self.slots[part]:
+            return False
+        if part == "amm":
+            amm = AmmInfoView(data)
+            self.need_take_pnl_coin = amm.u64("needTakePnlCoin")
+            self.need_take_pnl_pc = amm.u64("needTakePnlPc")
+            self.trade_fee_numerator = amm.u64("tradeFeeNumerator")
+            self.trade_fee_denominator = amm.u64("tradeFeeDenominator")
+            self.swap_fee_numerator = amm.u64("swapFeeNumerator")
+            self.swap_fee_denominator = amm.u64("swapFeeDenominator")
+        elif part == "base":
+            self.base_vault_amount = SplAccountView(data).u64("amount")
+        else:
+            self.quote_vault_amount = SplAccountView(data).u64("amount")
+        self.slots[part] = slot
+        return True
+
+
+def pool_accounts(pool_keys: dict) -> tuple:
+    """
+    (part, pubkey) of the three accounts PoolReserves is built from.
+    """
+    return (
+        ("amm", pool_keys["amm_id"]),
+        ("base", pool_keys["base_vault"]),
+        ("quote", pool_keys["quote_vault"]),
+    )
+
+
+class ReserveTracker:
+    """
+    Keeps PoolReserves up to date for pools resolved by gen_pool.
+
+    buy() and sell() track every pool they resolve. After a websocket reconnect
+    every tracked pool is re-read, since changes made while disconnected are never
+    notified.
+
+    Args:
+        mux: SubscriptionMux to subscribe on, the shared one by default.
+        ctx: Async client used to seed the current state.
+    """
+
+    def __init__(self, mux=None, ctx=None):
+        self.mux = mux or get_mux()
+        self.ctx = ctx
+        self._pools = {}
+        self._accounts = {}
+        self._handles = {}
+        self._background = set()
+        self.mux.on_reconnect(self._on_reconnect)
+
+    def get(self, amm_id):
+        """
+        Returns the PoolReserves of a tracked pool once every part has been seen,
+        else None.
+        """
+        reserves = self._pools.get(str(amm_id))
+        if reserves is None or not reserves.ready:
+            return None
+        return reserves
+
+    async def read(self, pool_keys: dict):
+        """
+        Reserves to quote with: the tracked ones when ready, otherwise the three
+        accounts read once with getMultipleAccounts, without subscribing.
+
+        Returns:
+            PoolReserves or None: None if an account does not exist.
+        """
+        reserves = self.get(pool_keys["amm_id"])
+        if reserves is not None:
+            return reserves
+        reserves = PoolReserves()
+        accounts = pool_accounts(pool_keys)
+        ctx = self.ctx or get_async_client(commitment=Confirmed)
+        slot, datas = await get_multiple_accounts(ctx, [pubkey for _, pubkey in accounts])
+        for (part, _), account in zip(accounts, datas):
+            if account is not None:
+                reserves.update(part, slot, account.data)
+        return reserves if reserves.ready else None
+
+    async def track(self, pool_keys: dict, seed: bool = True):
+        """
+        Subscribes to a pool's vaults and AMM account.
+
+        Args:
+            pool_keys (dict): Keys dict from gen_pool / fetch_pool_keys.
+            seed (bool): Read the three accounts once with getMultipleAccounts so
+                the reserves are usable before the first change notification.
+        """
+        await self.track_many([pool_keys], seed)
+        return self._pools[str(pool_keys["amm_id"])]
+
+    async def track_many(self, pools, seed: bool = True):
+        """
+        Like track() for many pools, seeding all new ones with one chunked
+        getMultipleAccounts read. Pools already tracked are left as they are.
+        """
+        new = []
+        for pool_keys in pools:
+            amm_id = str(pool_keys["amm_id"])
+            if amm_id in self._pools:
+                continue
+            self._pools[amm_id] = PoolReserves()
+            self._accounts[amm_id] = pool_accounts(pool_keys)
+            new.append(amm_id)
+
+        for amm_id in new:
+            reserves = self._pools[amm_id]
+            handles = []
+            for part, pubkey in self._accounts[amm_id]:
+                handles.append(
+                    await self.mux.subscribe(
+                        "accountSubscribe",
+                        [str(pubkey), {"encoding": "base64", "commitment": "confirmed"}],
+                        self._on_account(reserves, part),
+                    )
+                )
+            self._handles[amm_id] = handles
+
+        if seed and new:
+            try:
+                await self.seed(new)
+            except Exception as e:
+                print(f"[reserves] failed to seed {len(new)} pools: {e}")
+
+    async def seed(self, amm_ids=None):
+        """
+        Reads the AMM and vault accounts of tracked pools, every one by default.
+        Parts a notification already delivered at a newer slot are kept.
+        """
+        amm_ids = [str(amm_id) for amm_id in (self._pools if amm_ids is None else amm_ids)]
+        parts = [
+            (self._pools[amm_id], part, pubkey)
+            for amm_id in amm_ids
+            if amm_id in self._pools
+            for part, pubkey in self._accounts[amm_id]
+        ]
+        if not parts:
+            return
+        ctx = self.ctx or get_async_client(commitment=Confirmed)
+        slot, accounts = await get_multiple_accounts(ctx, [pubkey for _, _, pubkey in parts])
+        for (reserves, part, _), account in zip(parts, accounts):
+            if account is not None:
+                reserves.update(part, slot, account.data)
+
+    async def _reseed_quietly(self):
+        try:
+            await self.seed()
+        except Exception as e:
+            print(f"[reserves] re-seed after reconnect failed: {e}")
+
+    def _on_reconnect(self):
+        if not self._pools:
+            return
+        task = asyncio.create_task(self._reseed_quietly())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def untrack(self, amm_id):
+        amm_id = str(amm_id)
+        self._pools.pop(amm_id, None)
+        self._accounts.pop(amm_id, None)
+        for handle in self._handles.pop(amm_id, []):
+            await self.mux.unsubscribe(handle)
+
+    async def stop(self):
+        """
+        Cancels a re-seed still running; subscriptions end with the mux.
+        """
+        for task in list(self._background):
+            task.cancel()
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+
+    @staticmethod
+    def _on_account(reserves: PoolReserves, part: str):
+        def callback(result):
+            data = base64.b64decode(result["value"]["data"][0])
+            reserves.update(part, result["context"]["slot"], data)
+
+        return callback
+
+
+reserve_tracker = ReserveTracker()
@@ -0,0 +1,189 @@
+# utils/rpc.py
+
+import asyncio
+import os
+
+import httpx
+from dotenv import load_dotenv
+from solana.rpc.api import Client
+from solana.rpc.async_api import AsyncClient
+from solana.rpc.commitment import Confirmed
+
+# Load .env file
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
+
+"""
+Shared, long-lived RPC clients.
+
+Creating an AsyncClient per call opens a new TCP/TLS connection for every request
+and never closes it. Every module gets its clients from here instead: all clients
+for one endpoint share a single pooled keep-alive HTTP session (HTTP/2 when the
+`h2` package is installed), and close_async_clients()/close_clients() shut the
+sessions down cleanly at the end of a run.
+
+Sessions are bound to the event loop they were first used on, so use them from one
+asyncio.run() per process, as the scripts in this repo do.
+
+solana-py has no argument for passing a session in, so the shared one replaces the
+private `_provider.session` of each client. This relies on the provider layout of
+solana==0.36.2 (pinned in requirements.txt); check it when upgrading.
+"""
+
+RPC_HTTPS_URL = os.getenv("RPC_HTTPS_URL")
+
+RPC_TIMEOUT = float(os.getenv("RPC_TIMEOUT", 10))
+RPC_MAX_CONNECTIONS = int(os.getenv("RPC_MAX_CONNECTIONS", 32))
+RPC_MAX_KEEPALIVE = int(os.getenv("RPC_MAX_KEEPALIVE", 16))
+RPC_KEEPALIVE_EXPIRY = float(os.getenv("RPC_KEEPALIVE_EXPIRY", 60))
+MULTIPLE_ACCOUNTS_LIMIT = 100
+
+try:
+    import h2  # noqa: F401
+
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+_async_sessions = {}
+_async_clients = {}
+# Sessions the clients created for themselves, never used; closed with the shared ones
+_replaced_async_sessions = []
+_sessions = {}
+_clients = {}
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=RPC_MAX_CONNECTIONS,
+        max_keepalive_connections=RPC_MAX_KEEPALIVE,
+        keepalive_expiry=RPC_KEEPALIVE_EXPIRY,
+    )
+
+
+def get_async_session(endpoint: str = None) -> httpx.AsyncClient:
+    """
+    Returns the shared pooled HTTP session for an endpoint, also usable for plain
+    HTTP APIs that are not Solana RPC.
+    """
+    endpoint = endpoint or RPC_HTTPS_URL
+    session = _async_sessions.get(endpoint)
+    if session is None:
+        session = _async_sessions[endpoint] = httpx.AsyncClient(
+            timeout=RPC_TIMEOUT, limits=_limits(), http2=HTTP2
+        )
+    return session
+
+
+def get_async_client(endpoint: str = None, commitment=None) -> AsyncClient:
+    """
+    Returns the shared AsyncClient for an endpoint and commitment.
+
+    Args:
+        endpoint (str): RPC URL, RPC_HTTPS_URL by default.
+        commitment: Default commitment of the client.
+
+    Returns:
+        AsyncClient: A client whose HTTP session is shared with every other client
+        for the same endpoint.
+    """
+    endpoint = endpoint or RPC_HTTPS_URL
+    key = (endpoint, commitment)
+    client = _async_clients.get(key)
+    if client is None:
+        client = AsyncClient(endpoint, commitment=commitment, timeout=RPC_TIMEOUT)
+        # Closing needs a running loop, so the unused session is closed at shutdown
+        _replaced_async_sessions.append(client._provider.session)
+        client._provider.session = get_async_session(endpoint)
+        _async_clients[key] = client
+    return client
+
+
+def get_client(endpoint: str = None, commitment=None) -> Client:
+    """
+    Returns the shared synchronous Client for an endpoint and commitment.
+    """
+    endpoint = endpoint or RPC_HTTPS_URL
+    key = (endpoint, commitment)
+    client = _clients.get(key)
+    if client is None:
+        session = _sessions.get(endpoint)
+        if session is None:
+            session = _sessions[endpoint] = httpx.Client(
+                timeout=RPC_TIMEOUT, limits=_limits(), http2=HTTP2
+            )
+        client = Client(endpoint, commitment=commitment, timeout=RPC_TIMEOUT)
+        client._provider.session.close()
+        client._provider.session = session
+        _clients[key] = client
+    return client
+
+
+async def rpc_request(endpoint: str, method: str, params: list = None, timeout: float = None):
+    """
+    Sends one raw JSON-RPC request over the shared session of `endpoint`, for
+    methods solana-py does not wrap or where its typed responses are not needed.
+
+    Args:
+        endpoint (str): RPC URL, RPC_HTTPS_URL by default.
+        method (str): JSON-RPC method, e.g. "simulateTransaction".
+        params (list): Its params.
+        timeout (float): Overrides RPC_TIMEOUT for this request.
+
+    Returns:
+        The "result" member of the response.
+
+    Raises:
+        httpx.HTTPError: If the request failed or returned an HTTP error status.
+        RuntimeError: With the node's error message if it answered with an error.
+    """
+    endpoint = endpoint or RPC_HTTPS_URL
+    body = {"jsonrpc": "2.0", "id": 1, "method": method, "params": params or []}
+    kwargs = {} if timeout is None else {"timeout": timeout}
+    response = await get_async_session(endpoint).post(endpoint, json=body, **kwargs)
+    response.raise_for_status()
+    data = response.json()
+    if "error" in data:
+        raise RuntimeError(data["error"].get("message"))
+    return data["result"]
+
+
+async def get_multiple_accounts(ctx, pubkeys: list, commitment=Confirmed) -> tuple:
+    """
+    Reads accounts in getMultipleAccounts chunks, all chunks in flight at once.
+
+    Returns:
+        tuple: (slot, accounts) with the accounts (None where missing) in the
+        order of `pubkeys`, and the lowest context slot of the chunks.
+    """
+    chunks = [
+        pubkeys[i : i + MULTIPLE_ACCOUNTS_LIMIT]
+        for i in range(0, len(pubkeys), MULTIPLE_ACCOUNTS_LIMIT)
+    ]
+    responses = await asyncio.gather(
+        *(ctx.get_multiple_accounts(chunk, commitment=commitment) for chunk in chunks)
+    )
+    slot = min((response.context.slot for response in responses), default=0)
+    return slot, [account for response in responses for account in response.value]
+
+
+async def close_async_clients():
+    """
+    Closes every shared async session. Clients handed out before are unusable after.
+    """
+    sessions = list(_async_sessions.values()) + _replaced_async_sessions
+    _async_sessions.clear()
+    _async_clients.clear()
+    _replaced_async_sessions.clear()
+    for session in sessions:
+        await session.aclose()
+
+
+def close_clients():
+    """
+    Closes every shared synchronous session.
+    """
+    sessions = list(_sessions.values())
+    _sessions.clear()
+    _clients.clear()
+    for session in sessions:
+        session.close()
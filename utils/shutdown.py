@@ -0,0 +1,38 @@
+# utils/shutdown.py
+
+from utils import birdeye
+from utils.blockhash import blockhash_prefetcher
+from utils.broadcast import broadcaster
+from utils.compute_units import compute_unit_calibrator
+from utils.lookup_tables import lookup_table_manager
+from utils.priority_fee import priority_fee_oracle
+from utils.reserve_tracker import reserve_tracker
+from utils.rpc import close_async_clients, close_clients
+from utils.signature_tracker import signature_tracker
+from utils.ws import get_mux
+
+"""
+Teardown of the process-wide background services.
+
+Every script ends its main coroutine with `await shutdown()` in a finally block, so
+a new shared service only has to be added here.
+"""
+
+
+async def shutdown():
+    """
+    Lets background sends, calibrations and lookup table extensions finish, stops
+    every background loop and the shared websocket, then closes the shared HTTP
+    sessions. Services that were never started are skipped by their own stop/wait.
+    """
+    await broadcaster.wait()
+    await compute_unit_calibrator.wait()
+    await lookup_table_manager.wait()
+    await birdeye.stop()
+    await blockhash_prefetcher.stop()
+    await priority_fee_oracle.stop()
+    await signature_tracker.stop()
+    await reserve_tracker.stop()
+    await get_mux().stop()
+    await close_async_clients()
+    close_clients()
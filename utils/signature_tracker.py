@@ -0,0 +1,212 @@
+# utils/signature_tracker.py
+
+import asyncio
+import time
+
+from solana.rpc.commitment import Confirmed
+from solders.signature import Signature
+
+from utils.blockhash import blockhash_prefetcher
+from utils.rpc import get_async_client
+
+"""
+Batched status tracking for in-flight transactions.
+
+Every pending signature is registered in one in-flight table. A single background
+loop reads their statuses with getSignatureStatuses in chunks of up to
+STATUS_BATCH_LIMIT signatures and resolves each waiter's future, so the RPC load
+stays at one batch per POLL_INTERVAL however many transactions are in flight.
+
+Pending signatures are grouped by the last_valid_block_height of the blockhash they
+were sent with. Once the prefetcher's block height estimate passes it, the whole
+group is expired in one go, right after a status read that still included it.
+"""
+
+STATUS_BATCH_LIMIT = 256
+POLL_INTERVAL = 1.0
+MAX_WAIT = 90.0
+
+COMMITMENT_LEVELS = {"processed": 0, "confirmed": 1, "finalized": 2}
+
+
+def _status_level(status) -> int:
+    if status is None or status.confirmation_status is None:
+        return -1
+    name = str(status.confirmation_status).rsplit(".", 1)[-1].lower()
+    return COMMITMENT_LEVELS.get(name, -1)
+
+
+class _Pending:
+    __slots__ = ("signature", "level", "deadline", "future", "waiters")
+
+    def __init__(self, signature, level, deadline, future):
+        self.signature = signature
+        self.level = level
+        self.deadline = deadline
+        self.future = future
+        self.waiters = 1
+
+
+class SignatureTracker:
+    """
+    Resolves many pending signatures with shared getSignatureStatuses batches.
+
+    Args:
+        ctx: Async client to read statuses with.
+        prefetcher: BlockhashPrefetcher whose block height estimate drives expiry.
+        poll_interval (float): Seconds between status batches.
+        max_wait (float): Upper bound in seconds per signature, used while the
+            block height is unknown.
+    """
+
+    def __init__(self, ctx=None, prefetcher=None, poll_interval: float = POLL_INTERVAL, max_wait: float = MAX_WAIT):
+        self.ctx = ctx
+        self.prefetcher = prefetcher or blockhash_prefetcher
+        self.poll_interval = poll_interval
+        self.max_wait = max_wait
+        self._pending = {}
+        self._by_block_height = {}
+        self._wakeup = None
+        self._task = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def register(self, signature, last_valid_block_height: int, commitment: str = "confirmed") -> asyncio.Future:
+        """
+        Adds a sent transaction to the in-flight table. Registering a signature
+        that is already pending shares its future; every register() should be
+        paired with a discard() once the caller stops waiting.
+
+        Args:
+            signature: Transaction signature (Signature or base58 string).
+            last_valid_block_height (int): From the blockhash it was compiled with.
+            commitment (str): Commitment to wait for.
+
+        Returns:
+            asyncio.Future: Resolves to (confirmed, err) like confirm_signature,
+            with err "expired" if the blockhash expired first.
+        """
+        if isinstance(signature, str):
+            signature = Signature.from_string(signature)
+        key = str(signature)
+        entry = self._pending.get(key)
+        if entry is not None:
+            entry.waiters += 1
+            return entry.future
+
+        loop = asyncio.get_running_loop()
+        entry = _Pending(
+            signature,
+            COMMITMENT_LEVELS[commitment],
+            time.monotonic() + self.max_wait,
+            loop.create_future(),
+        )
+        self._pending[key] = entry
+        self._by_block_height.setdefault(last_valid_block_height, set()).add(key)
+
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return entry.future
+
+    async def wait(self, signature, last_valid_block_height: int, commitment: str = "confirmed"):
+        """
+        Registers a signature and waits for its (confirmed, err) result.
+        """
+        return await asyncio.shield(self.register(signature, last_valid_block_height, commitment))
+
+    def discard(self, signature, future=None):
+        """
+        Releases one register() of a signature, e.g. when its confirmation arrived
+        elsewhere. The signature stops being tracked, and its future is cancelled,
+        only once the last waiter has left.
+
+        Args:
+            signature: Transaction signature.
+            future: The future register() returned. When given, a later
+                registration of the same signature is left alone.
+        """
+        key = str(signature)
+        entry = self._pending.get(key)
+        if entry is None or (future is not None and entry.future is not future):
+            return
+        entry.waiters -= 1
+        if entry.waiters <= 0:
+            self._drop(key)
+
+    def _drop(self, key: str):
+        entry = self._pending.pop(key, None)
+        if entry is not None and not entry.future.done():
+            entry.future.cancel()
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        for key in list(self._pending):
+            self._drop(key)
+        self._by_block_height.clear()
+
+    async def poll(self):
+        """
+        Reads every pending status once and resolves or expires what it can.
+        """
+        ctx = self.ctx or get_async_client(commitment=Confirmed)
+        keys = list(self._pending)
+        for i in range(0, len(keys), STATUS_BATCH_LIMIT):
+            chunk = [self._pending[key] for key in keys[i : i + STATUS_BATCH_LIMIT] if key in self._pending]
+            if not chunk:
+                continue
+            resp = await ctx.get_signature_statuses([entry.signature for entry in chunk])
+            for entry, status in zip(chunk, resp.value):
+                if _status_level(status) >= entry.level:
+                    self._resolve(entry, status.err is None, status.err)
+        self._expire()
+
+    def _resolve(self, entry: _Pending, confirmed: bool, err):
+        self._pending.pop(str(entry.signature), None)
+        if not entry.future.done():
+            entry.future.set_result((confirmed, err))
+
+    def _expire(self):
+        now = time.monotonic()
+        block_height = None
+        if self.prefetcher.fetched_at is not None:
+            block_height = self.prefetcher.block_height()
+
+        for last_valid_block_height in list(self._by_block_height):
+            keys = self._by_block_height[last_valid_block_height]
+            keys.intersection_update(self._pending)
+            if block_height is not None and block_height > last_valid_block_height:
+                for key in keys:
+                    self._resolve(self._pending[key], False, "expired")
+                keys.clear()
+            else:
+                for key in [key for key in keys if self._pending[key].deadline < now]:
+                    self._resolve(self._pending[key], False, "expired")
+                    keys.discard(key)
+            if not keys:
+                del self._by_block_height[last_valid_block_height]
+
+    async def _run(self):
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[signatures] status batch failed: {e}")
+
+
+signature_tracker = SignatureTracker()
@@ -0,0 +1,226 @@
+# utils/swap_template.py
+
+import struct
+from collections import OrderedDict
+
+from solders.compute_budget import set_compute_unit_limit, set_compute_unit_price
+from solders.hash import Hash
+from solders.instruction import CompiledInstruction
+from solders.message import MessageV0
+from solders.transaction import VersionedTransaction
+
+from utils.compute_units import compute_unit_calibrator, message_shape
+from utils.create_close_account import SWAP_DISCRIMINATOR, make_swap_instruction
+
+"""
+Precompiled swap transaction templates.
+
+Building a swap from scratch means creating 18 AccountMeta objects, encoding the
+instruction and running MessageV0.try_compile over the whole instruction list. For a
+given pool, pair of user token accounts and owner the compiled message never changes
+except for the swap amounts, the compute budget and the recent blockhash, so it is
+compiled once and cached. Each later trade only swaps in new data for the swap
+instruction (discriminator + amount_in + min_amount_out) and the compute budget
+instructions, and the blockhash, before signing.
+"""
+
+TEMPLATE_CACHE_SIZE = 256
+SWAP_AMOUNTS = struct.Struct("<QQ")
+# SetComputeUnitPrice: instruction tag 3 + u64 micro-lamports
+COMPUTE_UNIT_PRICE = struct.Struct("<BQ")
+SET_COMPUTE_UNIT_PRICE = 3
+# SetComputeUnitLimit: instruction tag 2 + u32 units
+COMPUTE_UNIT_LIMIT = struct.Struct("<BI")
+SET_COMPUTE_UNIT_LIMIT = 2
+
+
+class SwapTemplate:
+    """
+    A compiled swap message whose amounts, compute budget and blockhash can be
+    replaced.
+
+    Args:
+        message (MessageV0): Message compiled with placeholder amounts.
+        swap_index (int): Index of the swap instruction in message.instructions.
+            SetComputeUnitPrice and SetComputeUnitLimit follow it.
+    """
+
+    def __init__(self, message: MessageV0, swap_index: int):
+        self.header = message.header
+        self.account_keys = message.account_keys
+        self.address_table_lookups = message.address_table_lookups
+        self.instructions = list(message.instructions)
+        self.swap_index = swap_index
+        swap = self.instructions[swap_index]
+        self._swap_program_index = swap.program_id_index
+        self._swap_accounts = bytes(swap.accounts)
+        self.price_index = swap_index + 1
+        self._price_program_index = self.instructions[self.price_index].program_id_index
+        self.limit_index = swap_index + 2
+        self.shape = message_shape(message)
+
+    def message(
+        self,
+        amount_in: int,
+        min_amount_out: int,
+        blockhash: Hash,
+        compute_unit_price: int,
+        compute_unit_limit: int,
+    ) -> MessageV0:
+        instructions = self.instructions.copy()
+        instructions[self.swap_index] = CompiledInstruction(
+            self._swap_program_index,
+            SWAP_DISCRIMINATOR + SWAP_AMOUNTS.pack(int(amount_in), int(min_amount_out)),
+            self._swap_accounts,
+        )
+        instructions[self.price_index] = CompiledInstruction(
+            self._price_program_index,
+            COMPUTE_UNIT_PRICE.pack(SET_COMPUTE_UNIT_PRICE, int(compute_unit_price)),
+            b"",
+        )
+        instructions[self.limit_index] = CompiledInstruction(
+            self._price_program_index,
+            COMPUTE_UNIT_LIMIT.pack(SET_COMPUTE_UNIT_LIMIT, int(compute_unit_limit)),
+            b"",
+        )
+        return MessageV0(
+            self.header,
+            self.account_keys,
+            blockhash,
+            instructions,
+            self.address_table_lookups,
+        )
+
+
+def compile_template(
+    payer,
+    pool_keys: dict,
+    token_account_in,
+    token_account_out,
+    pre_instructions=(),
+    lookup_tables=(),
+) -> SwapTemplate:
+    """
+    Compiles the swap message once with placeholder amounts, compute budget and
+    blockhash.
+    """
+    swap = make_swap_instruction(
+        0, token_account_in, token_account_out, pool_keys, None, None, payer, 0
+    )
+    instructions = list(pre_instructions) + [
+        swap,
+        set_compute_unit_price(0),
+        set_compute_unit_limit(0),
+    ]
+    message = MessageV0.try_compile(
+        payer.pubkey(), instructions, list(lookup_tables), Hash.default()
+    )
+    return SwapTemplate(message, len(pre_instructions))
+
+
+class SwapTemplateCache:
+    """
+    LRU cache of SwapTemplates keyed by pool, user token accounts, owner, extra
+    instructions and lookup tables.
+    """
+
+    def __init__(self, maxsize: int = TEMPLATE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._templates = OrderedDict()
+
+    def __len__(self):
+        return len(self._templates)
+
+    def get(
+        self,
+        payer,
+        pool_keys: dict,
+        token_account_in,
+        token_account_out,
+        pre_instructions=(),
+        lookup_tables=(),
+    ) -> SwapTemplate:
+        key = (
+            str(pool_keys["amm_id"]),
+            str(token_account_in),
+            str(token_account_out),
+            str(payer.pubkey()),
+            tuple(bytes(ix) for ix in pre_instructions),
+            tuple((str(table.key), len(table.addresses)) for table in lookup_tables),
+        )
+        template = self._templates.get(key)
+        if template is not None:
+            self._templates.move_to_end(key)
+            return template
+        template = compile_template(
+            payer,
+            pool_keys,
+            token_account_in,
+            token_account_out,
+            pre_instructions,
+            lookup_tables,
+        )
+        self._templates[key] = template
+        if len(self._templates) > self.maxsize:
+            self._templates.popitem(last=False)
+        return template
+
+    def clear(self):
+        self._templates.clear()
+
+
+swap_templates = SwapTemplateCache()
+
+
+async def build_swap_transaction(
+    payer,
+    pool_keys: dict,
+    token_account_in,
+    token_account_out,
+    amount_in: int,
+    min_amount_out: int,
+    blockhash: Hash,
+    compute_unit_price: int,
+    compute_unit_limit: int = None,
+    pre_instructions=(),
+    lookup_tables=(),
+) -> VersionedTransaction:
+    """
+    Signed swap_base_in transaction built from the cached template.
+
+    Args:
+        payer (Keypair): Owner of the token accounts and fee payer.
+        pool_keys (dict): Keys dict from gen_pool / fetch_pool_keys.
+        token_account_in (Pubkey): The user's source token account.
+        token_account_out (Pubkey): The user's destination token account.
+        amount_in (int): Amount to swap, in base units of the input mint.
+        min_amount_out (int): Minimum output accepted.
+        blockhash (Hash): Recent blockhash.
+        compute_unit_price (int): Priority fee in micro-lamports per CU.
+        compute_unit_limit (int): Compute unit limit, calibrated by simulation per
+            template shape when None.
+        pre_instructions: Instructions placed before the swap, e.g. creating the
+            destination token account.
+        lookup_tables: AddressLookupTableAccounts to compile against.
+
+    Returns:
+        VersionedTransaction: The signed transaction.
+    """
+    template = swap_templates.get(
+        payer,
+        pool_keys,
+        token_account_in,
+        token_account_out,
+        pre_instructions,
+        lookup_tables,
+    )
+
+    def build(limit):
+        message = template.message(
+            amount_in, min_amount_out, blockhash, compute_unit_price, limit
+        )
+        return VersionedTransaction(message, [payer])
+
+    if compute_unit_limit is None:
+        compute_unit_limit = await compute_unit_calibrator.limit(template.shape, build)
+    return build(compute_unit_limit)
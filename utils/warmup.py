@@ -0,0 +1,43 @@
+# utils/warmup.py
+
+import asyncio
+
+from utils.blockhash import blockhash_prefetcher
+from utils.priority_fee import priority_fee_oracle
+
+"""
+Background start of the services every trade needs before it can build.
+
+A trade creates one Warmup before its retry loop, so the first blockhash and fee
+samples are fetched while the pool is being discovered, calls ready() before
+building and close() in a finally block, so an early return or exception never
+leaves the start tasks unawaited.
+"""
+
+
+class Warmup:
+    """
+    Starts the blockhash prefetcher and the priority fee oracle in background tasks.
+    """
+
+    def __init__(self):
+        self._services = (blockhash_prefetcher, priority_fee_oracle)
+        self._tasks = [asyncio.create_task(service.start()) for service in self._services]
+
+    async def ready(self):
+        """
+        Waits for both starts. A start that failed is tried again here, and raises
+        if it fails again, so a retry loop can call this on every attempt.
+        """
+        await asyncio.wait(self._tasks)
+        for task, service in zip(self._tasks, self._services):
+            if task.exception() is not None:
+                await service.start()
+
+    async def close(self):
+        """
+        Cancels starts that are still running and retrieves their results.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,222 @@
+# utils/ws.py
+
+import asyncio
+import itertools
+import json
+import os
+
+import websockets
+from dotenv import load_dotenv
+
+# Load .env file
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
+
+"""
+One multiplexed Solana PubSub websocket connection.
+
+Any number of account/signature/logs subscriptions share a single connection.
+Notifications are dispatched to per-subscription callbacks, and after a dropped
+connection every live subscription is re-sent automatically once it reconnects.
+Notifications sent while disconnected are lost, so on_reconnect callbacks let
+subscribers re-read the state they track.
+"""
+
+
+def _default_wss_url():
+    url = os.getenv("RPC_WSS_URL")
+    if url:
+        return url
+    url = os.getenv("RPC_HTTPS_URL") or ""
+    if url.startswith("https://"):
+        return "wss://" + url[len("https://") :]
+    if url.startswith("http://"):
+        return "ws://" + url[len("http://") :]
+    return url
+
+
+RPC_WSS_URL = _default_wss_url()
+RECONNECT_DELAY = 1.0
+RECONNECT_DELAY_MAX = 15.0
+
+# subscribe method -> unsubscribe method
+UNSUBSCRIBE_METHODS = {
+    "accountSubscribe": "accountUnsubscribe",
+    "logsSubscribe": "logsUnsubscribe",
+    "programSubscribe": "programUnsubscribe",
+    "signatureSubscribe": "signatureUnsubscribe",
+    "slotSubscribe": "slotUnsubscribe",
+}
+
+
+class _Subscription:
+    __slots__ = ("method", "params", "callback", "oneshot", "server_id")
+
+    def __init__(self, method, params, callback, oneshot):
+        self.method = method
+        self.params = params
+        self.callback = callback
+        self.oneshot = oneshot
+        self.server_id = None
+
+
+class SubscriptionMux:
+    """
+    Multiplexes PubSub subscriptions over one websocket connection.
+
+    Args:
+        url (str): Websocket RPC URL, RPC_WSS_URL by default (derived from
+            RPC_HTTPS_URL when unset).
+    """
+
+    def __init__(self, url: str = None):
+        self.url = url or RPC_WSS_URL
+        self._subs = {}
+        self._by_server_id = {}
+        self._requests = {}
+        self._handles = itertools.count(1)
+        self._request_ids = itertools.count(1)
+        self._ws = None
+        self._task = None
+        self._reconnect_callbacks = []
+        self.connected = asyncio.Event()
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self.connected.clear()
+
+    def on_reconnect(self, callback):
+        """
+        Registers `callback()` to run every time the connection comes back after a
+        drop, once every live subscription has been re-sent.
+        """
+        self._reconnect_callbacks.append(callback)
+
+    async def subscribe(self, method: str, params: list, callback, oneshot: bool = False) -> int:
+        """
+        Registers a subscription and sends it if connected.
+
+        Args:
+            method (str): PubSub subscribe method, e.g. "accountSubscribe".
+            params (list): Its JSON-RPC params.
+            callback: Called with the notification "result" object.
+            oneshot (bool): The server ends the subscription after one
+                notification (signatureSubscribe).
+
+        Returns:
+            int: Handle to pass to unsubscribe.
+        """
+        await self.start()
+        handle = next(self._handles)
+        self._subs[handle] = _Subscription(method, params, callback, oneshot)
+        if self._ws is not None:
+            await self._send_subscribe(handle)
+        return handle
+
+    async def unsubscribe(self, handle: int):
+        sub = self._subs.pop(handle, None)
+        if sub is None or sub.server_id is None:
+            return
+        self._by_server_id.pop(sub.server_id, None)
+        if self._ws is not None:
+            try:
+                await self._send(UNSUBSCRIBE_METHODS[sub.method], [sub.server_id])
+            except websockets.ConnectionClosed:
+                pass
+
+    async def _send(self, method: str, params: list) -> int:
+        request_id = next(self._request_ids)
+        await self._ws.send(
+            json.dumps({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params})
+        )
+        return request_id
+
+    async def _send_subscribe(self, handle: int):
+        sub = self._subs[handle]
+        request_id = await self._send(sub.method, sub.params)
+        self._requests[request_id] = handle
+
+    async def _run(self):
+        delay = RECONNECT_DELAY
+        reconnect = False
+        while True:
+            try:
+                async with websockets.connect(self.url, max_size=None, ping_interval=20) as ws:
+                    self._ws = ws
+                    self._requests.clear()
+                    self._by_server_id.clear()
+                    for handle in list(self._subs):
+                        await self._send_subscribe(handle)
+                    self.connected.set()
+                    delay = RECONNECT_DELAY
+                    if reconnect:
+                        self._run_reconnect_callbacks()
+                    reconnect = True
+                    async for message in ws:
+                        self._dispatch(json.loads(message))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[ws] connection lost: {e}. Reconnecting in {delay:.1f}s")
+            finally:
+                self._ws = None
+                self.connected.clear()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_DELAY_MAX)
+
+    def _run_reconnect_callbacks(self):
+        for callback in self._reconnect_callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"[ws] reconnect callback error: {e}")
+
+    def _dispatch(self, message: dict):
+        if "id" in message:
+            handle = self._requests.pop(message["id"], None)
+            sub = self._subs.get(handle)
+            if sub is None:
+                return
+            if "error" in message:
+                print(f"[ws] {sub.method} failed: {message['error']}")
+                return
+            sub.server_id = message["result"]
+            self._by_server_id[sub.server_id] = handle
+            return
+
+        params = message.get("params")
+        if not params:
+            return
+        handle = self._by_server_id.get(params.get("subscription"))
+        sub = self._subs.get(handle)
+        if sub is None:
+            return
+        if sub.oneshot:
+            del self._by_server_id[sub.server_id]
+            del self._subs[handle]
+        try:
+            sub.callback(params["result"])
+        except Exception as e:
+            print(f"[ws] {sub.method} callback error: {e}")
+
+
+_mux = None
+
+
+def get_mux() -> SubscriptionMux:
+    """
+    Returns the process-wide SubscriptionMux for RPC_WSS_URL.
+    """
+    global _mux
+    if _mux is None:
+        _mux = SubscriptionMux()
+    return _mux
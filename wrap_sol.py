@@ -1,7 +1,6 @@
 import asyncio
 import sys
 import base58
-from solana.rpc.api import Client
 # from solana.rpc.api import Keypair
 from solders.keypair import Keypair
 
@@ -18,16 +17,21 @@ from solders.pubkey import Pubkey
 from spl.token.instructions import create_associated_token_account, SyncNativeParams
 from spl.token.constants import WRAPPED_SOL_MINT, TOKEN_PROGRAM_ID, ASSOCIATED_TOKEN_PROGRAM_ID
 from spl.token.instructions import sync_native
-from solana.rpc.commitment import Commitment, Confirmed
-from solana.rpc.async_api import AsyncClient
+from solana.rpc.commitment import Commitment
 
 from solders.transaction import VersionedTransaction
 from solders.message import MessageV0
 
 from dotenv import dotenv_values
+from utils.blockhash import blockhash_prefetcher
+from utils.compute_units import compute_unit_calibrator, instructions_shape
+from utils.confirm import confirm_signature
+from utils.priority_fee import priority_fee_oracle
+from utils.rpc import get_async_client, get_client
+from utils.shutdown import shutdown
 config = dotenv_values(".env")
-solana_client = Client(config["RPC_HTTPS_URL"])
-async_solana_client = AsyncClient(config["RPC_HTTPS_URL"])
+solana_client = get_client(config["RPC_HTTPS_URL"])
+async_solana_client = get_async_client(config["RPC_HTTPS_URL"])
 
 
 
@@ -94,17 +98,12 @@ if  wallet_solToken_acc is None:
         createWSOL_Acc,
         transfer(params),
         sync_native(params_sync),
-        set_compute_unit_price(100_750),
-        set_compute_unit_limit(1_000_000)
-
     ])
 else:
     instructions.extend([
         #createWSOL_Acc,
         transfer(params),
         sync_native(params_sync),
-        set_compute_unit_price(498_750),
-        set_compute_unit_limit(4_000_000)
     ])
 
 
@@ -115,16 +114,24 @@ async def send_and_confirm_transaction(client, payer, max_attempts=3):
         attempts = 0
         while attempts < max_attempts:
             try:
-
-                compiled_message = MessageV0.try_compile(
-                    payer.pubkey(),
-                    instructions,
-                    [],
-                    client.get_latest_blockhash().value.blockhash,
-                )
+                latest_blockhash, last_valid_block_height = await blockhash_prefetcher.get()
+                compute_unit_price = priority_fee_oracle.price([wsol_token_account])
+
+                def build(compute_unit_limit):
+                    compiled_message = MessageV0.try_compile(
+                        payer.pubkey(),
+                        instructions + [set_compute_unit_price(compute_unit_price),
+                                        set_compute_unit_limit(compute_unit_limit)],
+                        [],
+                        latest_blockhash,
+                    )
+                    return VersionedTransaction(compiled_message, [payer])
+
+                # Simulated once per instruction shape, then cached
+                compute_unit_limit = await compute_unit_calibrator.limit(instructions_shape(instructions), build)
                 print("Sending transaction...")
                 txn = await async_solana_client.send_transaction(
-                    txn=VersionedTransaction(compiled_message, [payer]),
+                    txn=build(compute_unit_limit),
                     opts=TxOpts(skip_preflight=True),
                 )
                 print("Transaction Signature:", txn.value)
@@ -137,14 +144,11 @@ async def send_and_confirm_transaction(client, payer, max_attempts=3):
                     print(style.RED, f"Transaction Signature Waiting to be confirmed: https://solscan.io/tx/{txid_string_sig}" + style.RESET)
                     print("Waiting Confirmation")
 
-                confirmation_resp = await async_solana_client.confirm_transaction(
-                    txid_string_sig,
-                    commitment=Confirmed,
-                    sleep_seconds=0.5,
-                )
+                confirmed, err = await confirm_signature(txid_string_sig, last_valid_block_height)
+                if err == "expired":
+                    raise asyncio.TimeoutError()
 
-                if confirmation_resp.value[0].err == None and str(
-                        confirmation_resp.value[0].confirmation_status) == "TransactionConfirmationStatus.Confirmed":
+                if confirmed:
                     print(style.GREEN + "Transaction Confirmed", style.RESET)
                     print(style.GREEN, f"Transaction Signature: https://solscan.io/tx/{txid_string_sig}", style.RESET)
                     return
@@ -160,4 +164,12 @@ async def send_and_confirm_transaction(client, payer, max_attempts=3):
             print("Maximum attempts reached. Transaction could not be confirmed.")
 
 
-asyncio.run(send_and_confirm_transaction(solana_client, payer))
\ No newline at end of file
+async def main():
+    try:
+        await priority_fee_oracle.start([wsol_token_account])
+        await send_and_confirm_transaction(solana_client, payer)
+    finally:
+        await shutdown()
+
+
+asyncio.run(main())
\ No newline at end of file